@@ -1,13 +1,30 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, ORJSONResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import CursorType, ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import CollectionInvalid, DuplicateKeyError
 import os
+import sys
+import traceback
+import asyncio
+import random
+import bisect
+import contextvars
+import threading
+import functools
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
 import logging
+import logging.handlers
+import queue
+import atexit
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr, validator
+from pydantic import BaseModel, Field, EmailStr, create_model, validator
 from typing import List, Optional
 import uuid
 from datetime import datetime, timedelta, timezone
@@ -15,15 +32,400 @@ import jwt
 import bcrypt
 import re
 import openpyxl
+import numpy as np
+import orjson
 from openpyxl.styles import Font, Alignment, PatternFill
 import io
+import hashlib
+import zlib
+from urllib.parse import parse_qsl
+
+# Optional response encodings, used when installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Metrics
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metric:
+    """Base for the Prometheus-style metrics exported at /metrics.
+
+    Every thread updates its own shard (a dict of label values -> value), so
+    recording takes no lock; the event loop and Motor's I/O threads never
+    contend. A scrape sums the shards. The lock is only taken the first time
+    a thread records a value.
+    """
+
+    type = None
+    metrics = []
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        Metric.metrics.append(self)
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _merged(self) -> dict:
+        merged = {}
+        for shard in list(self._shards):
+            # list() copies under the GIL, so a concurrent insert cannot break the iteration
+            for labels, value in list(shard.items()):
+                merged[labels] = self._add(merged.get(labels), value)
+        return merged
+
+    def _labels(self, labels: tuple, extra: Optional[tuple] = None) -> str:
+        pairs = list(zip(self.label_names, labels))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in sorted(self._merged().items()):
+            lines.extend(self._render_sample(labels, value))
+        return lines
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    @staticmethod
+    def _add(total, value):
+        return (total or 0) + value
+
+    def _render_sample(self, labels, value):
+        return [f"{self.name}{self._labels(labels)} {value}"]
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = ()):
+        super().__init__(name, help_text, label_names)
+        self.buckets = buckets
+
+    def observe(self, labels: tuple, value: float):
+        shard = self._shard()
+        # Per-bucket (non-cumulative) counts, then sum and count
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    @staticmethod
+    def _add(total, value):
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+    def _render_sample(self, labels, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), values):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            lines.append(f"{self.name}_bucket{self._labels(labels, ('le', le))} {cumulative}")
+        lines.append(f"{self.name}_sum{self._labels(labels)} {values[-2]}")
+        lines.append(f"{self.name}_count{self._labels(labels)} {values[-1]}")
+        return lines
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in Metric.metrics for line in metric.render()) + "\n"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the last body byte is sent",
+    ("method", "route"), LATENCY_BUCKETS)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ("method",))
+http_response_size_bytes = Histogram(
+    "http_response_size_bytes", "Response body bytes on the wire (after compression)",
+    ("method", "route"), SIZE_BUCKETS)
+mongodb_commands_total = Counter(
+    "mongodb_commands_total", "MongoDB commands by name and outcome", ("command", "outcome"))
+mongodb_command_duration_seconds = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round-trip time", ("command",), DB_LATENCY_BUCKETS)
+http_request_db_commands = Histogram(
+    "http_request_db_commands", "MongoDB commands issued per request", ("method", "route"),
+    (0, 1, 2, 5, 10, 25, 50, 100, 250))
+suspected_n_plus_one_total = Counter(
+    "suspected_n_plus_one_total", "Requests repeating one query shape at least N_PLUS_ONE_THRESHOLD times",
+    ("method", "route"))
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer callback", (),
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+event_loop_blocked_total = Counter(
+    "event_loop_blocked_total", "Event loop stalls over LOOP_LAG_THRESHOLD_MS, by the route that was running",
+    ("route",))
+
+class DatabaseCommandMetrics(monitoring.CommandListener):
+    """pymongo command monitoring; called synchronously on Motor's I/O threads"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongodb_commands_total.inc((event.command_name, "succeeded"))
+        mongodb_command_duration_seconds.observe((event.command_name,), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        mongodb_commands_total.inc((event.command_name, "failed"))
+        mongodb_command_duration_seconds.observe((event.command_name,), event.duration_micros / 1e6)
+
+def query_shape(value):
+    """A filter or pipeline with every literal replaced by "?" so repeated queries compare equal"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, dict) for item in value):
+        return [query_shape(item) for item in value]
+    return "?"
+
+# Where each command keeps the part of its body that identifies its query shape
+COMMAND_SHAPE_FIELDS = {
+    "find": lambda command: command.get("filter"),
+    "aggregate": lambda command: command.get("pipeline"),
+    "count": lambda command: command.get("query"),
+    "distinct": lambda command: command.get("query"),
+    "findAndModify": lambda command: command.get("query"),
+    "update": lambda command: command.get("updates", [{}])[0].get("q"),
+    "delete": lambda command: command.get("deletes", [{}])[0].get("q"),
+    "insert": lambda command: None
+}
+
+def command_shape(command_name: str, command: dict) -> Optional[str]:
+    """"<command> <collection> <shape>" for commands that carry a query, else None"""
+    shape_field = COMMAND_SHAPE_FIELDS.get(command_name)
+    if shape_field is None:
+        return None
+    body = orjson.dumps(query_shape(shape_field(command)), option=orjson.OPT_SORT_KEYS).decode()
+    return f"{command_name} {command.get(command_name)} {body}"
+
+class RequestDbStats:
+    """MongoDB round trips made while handling one request.
+
+    Commands run on Motor's I/O threads (which inherit the request's context),
+    so a request fanning out with asyncio.gather can update this concurrently.
+    """
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.commands = 0
+        self.seconds = 0.0
+        self.shapes = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> Optional[str]:
+        route = self.scope.get("route") if self.scope else None
+        return route.path if route is not None else None
+
+    def started(self, event):
+        shape = command_shape(event.command_name, event.command)
+        with self._lock:
+            self.commands += 1
+            if shape is not None:
+                self.shapes[shape] += 1
+
+    def finished(self, event):
+        with self._lock:
+            self.seconds += event.duration_micros / 1e6
+
+    def repeated_shapes(self, threshold: int) -> List[tuple]:
+        return sorted(
+            ((shape, count) for shape, count in self.shapes.items() if count >= threshold),
+            key=lambda item: -item[1]
+        )
+
+request_db_stats = contextvars.ContextVar("request_db_stats", default=None)
+
+class RequestDbAccounting(monitoring.CommandListener):
+    """Attributes MongoDB commands to the request whose context issued them"""
+
+    def started(self, event):
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats.started(event)
+
+    def succeeded(self, event):
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats.finished(event)
+
+    def failed(self, event):
+        self.succeeded(event)
+
+mongodb_slow_commands_total = Counter(
+    "mongodb_slow_commands_total", "MongoDB commands slower than SLOW_QUERY_MS", ("command",))
+
+# Commands explain accepts, and command fields that must not be passed back to it
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+SESSION_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+def summarize_plan(explain_output: dict) -> dict:
+    """Stages and indexes of the winning plan(s); the parsed query, which holds values, is left out.
+
+    Winning plans are found wherever explain nests them: under queryPlanner
+    for find, under an aggregation's $cursor stage, and once per shard.
+    """
+    stages = []
+    indexes = []
+
+    def collect_stages(node):
+        if isinstance(node, dict):
+            if "stage" in node:
+                stages.append(node["stage"])
+                if node.get("indexName"):
+                    indexes.append(node["indexName"])
+            for value in node.values():
+                collect_stages(value)
+        elif isinstance(node, list):
+            for value in node:
+                collect_stages(value)
+
+    def find_winning_plans(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "winningPlan":
+                    collect_stages(value)
+                elif key != "rejectedPlans":
+                    find_winning_plans(value)
+        elif isinstance(node, list):
+            for value in node:
+                find_winning_plans(value)
+
+    find_winning_plans(explain_output)
+    return {"stages": stages, "indexes": sorted(set(indexes)), "collscan": "COLLSCAN" in stages}
+
+class SlowCommandLog(monitoring.CommandListener):
+    """Records MongoDB commands slower than SLOW_QUERY_MS in the capped slow_queries collection.
+
+    Listener callbacks run on Motor's I/O threads and must not do I/O, so
+    slow commands are handed to the event loop, where write_pending()
+    stores them and runs the sampled explains. Only the query shape is
+    stored, never literal values.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.queue = None
+        self._started = {}
+        self._explained_at = {}
+
+    def start(self) -> asyncio.Task:
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=1000)
+        return asyncio.create_task(self.write_pending())
+
+    def started(self, event):
+        if self.loop is None or event.command_name == "explain":
+            return
+        if event.command.get(event.command_name) == "slow_queries":
+            return
+        self._started[(event.connection_id, event.request_id)] = (event.command, request_db_stats.get())
+
+    def succeeded(self, event):
+        started = self._started.pop((event.connection_id, event.request_id), None)
+        if started is None or event.duration_micros < SLOW_QUERY_MS * 1000:
+            return
+        mongodb_slow_commands_total.inc((event.command_name,))
+        command, stats = started
+        record = {
+            "id": str(uuid.uuid4()),
+            "occurred_at": datetime.now(timezone.utc),
+            "command": event.command_name,
+            "collection": command.get(event.command_name) if event.command_name != "getMore" else command.get("collection"),
+            "shape": command_shape(event.command_name, command),
+            "duration_ms": round(event.duration_micros / 1000, 1),
+            "failed": isinstance(event, monitoring.CommandFailedEvent),
+            "method": stats.scope.get("method") if stats and stats.scope else None,
+            "route": stats.route if stats else None,
+            "worker_id": WORKER_ID,
+            "plan": None
+        }
+        try:
+            self.loop.call_soon_threadsafe(self._enqueue, record, command)
+        except RuntimeError:
+            pass  # loop closed during shutdown
+
+    def failed(self, event):
+        self.succeeded(event)
+
+    def _enqueue(self, record: dict, command: dict):
+        try:
+            self.queue.put_nowait((record, command))
+        except asyncio.QueueFull:
+            pass  # a burst of slow queries; losing some records beats blocking the loop
+
+    def _should_explain(self, record: dict) -> bool:
+        if record["command"] not in EXPLAINABLE_COMMANDS or record["failed"]:
+            return False
+        if random.random() >= SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+            return False
+        now = time.monotonic()
+        if now - self._explained_at.get(record["shape"], -SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS) < SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+            return False
+        self._explained_at[record["shape"]] = now
+        return True
+
+    async def write_pending(self):
+        while True:
+            record, command = await self.queue.get()
+            try:
+                if self._should_explain(record):
+                    explain_target = {
+                        key: value for key, value in command.items()
+                        if not key.startswith("$") and key not in SESSION_FIELDS
+                    }
+                    explain_output = await db.command({"explain": explain_target, "verbosity": "queryPlanner"})
+                    record["plan"] = summarize_plan(explain_output)
+                await db.slow_queries.insert_one(record)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Writing slow query record failed: {e}")
+
+slow_command_log = SlowCommandLog()
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url, event_listeners=[DatabaseCommandMetrics(), RequestDbAccounting(), slow_command_log]
+)
 db = client[os.environ['DB_NAME']]
 
 # Security
@@ -31,6 +433,67 @@ SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production'
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Inventory history: how often a compact stock checkpoint is written
+INVENTORY_CHECKPOINT_INTERVAL_SECONDS = int(os.environ.get('INVENTORY_CHECKPOINT_INTERVAL_SECONDS', 6 * 60 * 60))
+# Sequence watermarks: a seq is reserved from db.counters before the write carrying it lands, so
+# readers that resume from a seq only trust a counter value once it is this many seconds old
+SEQUENCE_SETTLE_SECONDS = float(os.environ.get('SEQUENCE_SETTLE_SECONDS', 5))
+# Daily per-category stock rollups: how often today's rollup is refreshed
+DAILY_ROLLUP_INTERVAL_SECONDS = int(os.environ.get('DAILY_ROLLUP_INTERVAL_SECONDS', 60 * 60))
+# Stock-out forecasting: default history window used to estimate consumption
+FORECAST_WINDOW_DAYS = int(os.environ.get('FORECAST_WINDOW_DAYS', 90))
+# Live updates: events buffered per SSE client before it is told to resync
+SSE_QUEUE_SIZE = int(os.environ.get('SSE_QUEUE_SIZE', 100))
+SSE_KEEPALIVE_SECONDS = 15
+# Streams are closed after this long so the client reconnects, which re-checks its token and permissions
+SSE_STREAM_MAX_SECONDS = int(os.environ.get('SSE_STREAM_MAX_SECONDS', 5 * 60))
+# Cache invalidation between workers: auto (change streams when connected to a
+# replica set or mongos, otherwise the capped cache_events collection), change_stream or capped
+CACHE_INVALIDATION_MODE = os.environ.get('CACHE_INVALIDATION_MODE', 'auto')
+CACHE_EVENTS_MAX_BYTES = int(os.environ.get('CACHE_EVENTS_MAX_BYTES', 1024 * 1024))
+WORKER_ID = str(uuid.uuid4())
+# Response compression: bodies smaller than this are sent as is; levels were picked with
+# benchmarks/compression_bench.py (level 1 of each codec is within ~15% of the best ratio
+# at a fraction of the CPU on board lists)
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1400))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 1))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 1))
+ZSTD_LEVEL = int(os.environ.get('ZSTD_LEVEL', 1))
+# Per-request database accounting: requests making more MongoDB round trips than the budget
+# are logged, and a query shape repeated this many times is flagged as a suspected N+1
+DB_ROUNDTRIP_BUDGET = int(os.environ.get('DB_ROUNDTRIP_BUDGET', 25))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+# Slow-query log: commands slower than SLOW_QUERY_MS go to the capped slow_queries collection,
+# a sample of them with the summary of their query plan (each shape explained at most every interval)
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0.2))
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = int(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS', 600))
+SLOW_QUERY_LOG_BYTES = int(os.environ.get('SLOW_QUERY_LOG_BYTES', 8 * 1024 * 1024))
+# Event loop monitor: the loop's timer lag is sampled every LOOP_LAG_INTERVAL_SECONDS; a stall
+# over LOOP_LAG_THRESHOLD_MS is logged with the stack of the code blocking the loop
+LOOP_LAG_INTERVAL_SECONDS = float(os.environ.get('LOOP_LAG_INTERVAL_SECONDS', 0.25))
+LOOP_LAG_THRESHOLD_MS = float(os.environ.get('LOOP_LAG_THRESHOLD_MS', 200))
+# Traffic capture: when TRAFFIC_CAPTURE_PATH is set, every API request is appended to that file
+# as a sanitized JSON line for benchmarks/replay_traffic.py, rotated at TRAFFIC_CAPTURE_MAX_BYTES
+TRAFFIC_CAPTURE_PATH = os.environ.get('TRAFFIC_CAPTURE_PATH')
+TRAFFIC_CAPTURE_MAX_BYTES = int(os.environ.get('TRAFFIC_CAPTURE_MAX_BYTES', 50 * 1024 * 1024))
+TRAFFIC_CAPTURE_BACKUPS = int(os.environ.get('TRAFFIC_CAPTURE_BACKUPS', 5))
+TRAFFIC_CAPTURE_MAX_BODY_BYTES = int(os.environ.get('TRAFFIC_CAPTURE_MAX_BODY_BYTES', 64 * 1024))
+# Request bodies are recorded as their shape unless this is "1" (see TrafficCaptureMiddleware)
+TRAFFIC_CAPTURE_FULL_BODIES = os.environ.get('TRAFFIC_CAPTURE_FULL_BODIES', '0') == '1'
+# Profiling: an admin can profile one request by sending "X-Profile: 1", or this worker for a
+# time-boxed window via POST /api/admin/profiling. The event loop thread is sampled every
+# PROFILE_SAMPLE_INTERVAL_MS; profiles are kept as collapsed stacks in the capped profiles collection
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 5))
+PROFILE_MAX_WINDOW_SECONDS = int(os.environ.get('PROFILE_MAX_WINDOW_SECONDS', 300))
+PROFILE_LOG_BYTES = int(os.environ.get('PROFILE_LOG_BYTES', 32 * 1024 * 1024))
+# Metrics: when set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# Reports and dashboard: a computed result is served as fresh for REPORT_RESULT_TTL_SECONDS, then
+# served stale while a background refresh runs until REPORT_STALE_TTL_SECONDS (0 and 0: coalesce only)
+REPORT_RESULT_TTL_SECONDS = float(os.environ.get('REPORT_RESULT_TTL_SECONDS', 5))
+REPORT_STALE_TTL_SECONDS = float(os.environ.get('REPORT_STALE_TTL_SECONDS', 60))
+
 # Permission system constants
 AVAILABLE_PERMISSIONS = [
     "view_dashboard",
@@ -70,7 +533,8 @@ def check_permission(user, required_permission: str) -> bool:
 security = HTTPBearer()
 
 # Create the main app
-app = FastAPI(title="Electronics Board Inventory Management")
+# orjson encodes datetimes and UUIDs natively, so handlers can return stored documents as-is
+app = FastAPI(title="Electronics Board Inventory Management", default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 # Health check routes
@@ -154,6 +618,7 @@ class Board(BaseModel):
     comments: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     created_by: str
+    updated_seq: Optional[int] = None  # Delta sync sequence, bumped on every write
 
 class BoardCreate(BaseModel):
     category_id: str
@@ -191,6 +656,7 @@ class BulkIssueRequest(BaseModel):
     # User display names (populated by API)
     requested_by_name: Optional[str] = None
     issued_to_name: Optional[str] = None
+    updated_seq: Optional[int] = None  # Delta sync sequence, bumped on every write
 
 class IssueRequest(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -208,6 +674,7 @@ class IssueRequest(BaseModel):
     # User display names (populated by API)
     requested_by_name: Optional[str] = None
     issued_to_name: Optional[str] = None
+    updated_seq: Optional[int] = None  # Delta sync sequence, bumped on every write
 
 class IssueRequestCreate(BaseModel):
     category_id: str
@@ -250,6 +717,76 @@ class UserUpdate(BaseModel):
     permissions: Optional[List[str]] = None
     is_active: Optional[bool] = None
 
+def clean_document(doc: Optional[dict]) -> Optional[dict]:
+    """Strip MongoDB's _id from a stored document so it can be returned directly.
+
+    Datetimes are left untouched: ORJSONResponse serializes them to ISO 8601,
+    the same format the handlers used to produce by hand.
+    """
+    if doc is None:
+        return None
+    doc.pop("_id", None)
+    return doc
+
+_trusted_field_defaults = {}
+_REQUIRED = object()  # marks fields without a plain default
+
+def trusted_rows(model, docs: List[dict]) -> List[dict]:
+    """Reshape documents read from our own database to a model without validating them again.
+
+    Documents written by this API already match their model, so each one is
+    only reshaped to the model's fields (in field order, defaults filled in,
+    unknown keys such as _id dropped). A document missing a field without a
+    plain default goes through the model instead.
+    """
+    fields = _trusted_field_defaults.get(model)
+    if fields is None:
+        fields = _trusted_field_defaults[model] = [
+            (name, _REQUIRED if info.is_required() or info.default_factory else info.default)
+            for name, info in model.model_fields.items()
+        ]
+    required = [name for name, default in fields if default is _REQUIRED]
+    rows = []
+    for doc in docs:
+        if all(name in doc for name in required):
+            rows.append({name: doc.get(name, default) for name, default in fields})
+        else:
+            rows.append(model(**doc).model_dump(mode="json"))
+    return rows
+
+def trusted_json_response(model, docs: List[dict]) -> Response:
+    """Encode trusted_rows() with orjson; returning a Response skips FastAPI's response_model validation"""
+    # UTC datetimes are written with a "Z" suffix, as pydantic does
+    return Response(orjson.dumps(trusted_rows(model, docs), option=orjson.OPT_UTC_Z), media_type="application/json")
+
+_partial_models = {}
+
+def select_fields(model, fields: Optional[str]):
+    """Resolve a comma-separated `fields=` parameter into a trimmed response model
+    and the matching MongoDB projection. `id` is always included.
+    """
+    if not fields:
+        return model, {"_id": 0}
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(model.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    selected = tuple(name for name in model.model_fields if name in requested or name == "id")
+    partial_model = _partial_models.get((model, selected))
+    if partial_model is None:
+        partial_model = _partial_models[(model, selected)] = create_model(
+            f"{model.__name__}Fields",
+            **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in selected}
+        )
+    return partial_model, {"_id": 0, **{name: 1 for name in selected}}
+
+# Projections for internal lookups that only need a few fields
+EXISTS_PROJECTION = {"_id": 1}
+USER_NAME_PROJECTION = {"_id": 0, "email": 1, "first_name": 1, "last_name": 1}
+REPAIR_REPORT_PROJECTION = {"_id": 0, "category_id": 1, "serial_number": 1, "condition": 1, "location": 1, "inward_date_time": 1, "comments": 1}
+# Fields the board event hooks read from a board's previous state
+BOARD_STATE_PROJECTION = {"_id": 0, "id": 1, "category_id": 1, "serial_number": 1, "location": 1, "condition": 1, "project_number": 1}
+
 # Auth functions
 def verify_password(plain_password, hashed_password):
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
@@ -270,7 +807,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -284,10 +821,13 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.PyJWTError:
         raise credentials_exception
     
-    user = await db.users.find_one({"email": email})
+    user = await db.users.find_one({"email": email}, {"_id": 0, "password": 0})
     if user is None:
         raise credentials_exception
-    return User(**user)
+    user = User(**user)
+    # For middlewares that report who made the request (traffic capture, profiling)
+    request.state.user = user
+    return user
 
 from fastapi import Query
 
@@ -297,6 +837,7 @@ from typing import Optional
 security_optional = HTTPBearer(auto_error=False)
 
 async def get_current_user_flexible(
+    request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_optional),
     token: Optional[str] = Query(None)
 ):
@@ -325,16 +866,19 @@ async def get_current_user_flexible(
     except jwt.PyJWTError:
         raise credentials_exception
     
-    user = await db.users.find_one({"email": email})
+    user = await db.users.find_one({"email": email}, {"_id": 0, "password": 0})
     if user is None:
         raise credentials_exception
-    return User(**user)
+    user = User(**user)
+    # For middlewares that report who made the request (traffic capture, profiling)
+    request.state.user = user
+    return user
 
 # Auth routes
 @api_router.post("/auth/register", response_model=Token)
 async def register(user_data: UserCreate):
     # Check if user exists
-    existing_user = await db.users.find_one({"email": user_data.email})
+    existing_user = await db.users.find_one({"email": user_data.email}, EXISTS_PROJECTION)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -388,39 +932,51 @@ async def get_me(current_user: User = Depends(get_current_user)):
 @api_router.post("/categories", response_model=Category)
 async def create_category(category_data: CategoryCreate, current_user: User = Depends(get_current_user)):
     # Check if category name already exists
-    existing = await db.categories.find_one({"name": category_data.name})
+    existing = await db.categories.find_one({"name": category_data.name}, EXISTS_PROJECTION)
     if existing:
         raise HTTPException(status_code=400, detail="Category name already exists")
     
     category = Category(**category_data.dict(), created_by=current_user.email)
     await db.categories.insert_one(category.dict())
+    await invalidation_bus.notify("categories", category.id)
     return category
 
 @api_router.get("/categories", response_model=List[Category])
-async def get_categories(current_user: User = Depends(get_current_user)):
+async def get_categories(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated category fields to return"),
+    current_user: User = Depends(get_current_user)
+):
     if not check_permission(current_user, "view_categories"):
         raise HTTPException(status_code=403, detail="Permission denied: view_categories required")
-    categories = await db.categories.find().to_list(1000)
-    return [Category(**cat) for cat in categories]
+    response_model, _ = select_fields(Category, fields)
+    etag = await category_catalog.etag(",".join(response_model.model_fields))
+    # Clients may keep the list but must revalidate it with If-None-Match
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response = trusted_json_response(response_model, await category_catalog.all())
+    response.headers.update(headers)
+    return response
 
 @api_router.get("/categories/{category_id}", response_model=Category)
 async def get_category(category_id: str, current_user: User = Depends(get_current_user)):
     if not check_permission(current_user, "view_categories"):
         raise HTTPException(status_code=403, detail="Permission denied: view_categories required")
-    category = await db.categories.find_one({"id": category_id})
+    category = await category_catalog.get(category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     return Category(**category)
 
 @api_router.put("/categories/{category_id}", response_model=Category)
 async def update_category(category_id: str, category_data: CategoryCreate, current_user: User = Depends(get_current_user)):
-    category = await db.categories.find_one({"id": category_id})
+    category = await category_catalog.get(category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     # Check if new name conflicts with existing (excluding current)
     if category_data.name != category["name"]:
-        existing = await db.categories.find_one({"name": category_data.name})
+        existing = await db.categories.find_one({"name": category_data.name}, EXISTS_PROJECTION)
         if existing:
             raise HTTPException(status_code=400, detail="Category name already exists")
     
@@ -428,6 +984,7 @@ async def update_category(category_id: str, category_data: CategoryCreate, curre
         {"id": category_id},
         {"$set": category_data.dict()}
     )
+    await invalidation_bus.notify("categories", category_id)
     
     updated_category = await db.categories.find_one({"id": category_id})
     return Category(**updated_category)
@@ -435,7 +992,7 @@ async def update_category(category_id: str, category_data: CategoryCreate, curre
 @api_router.delete("/categories/{category_id}")
 async def delete_category(category_id: str, current_user: User = Depends(get_current_user)):
     # Check if category has any boards
-    boards_count = await db.boards.count_documents({"category_id": category_id})
+    boards_count = await db.boards.count_documents({"category_id": category_id}, limit=1)
     if boards_count > 0:
         raise HTTPException(status_code=400, detail="Cannot delete category with existing boards")
     
@@ -443,13 +1000,921 @@ async def delete_category(category_id: str, current_user: User = Depends(get_cur
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
     
+    await invalidation_bus.notify("categories", category_id)
     return {"message": "Category deleted successfully"}
 
+# Cache invalidation across workers
+class InvalidationBus:
+    """Keeps per-worker caches coherent when another worker or host writes.
+
+    Caches register the collections they are derived from. Writes made in
+    this worker invalidate local caches immediately through notify(); other
+    workers learn about them from a change stream on the registered
+    collections or, on a standalone mongod, by tailing the capped
+    cache_events collection that notify() appends to. The change stream
+    also carries this worker's own writes; those stamped with an
+    updated_seq this worker reserved are recognised and skipped.
+    """
+
+    def __init__(self):
+        self.caches = {}
+        self.mode = None
+        self.received = 0
+        self.timed = 0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.last_latency_ms = None
+        self._resume_token = None
+        self._tail_position = None
+        # (first, last) ranges of SYNC_SEQUENCE values this worker reserved recently
+        self._own_seqs = deque(maxlen=1024)
+
+    def register(self, name: str, collections: List[str], callback):
+        """callback(collection, key) is called on invalidation; collection None means everything"""
+        self.caches[name] = (frozenset(collections), callback)
+
+    @property
+    def collections(self) -> List[str]:
+        return sorted(set().union(*(collections for collections, _ in self.caches.values())))
+
+    def invalidate(self, collection: Optional[str], key: Optional[str] = None):
+        for collections, callback in self.caches.values():
+            if collection is None or collection in collections:
+                callback(collection, key)
+
+    async def notify(self, collection: str, key: Optional[str] = None):
+        """Invalidate local caches for a write and, in capped mode, tell the other workers"""
+        self.invalidate(collection, key)
+        if self.mode == "capped":
+            await db.cache_events.insert_one({
+                "collection": collection,
+                "key": key,
+                "origin": WORKER_ID,
+                "published_at": datetime.now(timezone.utc)
+            })
+
+    def written_here(self, first_seq: int, last_seq: int):
+        """Record updated_seq values reserved by this worker, whose change events are its own writes"""
+        self._own_seqs.append((first_seq, last_seq))
+
+    def _apply_change(self, change: dict):
+        """Apply a change stream event, by category for boards, unless this worker made the write"""
+        collection = change["ns"]["coll"]
+        document = change.get("fullDocument") or {}
+        updated_fields = (change.get("updateDescription") or {}).get("updatedFields") or {}
+        # For updates fullDocument is looked up later, so prefer the seq the update itself set
+        seq = updated_fields.get("updated_seq", document.get("updated_seq"))
+        if seq is not None and any(first <= seq <= last for first, last in self._own_seqs):
+            return
+        # A deleted board has no document to take the category from; then the whole collection goes
+        key = document.get("category_id") if collection == "boards" else None
+        # wallTime is only sent from MongoDB 6.0; clusterTime is the commit time in whole seconds
+        published_at = change.get("wallTime") or change["clusterTime"].as_datetime()
+        self._apply_remote(collection, key, published_at)
+
+    def _apply_remote(self, collection: str, key: Optional[str], published_at: Optional[datetime]):
+        self.invalidate(collection, key)
+        self.received += 1
+        if published_at is not None:
+            if published_at.tzinfo is None:
+                published_at = published_at.replace(tzinfo=timezone.utc)
+            latency_ms = (datetime.now(timezone.utc) - published_at).total_seconds() * 1000
+            self.timed += 1
+            self.last_latency_ms = latency_ms
+            self.total_latency_ms += latency_ms
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+
+    async def start(self) -> asyncio.Task:
+        if CACHE_INVALIDATION_MODE in ("change_stream", "capped"):
+            self.mode = CACHE_INVALIDATION_MODE
+        else:
+            hello = await client.admin.command("hello")
+            supports_change_streams = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+            self.mode = "change_stream" if supports_change_streams else "capped"
+        if self.mode == "capped":
+            try:
+                await db.create_collection("cache_events", capped=True, size=CACHE_EVENTS_MAX_BYTES)
+                # A tailable cursor on an empty capped collection dies immediately
+                await db.cache_events.insert_one({"collection": None, "origin": None, "published_at": None})
+            except CollectionInvalid:
+                pass
+        return asyncio.create_task(self.run())
+
+    async def run(self):
+        """Background listener; after a reconnect every cache is flushed since events may have been missed"""
+        reconnecting = False
+        while True:
+            if reconnecting:
+                self.invalidate(None)
+            reconnecting = True
+            try:
+                if self.mode == "change_stream":
+                    await self._watch_change_stream()
+                else:
+                    await self._tail_cache_events()
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Cache invalidation listener failed: {e}")
+            await asyncio.sleep(1)
+
+    async def _watch_change_stream(self):
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": self.collections}}},
+            # Only what _apply_change reads from the (looked up) document
+            {"$project": {
+                "ns": 1, "clusterTime": 1, "wallTime": 1,
+                "fullDocument.category_id": 1, "fullDocument.updated_seq": 1,
+                "updateDescription.updatedFields.updated_seq": 1
+            }}
+        ]
+        async with db.watch(pipeline, full_document="updateLookup", resume_after=self._resume_token) as stream:
+            async for change in stream:
+                self._resume_token = stream.resume_token
+                self._apply_change(change)
+
+    async def _tail_cache_events(self):
+        # ObjectIds from different workers are not ordered, so the tail keeps its own
+        # position: record ids of a capped collection follow insertion order. A
+        # reconnect re-reads the collection and skips what was already applied.
+        if self._tail_position is None:
+            latest = await db.cache_events.find_one({}, sort=[("$natural", -1)], show_record_id=True)
+            self._tail_position = latest["$recordId"] if latest else 0
+        cursor = db.cache_events.find({}, cursor_type=CursorType.TAILABLE_AWAIT, show_record_id=True)
+        while cursor.alive:
+            async for event in cursor:
+                if event["$recordId"] <= self._tail_position:
+                    continue
+                self._tail_position = event["$recordId"]
+                if event.get("origin") not in (None, WORKER_ID):
+                    self._apply_remote(event["collection"], event.get("key"), event.get("published_at"))
+
+invalidation_bus = InvalidationBus()
+
+# Category catalog
+class CategoryCatalog:
+    """Read-through in-memory copy of the categories collection.
+
+    Categories change a few times a week but are read by almost every
+    request, so the whole collection is kept in memory and reloaded after
+    any invalidation. `version` is bumped on every invalidation; a load that
+    raced one is served but not kept. Documents handed out are shared and
+    must be treated as read-only.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._by_id = None
+        self._digest = None
+
+    def invalidate(self, collection: Optional[str] = None, key: Optional[str] = None):
+        self.version += 1
+        self._by_id = None
+        self._digest = None
+
+    async def by_id(self) -> dict:
+        if self._by_id is not None:
+            return self._by_id
+        version = self.version
+        categories = await db.categories.find({}, {"_id": 0}).to_list(None)
+        by_id = {category["id"]: category for category in categories}
+        if version == self.version:
+            self._by_id = by_id
+            self._digest = hashlib.blake2b(orjson.dumps(categories), digest_size=12).hexdigest()
+        return by_id
+
+    async def all(self) -> List[dict]:
+        return list((await self.by_id()).values())
+
+    async def get(self, category_id: str) -> Optional[dict]:
+        return (await self.by_id()).get(category_id)
+
+    async def as_of(self, as_of: Optional[datetime]) -> List[dict]:
+        """Categories that existed at `as_of` (all of them when it is None)"""
+        categories = await self.all()
+        if as_of is None:
+            return categories
+        if as_of.tzinfo is not None:
+            as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+        return [category for category in categories if category.get("created_at") and category["created_at"] <= as_of]
+
+    async def etag(self, variant: str = "") -> str:
+        """Strong ETag for one rendering of the catalog.
+
+        Version counters differ between workers, so the tag is derived from
+        the catalog contents instead.
+        """
+        categories = await self.all()
+        digest = self._digest
+        if digest is None:
+            # Invalidated while loading; hash what was read
+            digest = hashlib.blake2b(orjson.dumps(categories), digest_size=12).hexdigest()
+        if variant:
+            digest = hashlib.blake2b(f"{digest}:{variant}".encode(), digest_size=12).hexdigest()
+        return f'"{digest}"'
+
+category_catalog = CategoryCatalog()
+invalidation_bus.register("category_catalog", ["categories"], category_catalog.invalidate)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match covers `etag`"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates or "*" in candidates
+
+# Live event bus (Server-Sent Events)
+class EventSubscriber:
+    """One connected SSE client: a bounded event queue and the user it is filtered for"""
+
+    def __init__(self, user: User):
+        self.user = user
+        self.queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+        self.resyncs = 0
+
+    def can_see(self, event: dict) -> bool:
+        if event["type"] == "board":
+            return check_permission(self.user, "view_boards") or check_permission(self.user, "view_dashboard")
+        if not check_permission(self.user, "view_issue_requests"):
+            return False
+        # Non-admins only see their own individual requests, as in get_issue_requests
+        if event["type"] == "issue_request" and self.user.role != "admin":
+            return event.get("requested_by") == self.user.email
+        return True
+
+    def offer(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client is not keeping up: drop its backlog and tell it to refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+            self.resyncs += 1
+
+class EventBus:
+    """In-process fan-out of change events from mutation handlers to SSE clients"""
+
+    def __init__(self):
+        self.subscribers = set()
+
+    def subscribe(self, user: User) -> EventSubscriber:
+        subscriber = EventSubscriber(user)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: EventSubscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, event: dict):
+        for subscriber in list(self.subscribers):
+            if subscriber.can_see(event):
+                subscriber.offer(event)
+
+event_bus = EventBus()
+
+async def publish_request_event(event_type: str, action: str, request_doc: dict):
+    """Announce an issue_request / bulk_issue_request change to caches and live clients"""
+    await invalidation_bus.notify(f"{event_type}s", request_doc["id"])
+    event_bus.publish({
+        "type": event_type,
+        "action": action,
+        "id": request_doc["id"],
+        "status": request_doc.get("status"),
+        "requested_by": request_doc.get("requested_by"),
+        "updated_seq": request_doc.get("updated_seq")
+    })
+
+# Inventory event stream and checkpoints
+def is_stock_board(board: Optional[dict]) -> bool:
+    """Whether a board counts towards available stock (In stock New/Repaired, or Repaired while Repairing)"""
+    if not board:
+        return False
+    location = board.get("location")
+    condition = board.get("condition")
+    return (location == "In stock" and condition in ("New", "Repaired")) or \
+        (location == "Repairing" and condition == "Repaired")
+
+async def next_sequence(name: str, count: int = 1) -> int:
+    """Atomically reserve `count` values from a named counter and return the last one"""
+    counter = await db.counters.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if name == SYNC_SEQUENCE:
+        invalidation_bus.written_here(counter["seq"] - count + 1, counter["seq"])
+    return counter["seq"]
+
+async def read_sequence(name: str) -> int:
+    """Current value of a named counter (0 before anything was reserved from it)"""
+    counter = await db.counters.find_one({"_id": name})
+    return counter["seq"] if counter else 0
+
+# A held lock document expires this long after its holder last renewed it (e.g. after a crash)
+LOCK_TTL_SECONDS = 60
+
+@asynccontextmanager
+async def exclusive(name: str):
+    """Run a block in one worker at a time, through a lock document in db.locks.
+
+    Startup jobs such as backfills run in every worker; the ones that wait
+    here run after the holder is done and find nothing left to do. The
+    holder renews the lock while the block runs.
+    """
+    while True:
+        now = datetime.now(timezone.utc)
+        try:
+            # Matches only an expired lock; otherwise the upsert collides with the held one
+            await db.locks.update_one(
+                {"_id": name, "expires_at": {"$lt": now}},
+                {"$set": {"worker_id": WORKER_ID, "expires_at": now + timedelta(seconds=LOCK_TTL_SECONDS)}},
+                upsert=True
+            )
+            break
+        except DuplicateKeyError:
+            await asyncio.sleep(1)
+
+    async def renew():
+        while True:
+            await asyncio.sleep(LOCK_TTL_SECONDS / 3)
+            await db.locks.update_one(
+                {"_id": name, "worker_id": WORKER_ID},
+                {"$set": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=LOCK_TTL_SECONDS)}}
+            )
+
+    renewal = asyncio.create_task(renew())
+    try:
+        yield
+    finally:
+        renewal.cancel()
+        await db.locks.delete_one({"_id": name, "worker_id": WORKER_ID})
+
+class SequenceWatermarks:
+    """Counter values old enough that the writes holding their seqs have landed.
+
+    A seq is reserved before the document or event carrying it is written, so
+    a reader that sees seq N+1 cannot assume seq N has landed. Each worker
+    samples the counters every `interval` seconds and a value counts as settled
+    once it is `settle_seconds` old. A reader that stops at the settled value
+    never skips a write that landed within `settle_seconds` of reserving its
+    seq; a write slower than that can still be skipped.
+    """
+
+    def __init__(self, names, settle_seconds: float, interval: float = 1.0):
+        self.settle_seconds = settle_seconds
+        self.interval = interval
+        self.samples = {name: deque() for name in names}
+
+    async def sample(self):
+        now = time.monotonic()
+        counters = await db.counters.find({"_id": {"$in": list(self.samples)}}).to_list(None)
+        values = {counter["_id"]: counter["seq"] for counter in counters}
+        for name, samples in self.samples.items():
+            samples.append((now, values.get(name, 0)))
+            # Keep the newest settled sample and the ones still settling
+            while len(samples) > 1 and samples[1][0] <= now - self.settle_seconds:
+                samples.popleft()
+
+    def get(self, name: str) -> Optional[int]:
+        """Settled value of a counter, or None while this worker has no settled sample yet"""
+        cutoff = time.monotonic() - self.settle_seconds
+        settled = None
+        for sampled_at, value in self.samples[name]:
+            if sampled_at > cutoff:
+                break
+            settled = value
+        return settled
+
+    async def settled(self, name: str) -> int:
+        """Settled value of a counter, waiting for one right after startup"""
+        if not self.samples[name]:
+            await self.sample()
+        value = self.get(name)
+        while value is None:
+            await asyncio.sleep(self.interval)
+            value = self.get(name)
+        return value
+
+    async def run(self):
+        """Background loop sampling the counters"""
+        while True:
+            try:
+                await self.sample()
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Sequence sampling failed: {e}")
+            await asyncio.sleep(self.interval)
+
+# Delta sync: one counter shared by boards, issue requests and bulk requests
+SYNC_SEQUENCE = "updated_seq"
+
+sequence_watermarks = SequenceWatermarks(("board_events", SYNC_SEQUENCE), SEQUENCE_SETTLE_SECONDS)
+
+async def next_sync_seqs(count: int) -> List[int]:
+    """Reserve `count` consecutive delta sync sequence numbers"""
+    last_seq = await next_sequence(SYNC_SEQUENCE, count)
+    return list(range(last_seq - count + 1, last_seq + 1))
+
+async def record_tombstone(collection: str, document_id: str, requested_by: Optional[str] = None):
+    """Remember a deleted document so delta sync clients can drop it.
+
+    `requested_by` is kept for collections whose changes are filtered by owner.
+    """
+    tombstone = {
+        "collection": collection,
+        "id": document_id,
+        "updated_seq": await next_sequence(SYNC_SEQUENCE),
+        "deleted_at": datetime.now(timezone.utc)
+    }
+    if requested_by is not None:
+        tombstone["requested_by"] = requested_by
+    await db.tombstones.insert_one(tombstone)
+
+async def backfill_sync_seq(collection: str):
+    """Stamp documents written before delta sync existed with an updated_seq"""
+    missing = await db[collection].find(
+        {"updated_seq": {"$exists": False}}, {"_id": 1}
+    ).to_list(None)
+    for start in range(0, len(missing), 1000):
+        batch = missing[start:start + 1000]
+        seqs = await next_sync_seqs(len(batch))
+        await db[collection].bulk_write([
+            UpdateOne({"_id": doc["_id"], "updated_seq": {"$exists": False}}, {"$set": {"updated_seq": seq}})
+            for doc, seq in zip(batch, seqs)
+        ], ordered=False)
+
+async def add_user_names(requests: List[dict]):
+    """Fill requested_by_name / issued_to_name on request documents, looking up only the users they name"""
+    emails = {req["requested_by"] for req in requests} | {req["issued_to"] for req in requests if req.get("issued_to")}
+    if not emails:
+        return
+    users = await db.users.find({"email": {"$in": list(emails)}}, USER_NAME_PROJECTION).to_list(None)
+    user_map = {user["email"]: f"{user.get('first_name', '')} {user.get('last_name', '')}" for user in users}
+    for req in requests:
+        req["requested_by_name"] = user_map.get(req["requested_by"], req["requested_by"])
+        req["issued_to_name"] = user_map.get(req["issued_to"], req["issued_to"]) if req.get("issued_to") else ""
+
+async def get_changes(
+    collection: str, model, since: int, limit: int,
+    filter_query: Optional[dict] = None, with_user_names: bool = False
+) -> Response:
+    """Documents inserted/updated and tombstones for deletes with since < updated_seq <= the settled watermark.
+
+    Seqs are reserved before their write lands, so changes are only served up
+    to the settled SYNC_SEQUENCE value (see SequenceWatermarks): a client
+    resuming from last_seq never misses a write that landed within
+    SEQUENCE_SETTLE_SECONDS of reserving its seq, at the cost of seeing every
+    change that much later. `filter_query` applies to documents and
+    tombstones alike.
+    """
+    watermark = sequence_watermarks.get(SYNC_SEQUENCE)
+    seq_range = {"$gt": since, "$lte": since if watermark is None else watermark}
+    filter_query = filter_query or {}
+    upserts = await db[collection].find(
+        {**filter_query, "updated_seq": seq_range}, {"_id": 0}
+    ).sort("updated_seq", 1).limit(limit + 1).to_list(limit + 1)
+    tombstones = await db.tombstones.find(
+        {"collection": collection, **filter_query, "updated_seq": seq_range}, {"_id": 0, "id": 1, "updated_seq": 1}
+    ).sort("updated_seq", 1).limit(limit + 1).to_list(limit + 1)
+
+    # Merge both streams by sequence and cut at `limit` so the client can resume from last_seq
+    changes = sorted(
+        [(doc["updated_seq"], "upsert", doc) for doc in upserts] +
+        [(tomb["updated_seq"], "delete", tomb) for tomb in tombstones],
+        key=lambda change: change[0]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if with_user_names:
+        await add_user_names([doc for _, kind, doc in changes if kind == "upsert"])
+
+    return Response(orjson.dumps({
+        "since": since,
+        "last_seq": changes[-1][0] if changes else since,
+        "has_more": has_more,
+        "upserts": trusted_rows(model, [doc for _, kind, doc in changes if kind == "upsert"]),
+        "deleted": [doc["id"] for _, kind, doc in changes if kind == "delete"]
+    }, option=orjson.OPT_UTC_Z), media_type="application/json")
+
+async def record_board_events(changes: List[tuple], event_type: str, user_email: str):
+    """Append board events for a list of (before, after) board documents.
+
+    Each event carries the stock delta of the change so that historical stock
+    can be rebuilt from a checkpoint by summing deltas.
+    """
+    if not changes:
+        return
+    last_seq = await next_sequence("board_events", len(changes))
+    occurred_at = datetime.now(timezone.utc)
+    events = []
+    for offset, (before, after) in enumerate(changes):
+        board = after or before
+        events.append({
+            "seq": last_seq - len(changes) + 1 + offset,
+            "board_id": board["id"],
+            "category_id": board["category_id"],
+            "serial_number": board.get("serial_number"),
+            "event_type": event_type,
+            "location": after.get("location") if after else None,
+            "condition": after.get("condition") if after else None,
+            "stock_delta": int(is_stock_board(after)) - int(is_stock_board(before)),
+            "occurred_at": occurred_at,
+            "user": user_email
+        })
+    await db.board_events.insert_many(events)
+    await update_project_consumption(changes, occurred_at)
+    await update_repair_stints(changes, occurred_at)
+    for category_id in sorted({event["category_id"] for event in events}):
+        await invalidation_bus.notify("boards", category_id)
+    for event, (before, after) in zip(events, changes):
+        event_bus.publish({
+            "type": "board",
+            "action": event_type,
+            "id": event["board_id"],
+            "category_id": event["category_id"],
+            "location": event["location"],
+            "condition": event["condition"],
+            "updated_seq": (after or {}).get("updated_seq")
+        })
+
+async def count_stock_by_category() -> dict:
+    """Current available stock per category, computed in a single aggregation"""
+    pipeline = [
+        {"$match": {"$or": [
+            {"location": "In stock", "condition": {"$in": ["New", "Repaired"]}},
+            {"location": "Repairing", "condition": "Repaired"}
+        ]}},
+        {"$group": {"_id": "$category_id", "count": {"$sum": 1}}}
+    ]
+    results = await db.boards.aggregate(pipeline).to_list(None)
+    return {row["_id"]: row["count"] for row in results}
+
+# _id of the first checkpoint, so that workers starting together seed it once
+SEED_CHECKPOINT_ID = "seed"
+SEED_CHECKPOINT_ATTEMPTS = 5
+
+async def seed_stock_counts() -> tuple:
+    """Stock per category counted from the boards, with the board_events seq the counts include.
+
+    A board write lands before its event reserves a seq, so a write that lands
+    during the count can reserve its seq after any read of the counter, and a
+    write that lands just after the count can reserve one before it. The
+    counts only match a seq when the counter did not move from before the
+    count until SEQUENCE_SETTLE_SECONDS after it (the time SequenceWatermarks
+    allows between a write and its seq), so the count is retried until it
+    falls in such a quiet spell. After SEED_CHECKPOINT_ATTEMPTS busy ones the
+    last count is used and a change around it may be off by one.
+    """
+    for attempt in range(SEED_CHECKPOINT_ATTEMPTS):
+        before = await read_sequence("board_events")
+        stock = await count_stock_by_category()
+        after = await read_sequence("board_events")
+        await asyncio.sleep(SEQUENCE_SETTLE_SECONDS)
+        if before == after == await read_sequence("board_events"):
+            return stock, after
+    logging.getLogger(__name__).warning(
+        f"Board writes kept landing while seeding the first inventory checkpoint; seeded at seq {after}"
+    )
+    return stock, after
+
+async def create_inventory_checkpoint() -> dict:
+    """Write a compact stock checkpoint by rolling the latest one forward with new events.
+
+    The very first checkpoint is seeded from the boards collection (see
+    seed_stock_counts), so history is available from the moment event
+    recording started. Later ones only roll forward to the settled
+    board_events seq: an event that reserved a lower seq but has not been
+    inserted yet would otherwise be skipped for good.
+    """
+    latest = await db.inventory_checkpoints.find_one(sort=[("seq", -1)])
+
+    if latest is None:
+        stock, last_seq = await seed_stock_counts()
+        seed = {
+            "id": str(uuid.uuid4()),
+            "seq": last_seq,
+            "taken_at": datetime.now(timezone.utc),
+            "stock": {category_id: count for category_id, count in stock.items() if count}
+        }
+        # Another worker may have seeded meanwhile; its checkpoint is kept
+        await db.inventory_checkpoints.update_one(
+            {"_id": SEED_CHECKPOINT_ID}, {"$setOnInsert": seed}, upsert=True
+        )
+        return await db.inventory_checkpoints.find_one({"_id": SEED_CHECKPOINT_ID})
+
+    last_seq = await sequence_watermarks.settled("board_events")
+    if last_seq <= latest["seq"]:
+        return latest
+    stock = dict(latest["stock"])
+    deltas = await db.board_events.aggregate([
+        {"$match": {"seq": {"$gt": latest["seq"], "$lte": last_seq}, "stock_delta": {"$ne": 0}}},
+        {"$group": {"_id": "$category_id", "delta": {"$sum": "$stock_delta"}}}
+    ]).to_list(None)
+    for row in deltas:
+        stock[row["_id"]] = stock.get(row["_id"], 0) + row["delta"]
+
+    checkpoint = {
+        "id": str(uuid.uuid4()),
+        "seq": last_seq,
+        "taken_at": datetime.now(timezone.utc),
+        "stock": {category_id: count for category_id, count in stock.items() if count}
+    }
+    await db.inventory_checkpoints.insert_one(checkpoint)
+    return checkpoint
+
+async def get_stock_levels(as_of: Optional[datetime] = None) -> dict:
+    """Available stock per category, either now or as of a past point in time.
+
+    Historical queries load the nearest checkpoint at or before `as_of` and
+    replay only the board events recorded between it and `as_of`.
+    """
+    if as_of is None:
+        return await count_stock_by_category()
+
+    if as_of.tzinfo is None:
+        as_of = as_of.replace(tzinfo=timezone.utc)
+
+    checkpoint = await db.inventory_checkpoints.find_one(
+        {"taken_at": {"$lte": as_of}},
+        sort=[("taken_at", -1)]
+    )
+    if checkpoint is None:
+        earliest = await db.inventory_checkpoints.find_one(sort=[("taken_at", 1)])
+        detail = "No inventory history available"
+        if earliest:
+            detail += f" before {earliest['taken_at'].isoformat()}"
+        raise HTTPException(status_code=400, detail=detail)
+
+    # Bound the replay window by the following checkpoint so the cost stays
+    # proportional to one checkpoint interval rather than everything since
+    seq_range = {"$gt": checkpoint["seq"]}
+    next_checkpoint = await db.inventory_checkpoints.find_one(
+        {"taken_at": {"$gt": as_of}},
+        sort=[("taken_at", 1)]
+    )
+    if next_checkpoint:
+        seq_range["$lte"] = next_checkpoint["seq"]
+
+    stock = dict(checkpoint["stock"])
+    deltas = await db.board_events.aggregate([
+        {"$match": {"seq": seq_range, "occurred_at": {"$lte": as_of}, "stock_delta": {"$ne": 0}}},
+        {"$group": {"_id": "$category_id", "delta": {"$sum": "$stock_delta"}}}
+    ]).to_list(None)
+    for row in deltas:
+        stock[row["_id"]] = stock.get(row["_id"], 0) + row["delta"]
+    return stock
+
+async def run_inventory_checkpoints():
+    """Background loop writing periodic inventory checkpoints"""
+    while True:
+        try:
+            await create_inventory_checkpoint()
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Inventory checkpoint failed: {e}")
+        await asyncio.sleep(INVENTORY_CHECKPOINT_INTERVAL_SECONDS)
+
+# Daily category rollups
+async def compute_daily_rollups(day: Optional[datetime] = None) -> int:
+    """Write one rollup document per (category, day) with location/condition counts
+    and the number of boards inwarded and issued during that day.
+
+    Location/condition counts are a snapshot taken when the job runs, so the
+    last run of a day is what the trend chart shows for it.
+    """
+    now = datetime.now(timezone.utc)
+    day_start = (day or now).astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = day_start + timedelta(days=1)
+    day_key = day_start.strftime("%Y-%m-%d")
+
+    state_counts = await db.boards.aggregate([
+        {"$group": {
+            "_id": {"category_id": "$category_id", "location": "$location", "condition": "$condition"},
+            "count": {"$sum": 1}
+        }}
+    ]).to_list(None)
+    event_counts = await db.board_events.aggregate([
+        {"$match": {"occurred_at": {"$gte": day_start, "$lt": day_end}, "event_type": {"$in": ["created", "issued"]}}},
+        {"$group": {"_id": {"category_id": "$category_id", "event_type": "$event_type"}, "count": {"$sum": 1}}}
+    ]).to_list(None)
+
+    rollups = {}
+    def rollup_for(category_id):
+        if category_id not in rollups:
+            rollups[category_id] = {
+                "category_id": category_id,
+                "day": day_key,
+                "total_boards": 0,
+                "in_stock": 0,
+                "locations": {},
+                "conditions": {},
+                "inward_count": 0,
+                "issued_count": 0
+            }
+        return rollups[category_id]
+
+    for row in state_counts:
+        key = row["_id"]
+        rollup = rollup_for(key["category_id"])
+        location = key.get("location") or "Unknown"
+        condition = key.get("condition") or "Unknown"
+        rollup["total_boards"] += row["count"]
+        rollup["locations"][location] = rollup["locations"].get(location, 0) + row["count"]
+        rollup["conditions"][condition] = rollup["conditions"].get(condition, 0) + row["count"]
+        if is_stock_board(key):
+            rollup["in_stock"] += row["count"]
+
+    for row in event_counts:
+        rollup = rollup_for(row["_id"]["category_id"])
+        if row["_id"]["event_type"] == "created":
+            rollup["inward_count"] += row["count"]
+        else:
+            rollup["issued_count"] += row["count"]
+
+    if not rollups:
+        return 0
+
+    operations = [
+        UpdateOne(
+            {"category_id": category_id, "day": day_key},
+            {"$set": {**rollup, "computed_at": now}},
+            upsert=True
+        )
+        for category_id, rollup in rollups.items()
+    ]
+    await db.category_daily_rollups.bulk_write(operations, ordered=False)
+    return len(operations)
+
+async def run_daily_rollups():
+    """Background loop refreshing today's category rollups"""
+    while True:
+        try:
+            await compute_daily_rollups()
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Daily rollup failed: {e}")
+        await asyncio.sleep(DAILY_ROLLUP_INTERVAL_SECONDS)
+
+# Project consumption rollups
+NON_ISSUED_LOCATIONS = ("In stock", "Repairing")
+
+def consumed_by_project(board: Optional[dict]) -> Optional[str]:
+    """Project number a board is currently issued against, if any"""
+    if not board or board.get("location") in NON_ISSUED_LOCATIONS:
+        return None
+    return board.get("project_number") or None
+
+async def update_project_consumption(changes: List[tuple], occurred_at: datetime):
+    """Incrementally maintain per-project, per-category consumption from board changes.
+
+    A board moving into an issued location counts as consumed by its project;
+    moving back to stock or repair counts as a return against the project it
+    was issued to. Deleting an issued board leaves its consumption in place.
+    """
+    increments = {}
+    for before, after in changes:
+        if after is None:
+            continue
+        previous_project = consumed_by_project(before)
+        current_project = consumed_by_project(after)
+        if previous_project == current_project and (before or {}).get("category_id") == after["category_id"]:
+            continue
+        if previous_project:
+            counts = increments.setdefault((previous_project, before["category_id"]), {"issued": 0, "returned": 0})
+            counts["returned"] += 1
+        if current_project:
+            counts = increments.setdefault((current_project, after["category_id"]), {"issued": 0, "returned": 0})
+            counts["issued"] += 1
+
+    if not increments:
+        return
+
+    operations = []
+    for (project_number, category_id), counts in increments.items():
+        update = {
+            "$inc": {
+                "issued_count": counts["issued"],
+                "returned_count": counts["returned"],
+                "net_consumed": counts["issued"] - counts["returned"]
+            },
+            "$set": {"updated_at": occurred_at}
+        }
+        if counts["issued"]:
+            update["$set"]["last_issued_at"] = occurred_at
+        operations.append(UpdateOne(
+            {"project_number": project_number, "category_id": category_id},
+            update,
+            upsert=True
+        ))
+    await db.project_consumption.bulk_write(operations, ordered=False)
+
+async def update_repair_stints(changes: List[tuple], occurred_at: datetime):
+    """Open a repair stint when a board enters Repairing and close it when it leaves"""
+    opened = []
+    closed = []
+    for before, after in changes:
+        was_repairing = bool(before) and before.get("location") == "Repairing"
+        is_repairing = bool(after) and after.get("location") == "Repairing"
+        if was_repairing == is_repairing:
+            continue
+        if is_repairing:
+            opened.append({
+                "board_id": after["id"],
+                "category_id": after["category_id"],
+                "started_at": occurred_at,
+                "ended_at": None,
+                "duration_hours": None
+            })
+        else:
+            closed.append(before["id"])
+
+    if closed:
+        stints = await db.repair_stints.find(
+            {"board_id": {"$in": closed}, "ended_at": None}, {"_id": 1, "started_at": 1}
+        ).to_list(None)
+        operations = []
+        for stint in stints:
+            started_at = stint["started_at"]
+            if started_at.tzinfo is None:
+                started_at = started_at.replace(tzinfo=timezone.utc)
+            operations.append(UpdateOne(
+                {"_id": stint["_id"]},
+                {"$set": {
+                    "ended_at": occurred_at,
+                    "duration_hours": (occurred_at - started_at).total_seconds() / 3600
+                }}
+            ))
+        if operations:
+            await db.repair_stints.bulk_write(operations, ordered=False)
+    if opened:
+        await db.repair_stints.insert_many(opened)
+
+async def backfill_repair_stints():
+    """Open a stint for boards that are in Repairing without one (moved there before stints were recorded).
+
+    The move is dated by the board's latest inward or issue timestamp:
+    update_board stamps issued_date_time on a move to Repairing, and boards
+    inwarded straight into Repairing only have inward_date_time.
+    """
+    repairing = await db.boards.find(
+        {"location": "Repairing"}, {"_id": 0, "id": 1, "category_id": 1, "inward_date_time": 1, "issued_date_time": 1}
+    ).to_list(None)
+    if not repairing:
+        return
+    with_stint = set(await db.repair_stints.distinct(
+        "board_id", {"board_id": {"$in": [board["id"] for board in repairing]}, "ended_at": None}
+    ))
+    now = datetime.now(timezone.utc)
+    stints = []
+    for board in repairing:
+        if board["id"] in with_stint:
+            continue
+        moved_at = [
+            value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+            for value in (board.get("inward_date_time"), board.get("issued_date_time"))
+            if isinstance(value, datetime)
+        ]
+        stints.append({
+            "board_id": board["id"],
+            "category_id": board["category_id"],
+            "started_at": max(moved_at) if moved_at else now,
+            "ended_at": None,
+            "duration_hours": None
+        })
+    if stints:
+        await db.repair_stints.insert_many(stints)
+
+async def rebuild_project_consumption():
+    """Seed project consumption from boards currently issued against a project"""
+    issued = await db.boards.aggregate([
+        {"$match": {"location": {"$nin": list(NON_ISSUED_LOCATIONS)}, "project_number": {"$nin": [None, ""]}}},
+        {"$group": {
+            "_id": {"project_number": "$project_number", "category_id": "$category_id"},
+            "count": {"$sum": 1},
+            "last_issued_at": {"$max": "$issued_date_time"}
+        }}
+    ]).to_list(None)
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne(
+            {"project_number": row["_id"]["project_number"], "category_id": row["_id"]["category_id"]},
+            {"$set": {
+                "issued_count": row["count"],
+                "returned_count": 0,
+                "net_consumed": row["count"],
+                "last_issued_at": row["last_issued_at"],
+                "updated_at": now
+            }},
+            upsert=True
+        )
+        for row in issued
+    ]
+    if operations:
+        await db.project_consumption.bulk_write(operations, ordered=False)
+
 # Board routes
 @api_router.post("/boards", response_model=Board)
 async def create_board(board_data: BoardCreate, current_user: User = Depends(get_current_user)):
     # Verify category exists
-    category = await db.categories.find_one({"id": board_data.category_id})
+    category = await category_catalog.get(board_data.category_id)
     if not category:
         raise HTTPException(status_code=400, detail="Category not found")
     
@@ -457,18 +1922,35 @@ async def create_board(board_data: BoardCreate, current_user: User = Depends(get
     existing = await db.boards.find_one({
         "category_id": board_data.category_id,
         "serial_number": board_data.serial_number
-    })
+    }, EXISTS_PROJECTION)
     if existing:
         raise HTTPException(status_code=400, detail="Serial number already exists in this category")
     
-    board = Board(**board_data.dict(), created_by=current_user.email)
-    await db.boards.insert_one(board.dict())
+    board = Board(**board_data.dict(), created_by=current_user.email, updated_seq=await next_sequence(SYNC_SEQUENCE))
+    board_doc = board.dict()
+    await db.boards.insert_one(board_doc)
+    await record_board_events([(None, board_doc)], "created", current_user.email)
     return board
 
+BOARD_LIST_LIMIT = 1000
+
 @api_router.get("/boards", response_model=List[Board])
-async def get_boards(current_user: User = Depends(get_current_user)):
-    boards = await db.boards.find().to_list(1000)
-    return [Board(**board) for board in boards]
+async def get_boards(
+    fields: Optional[str] = Query(None, description="Comma-separated board fields to return, e.g. serial_number,category_id,condition"),
+    current_user: User = Depends(get_current_user)
+):
+    response_model, projection = select_fields(Board, fields)
+    boards = await db.boards.find({}, projection).to_list(BOARD_LIST_LIMIT)
+    return trusted_json_response(response_model, boards)
+
+@api_router.get("/boards/changes")
+async def get_board_changes(
+    since: int = Query(0, ge=0, description="Last updated_seq the client has seen"),
+    limit: int = Query(1000, ge=1, le=5000),
+    current_user: User = Depends(get_current_user)
+):
+    """Boards inserted, updated or deleted since a delta sync sequence"""
+    return await get_changes("boards", Board, since, limit)
 
 @api_router.get("/boards/{board_id}", response_model=Board)
 async def get_board(board_id: str, current_user: User = Depends(get_current_user)):
@@ -489,6 +1971,7 @@ async def update_board(board_id: str, board_data: BoardUpdate, current_user: Use
     if update_data.get("location") and update_data["location"] != "In stock":
         update_data["issued_date_time"] = datetime.now(timezone.utc)
         update_data["issued_by"] = current_user.email
+    update_data["updated_seq"] = await next_sequence(SYNC_SEQUENCE)
     
     await db.boards.update_one(
         {"id": board_id},
@@ -496,14 +1979,17 @@ async def update_board(board_id: str, board_data: BoardUpdate, current_user: Use
     )
     
     updated_board = await db.boards.find_one({"id": board_id})
+    await record_board_events([(board, updated_board)], "updated", current_user.email)
     return Board(**updated_board)
 
 @api_router.delete("/boards/{board_id}")
 async def delete_board(board_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.boards.delete_one({"id": board_id})
-    if result.deleted_count == 0:
+    deleted_board = await db.boards.find_one_and_delete({"id": board_id})
+    if not deleted_board:
         raise HTTPException(status_code=404, detail="Board not found")
     
+    await record_board_events([(deleted_board, None)], "deleted", current_user.email)
+    await record_tombstone("boards", board_id)
     return {"message": "Board deleted successfully"}
 
 # Search route
@@ -513,8 +1999,10 @@ async def search_boards(
     category_id: Optional[str] = None,
     location: Optional[str] = None,
     condition: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated board fields to return"),
     current_user: User = Depends(get_current_user)
 ):
+    response_model, projection = select_fields(Board, fields)
     filter_conditions = {}
     
     if category_id:
@@ -533,14 +2021,14 @@ async def search_boards(
             {"comments": {"$regex": query, "$options": "i"}}
         ]
     
-    boards = await db.boards.find(filter_conditions).to_list(1000)
-    return [Board(**board) for board in boards]
+    boards = await db.boards.find(filter_conditions, projection).to_list(1000)
+    return trusted_json_response(response_model, boards)
 
 # Issue Request routes
 @api_router.post("/issue-requests", response_model=IssueRequest)
 async def create_issue_request(request_data: IssueRequestCreate, current_user: User = Depends(get_current_user)):
     # Verify category exists
-    category = await db.categories.find_one({"id": request_data.category_id})
+    category = await category_catalog.get(request_data.category_id)
     if not category:
         raise HTTPException(status_code=400, detail="Category not found")
     
@@ -553,12 +2041,17 @@ async def create_issue_request(request_data: IssueRequestCreate, current_user: U
                 {"location": "In stock", "condition": {"$in": ["New", "Repaired"]}},
                 {"location": "Repairing", "condition": "Repaired"}
             ]
-        })
+        }, EXISTS_PROJECTION)
         if not board:
             raise HTTPException(status_code=400, detail="Board not available or not found")
     
-    issue_request = IssueRequest(**request_data.dict(), requested_by=current_user.email)
+    issue_request = IssueRequest(
+        **request_data.dict(),
+        requested_by=current_user.email,
+        updated_seq=await next_sequence(SYNC_SEQUENCE)
+    )
     await db.issue_requests.insert_one(issue_request.dict())
+    await publish_request_event("issue_request", "created", issue_request.dict())
     return issue_request
 
 @api_router.post("/issue-requests/bulk")
@@ -572,7 +2065,7 @@ async def create_bulk_issue_request(bulk_request: BulkIssueRequestCreate, curren
     # Validate all categories and check availability
     for category_request in bulk_request.categories:
         # Verify category exists
-        category = await db.categories.find_one({"id": category_request.category_id})
+        category = await category_catalog.get(category_request.category_id)
         if not category:
             failed_categories.append({
                 "category_id": category_request.category_id,
@@ -621,10 +2114,12 @@ async def create_bulk_issue_request(bulk_request: BulkIssueRequestCreate, curren
         requested_by=current_user.email,
         issued_to=bulk_request.issued_to,
         project_number=bulk_request.project_number,
-        comments=bulk_request.comments
+        comments=bulk_request.comments,
+        updated_seq=await next_sequence(SYNC_SEQUENCE)
     )
     
     await db.bulk_issue_requests.insert_one(bulk_issue_request.dict())
+    await publish_request_event("bulk_issue_request", "created", bulk_issue_request.dict())
     
     return {
         "message": f"Successfully created bulk issue request for {total_boards} boards",
@@ -634,6 +2129,33 @@ async def create_bulk_issue_request(bulk_request: BulkIssueRequestCreate, curren
         "boards": [{"category_id": br.category_id, "quantity": br.quantity} for br in board_requests]
     }
 
+@api_router.get("/issue-requests/changes")
+async def get_issue_request_changes(
+    since: int = Query(0, ge=0, description="Last updated_seq the client has seen"),
+    limit: int = Query(1000, ge=1, le=5000),
+    current_user: User = Depends(get_current_user)
+):
+    """Issue requests inserted, updated or deleted since a delta sync sequence"""
+    if not check_permission(current_user, "view_issue_requests"):
+        raise HTTPException(status_code=403, detail="Permission denied: view_issue_requests required")
+    
+    # Users can see their own requests, admins can see all
+    filter_query = {}
+    if current_user.role != "admin":
+        filter_query["requested_by"] = current_user.email
+    return await get_changes("issue_requests", IssueRequest, since, limit, filter_query, with_user_names=True)
+
+@api_router.get("/bulk-issue-requests/changes")
+async def get_bulk_issue_request_changes(
+    since: int = Query(0, ge=0, description="Last updated_seq the client has seen"),
+    limit: int = Query(1000, ge=1, le=5000),
+    current_user: User = Depends(get_current_user)
+):
+    """Bulk issue requests inserted, updated or deleted since a delta sync sequence"""
+    if not check_permission(current_user, "view_issue_requests"):
+        raise HTTPException(status_code=403, detail="Permission denied: view_issue_requests required")
+    return await get_changes("bulk_issue_requests", BulkIssueRequest, since, limit, with_user_names=True)
+
 @api_router.get("/issue-requests", response_model=List[IssueRequest])
 async def get_issue_requests(current_user: User = Depends(get_current_user)):
     if not check_permission(current_user, "view_issue_requests"):
@@ -644,21 +2166,9 @@ async def get_issue_requests(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         filter_query["requested_by"] = current_user.email
     
-    requests = await db.issue_requests.find(filter_query).to_list(1000)
-    
-    # Get all users to populate names
-    all_users = await db.users.find({}).to_list(1000)
-    user_map = {user["email"]: f"{user.get('first_name', '')} {user.get('last_name', '')}" for user in all_users}
-    
-    # Enhance requests with user names
-    enhanced_requests = []
-    for req in requests:
-        req_dict = dict(req)
-        req_dict["requested_by_name"] = user_map.get(req["requested_by"], req["requested_by"])
-        req_dict["issued_to_name"] = user_map.get(req["issued_to"], req["issued_to"]) if req.get("issued_to") else ""
-        enhanced_requests.append(IssueRequest(**req_dict))
-    
-    return enhanced_requests
+    requests = await db.issue_requests.find(filter_query, {"_id": 0}).to_list(1000)
+    await add_user_names(requests)
+    return trusted_json_response(IssueRequest, requests)
 
 @api_router.get("/bulk-issue-requests", response_model=List[BulkIssueRequest])
 async def get_bulk_issue_requests(current_user: User = Depends(get_current_user)):
@@ -666,20 +2176,8 @@ async def get_bulk_issue_requests(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=403, detail="Permission denied: view_issue_requests required")
     
     requests = await db.bulk_issue_requests.find().to_list(length=None)
-    
-    # Get all users to populate names
-    all_users = await db.users.find({}).to_list(1000)
-    user_map = {user["email"]: f"{user.get('first_name', '')} {user.get('last_name', '')}" for user in all_users}
-    
-    # Enhance requests with user names
-    enhanced_requests = []
-    for req in requests:
-        req_dict = dict(req)
-        req_dict["requested_by_name"] = user_map.get(req["requested_by"], req["requested_by"])
-        req_dict["issued_to_name"] = user_map.get(req["issued_to"], req["issued_to"]) if req.get("issued_to") else ""
-        enhanced_requests.append(BulkIssueRequest(**req_dict))
-    
-    return enhanced_requests
+    await add_user_names(requests)
+    return [BulkIssueRequest(**req) for req in requests]
 
 @api_router.post("/boards/preview-auto-select")
 async def preview_auto_select_boards(request: dict, current_user: User = Depends(get_current_user)):
@@ -690,17 +2188,20 @@ async def preview_auto_select_boards(request: dict, current_user: User = Depends
     if not category_id or quantity <= 0:
         raise HTTPException(status_code=400, detail="Category ID and quantity required")
     
-    # Get available boards
-    available_boards = await db.boards.find({
+    # Count available boards, then fetch only the ones that would be selected
+    available_filter = {
         "category_id": category_id,
         "location": "In stock",
         "condition": "New"
-    }).to_list(None)
+    }
+    total_available = await db.boards.count_documents(available_filter)
     
-    if len(available_boards) < quantity:
-        raise HTTPException(status_code=400, detail=f"Not enough boards available. Requested: {quantity}, Available: {len(available_boards)}")
+    if total_available < quantity:
+        raise HTTPException(status_code=400, detail=f"Not enough boards available. Requested: {quantity}, Available: {total_available}")
     
-    selected_boards = available_boards[:quantity]
+    selected_boards = await db.boards.find(
+        available_filter, {"_id": 0, "id": 1, "serial_number": 1, "condition": 1}
+    ).limit(quantity).to_list(quantity)
     return {
         "selected_boards": [
             {
@@ -709,7 +2210,7 @@ async def preview_auto_select_boards(request: dict, current_user: User = Depends
                 "condition": board["condition"]
             } for board in selected_boards
         ],
-        "total_available": len(available_boards)
+        "total_available": total_available
     }
 
 @api_router.put("/issue-requests/{request_id}", response_model=IssueRequest)
@@ -718,7 +2219,7 @@ async def update_issue_request(request_id: str, update_data: IssueRequestUpdate,
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can update issue requests")
     
-    request_doc = await db.issue_requests.find_one({"id": request_id})
+    request_doc = await db.issue_requests.find_one({"id": request_id}, EXISTS_PROJECTION)
     if not request_doc:
         raise HTTPException(status_code=404, detail="Issue request not found")
     
@@ -726,6 +2227,7 @@ async def update_issue_request(request_id: str, update_data: IssueRequestUpdate,
     if update_data.status == "approved":
         update_dict["approved_by"] = current_user.email
         update_dict["approved_date_time"] = datetime.now(timezone.utc)
+    update_dict["updated_seq"] = await next_sequence(SYNC_SEQUENCE)
     
     await db.issue_requests.update_one(
         {"id": request_id},
@@ -733,6 +2235,7 @@ async def update_issue_request(request_id: str, update_data: IssueRequestUpdate,
     )
     
     updated_request = await db.issue_requests.find_one({"id": request_id})
+    await publish_request_event("issue_request", "updated", updated_request)
     return IssueRequest(**updated_request)
 
 class BulkIssueRequestUpdate(BaseModel):
@@ -745,7 +2248,7 @@ async def update_bulk_issue_request(request_id: str, update_data: BulkIssueReque
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can update bulk issue requests")
     
-    request_doc = await db.bulk_issue_requests.find_one({"id": request_id})
+    request_doc = await db.bulk_issue_requests.find_one({"id": request_id}, EXISTS_PROJECTION)
     if not request_doc:
         raise HTTPException(status_code=404, detail="Bulk issue request not found")
     
@@ -753,6 +2256,7 @@ async def update_bulk_issue_request(request_id: str, update_data: BulkIssueReque
     if update_data.status == "approved":
         update_dict["approved_by"] = current_user.email
         update_dict["approved_date"] = datetime.now(timezone.utc).isoformat()
+    update_dict["updated_seq"] = await next_sequence(SYNC_SEQUENCE)
     
     await db.bulk_issue_requests.update_one(
         {"id": request_id},
@@ -760,6 +2264,7 @@ async def update_bulk_issue_request(request_id: str, update_data: BulkIssueReque
     )
     
     updated_request = await db.bulk_issue_requests.find_one({"id": request_id})
+    await publish_request_event("bulk_issue_request", "updated", updated_request)
     return BulkIssueRequest(**updated_request)
 
 @api_router.delete("/issue-requests/{request_id}")
@@ -768,10 +2273,12 @@ async def delete_issue_request(request_id: str, current_user: User = Depends(get
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can delete issue requests")
     
-    result = await db.issue_requests.delete_one({"id": request_id})
-    if result.deleted_count == 0:
+    deleted_request = await db.issue_requests.find_one_and_delete({"id": request_id}, {"_id": 0, "id": 1, "requested_by": 1})
+    if not deleted_request:
         raise HTTPException(status_code=404, detail="Issue request not found")
     
+    await record_tombstone("issue_requests", request_id, deleted_request["requested_by"])
+    await publish_request_event("issue_request", "deleted", deleted_request)
     return {"message": "Issue request deleted successfully"}
 
 @api_router.delete("/bulk-issue-requests/{request_id}")
@@ -783,6 +2290,8 @@ async def delete_bulk_issue_request(request_id: str, current_user: User = Depend
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Request not found")
     
+    await record_tombstone("bulk_issue_requests", request_id)
+    await publish_request_event("bulk_issue_request", "deleted", {"id": request_id})
     return {"message": "Bulk request deleted successfully"}
 
 class OutwardRequest(BaseModel):
@@ -826,20 +2335,23 @@ async def issue_board(
                                 ]
                             }
                             
-                            board = await db.boards.find_one(query)
+                            board = await db.boards.find_one(query, BOARD_STATE_PROJECTION)
                             if board:
                                 # Update board
+                                issue_fields = {
+                                    "location": "Issued for machine",
+                                    "issued_by": outward_data.issued_by_override or current_user.email,
+                                    "issued_to": outward_data.issued_to_override or bulk_request_doc["issued_to"],
+                                    "project_number": bulk_request_doc["project_number"],
+                                    "issued_date_time": datetime.now(timezone.utc),
+                                    "comments": outward_data.comments or "",
+                                    "updated_seq": await next_sequence(SYNC_SEQUENCE)
+                                }
                                 await db.boards.update_one(
                                     {"id": board["id"]},
-                                    {"$set": {
-                                        "location": "Issued for machine",
-                                        "issued_by": outward_data.issued_by_override or current_user.email,
-                                        "issued_to": outward_data.issued_to_override or bulk_request_doc["issued_to"],
-                                        "project_number": bulk_request_doc["project_number"],
-                                        "issued_date_time": datetime.now(timezone.utc),
-                                        "comments": outward_data.comments or ""
-                                    }}
+                                    {"$set": issue_fields}
                                 )
+                                await record_board_events([(board, {**board, **issue_fields})], "issued", current_user.email)
                                 issued_boards.append(board["serial_number"])
                             else:
                                 failed_boards.append(f"Category: {board_request['category_id']}, Serial: {board_request['serial_number']}")
@@ -854,26 +2366,32 @@ async def issue_board(
                                     {"location": "In stock", "condition": {"$in": ["New", "Repaired"]}},
                                     {"location": "Repairing", "condition": "Repaired"}
                                 ]
-                            }).to_list(quantity)
+                            }, BOARD_STATE_PROJECTION).to_list(quantity)
                             
                             if len(available_boards) < quantity:
                                 failed_boards.append(f"Category: {board_request['category_id']} - Requested {quantity}, only {len(available_boards)} available")
                                 continue
                             
                             # Issue the boards
-                            for board in available_boards[:quantity]:
+                            issued_changes = []
+                            sync_seqs = await next_sync_seqs(quantity)
+                            for board, sync_seq in zip(available_boards[:quantity], sync_seqs):
+                                issue_fields = {
+                                    "location": "Issued for machine",
+                                    "issued_by": outward_data.issued_by_override or current_user.email,
+                                    "issued_to": outward_data.issued_to_override or bulk_request_doc["issued_to"],
+                                    "project_number": bulk_request_doc["project_number"],
+                                    "issued_date_time": datetime.now(timezone.utc),
+                                    "comments": outward_data.comments or "",
+                                    "updated_seq": sync_seq
+                                }
                                 await db.boards.update_one(
                                     {"id": board["id"]},
-                                    {"$set": {
-                                        "location": "Issued for machine",
-                                        "issued_by": outward_data.issued_by_override or current_user.email,
-                                        "issued_to": outward_data.issued_to_override or bulk_request_doc["issued_to"],
-                                        "project_number": bulk_request_doc["project_number"],
-                                        "issued_date_time": datetime.now(timezone.utc),
-                                        "comments": outward_data.comments or ""
-                                    }}
+                                    {"$set": issue_fields}
                                 )
+                                issued_changes.append((board, {**board, **issue_fields}))
                                 issued_boards.append(board["serial_number"])
+                            await record_board_events(issued_changes, "issued", current_user.email)
                         
                     except Exception as e:
                         failed_boards.append(f"Category: {board_request['category_id']} - Error: {str(e)}")
@@ -892,10 +2410,12 @@ async def issue_board(
                 else:
                     status = "approved"  # Keep as approved if nothing was issued
                 
+                bulk_update = {"status": status, "updated_seq": await next_sequence(SYNC_SEQUENCE)}
                 await db.bulk_issue_requests.update_one(
                     {"id": outward_data.request_id},
-                    {"$set": {"status": status}}
+                    {"$set": bulk_update}
                 )
+                await publish_request_event("bulk_issue_request", "updated", {**bulk_request_doc, **bulk_update})
                 
                 if len(issued_boards) > 0:
                     message = f"Bulk request processed: {len(issued_boards)} boards issued"
@@ -922,28 +2442,37 @@ async def issue_board(
         if request_doc.get("serial_number"):
             query["serial_number"] = request_doc["serial_number"]
         
-        board = await db.boards.find_one(query)
+        board = await db.boards.find_one(query, BOARD_STATE_PROJECTION)
         if not board:
             raise HTTPException(status_code=400, detail="No available board found")
         
         # Update board
+        issue_fields = {
+            "location": "Issued for machine",
+            "issued_by": outward_data.issued_by_override or current_user.email,
+            "issued_to": outward_data.issued_to_override or request_doc["issued_to"],
+            "project_number": request_doc["project_number"],
+            "issued_date_time": datetime.now(timezone.utc),
+            "comments": outward_data.comments or "",
+            "updated_seq": await next_sequence(SYNC_SEQUENCE)
+        }
         await db.boards.update_one(
             {"id": board["id"]},
-            {"$set": {
-                "location": "Issued for machine",
-                "issued_by": outward_data.issued_by_override or current_user.email,
-                "issued_to": outward_data.issued_to_override or request_doc["issued_to"],
-                "project_number": request_doc["project_number"],
-                "issued_date_time": datetime.now(timezone.utc),
-                "comments": outward_data.comments or ""
-            }}
+            {"$set": issue_fields}
         )
+        await record_board_events([(board, {**board, **issue_fields})], "issued", current_user.email)
         
         # Update request status
+        request_update = {
+            "status": "issued",
+            "serial_number": board["serial_number"],
+            "updated_seq": await next_sequence(SYNC_SEQUENCE)
+        }
         await db.issue_requests.update_one(
             {"id": outward_data.request_id},
-            {"$set": {"status": "issued", "serial_number": board["serial_number"]}}
+            {"$set": request_update}
         )
+        await publish_request_event("issue_request", "issued", {**request_doc, **request_update})
         
         return {"message": "Board issued successfully", "serial_number": board["serial_number"]}
     
@@ -955,21 +2484,24 @@ async def issue_board(
                 {"location": "In stock", "condition": {"$in": ["New", "Repaired"]}},
                 {"location": "Repairing", "condition": "Repaired"}
             ]
-        })
+        }, BOARD_STATE_PROJECTION)
         if not board:
             raise HTTPException(status_code=400, detail="Board not available")
         
+        issue_fields = {
+            "location": "Issued for machine",
+            "issued_by": outward_data.issued_by_override or current_user.email,
+            "issued_to": outward_data.issued_to_override or outward_data.issued_to,
+            "project_number": outward_data.project_number or "",
+            "issued_date_time": datetime.now(timezone.utc),
+            "comments": outward_data.comments or "",
+            "updated_seq": await next_sequence(SYNC_SEQUENCE)
+        }
         await db.boards.update_one(
             {"id": outward_data.board_id},
-            {"$set": {
-                "location": "Issued for machine",
-                "issued_by": outward_data.issued_by_override or current_user.email,
-                "issued_to": outward_data.issued_to_override or outward_data.issued_to,
-                "project_number": outward_data.project_number or "",
-                "issued_date_time": datetime.now(timezone.utc),
-                "comments": outward_data.comments or ""
-            }}
+            {"$set": issue_fields}
         )
+        await record_board_events([(board, {**board, **issue_fields})], "issued", current_user.email)
         
         return {"message": "Board issued successfully", "serial_number": board["serial_number"]}
     
@@ -978,12 +2510,18 @@ async def issue_board(
 
 # User Management routes (Admin only)
 @api_router.get("/users", response_model=List[User])
-async def get_users(current_user: User = Depends(get_current_user)):
+async def get_users(
+    fields: Optional[str] = Query(None, description="Comma-separated user fields to return"),
+    current_user: User = Depends(get_current_user)
+):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can view users")
     
-    users = await db.users.find().to_list(1000)
-    return [User(**user) for user in users]
+    response_model, projection = select_fields(User, fields)
+    if not fields:
+        projection["password"] = 0
+    users = await db.users.find({}, projection).to_list(1000)
+    return trusted_json_response(response_model, users)
 
 @api_router.put("/users/{user_email}", response_model=User)
 async def update_user(user_email: str, update_data: UserUpdate, current_user: User = Depends(get_current_user)):
@@ -999,6 +2537,7 @@ async def update_user(user_email: str, update_data: UserUpdate, current_user: Us
         {"email": user_email},
         {"$set": update_dict}
     )
+    await invalidation_bus.notify("users", user["id"])
     
     updated_user = await db.users.find_one({"email": user_email})
     return User(**updated_user)
@@ -1043,6 +2582,7 @@ async def delete_user(user_id: str, current_user: User = Depends(get_current_use
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    await invalidation_bus.notify("users", user_id)
     return {"message": f"User {user['email']} deleted successfully"}
 
 @api_router.put("/users/{user_id}/permissions")
@@ -1065,6 +2605,7 @@ async def update_user_permissions(user_id: str, permission_data: UserPermissionU
         {"id": user_id},
         {"$set": {"permissions": permission_data.permissions}}
     )
+    await invalidation_bus.notify("users", user_id)
     
     updated_user = await db.users.find_one({"id": user_id})
     return {"message": f"Permissions updated for {user['email']}", "user": User(**updated_user)}
@@ -1083,25 +2624,313 @@ async def get_my_permissions(current_user: User = Depends(get_current_user)):
     effective_permissions = get_user_permissions(current_user.role, current_user.permissions)
     return {"permissions": effective_permissions}
 
+# Report cache: request coalescing and stale-while-revalidate
+class ReportCache:
+    """Shares and caches report computations between identical requests.
+
+    The first caller for a key starts the computation as its own task;
+    callers arriving while it runs await the same task. The task is
+    shielded, so a disconnecting client does not cancel it for the others.
+
+    A result is served as is while younger than `fresh_ttl` and nothing it
+    depends on has been written since its computation started. Until
+    `stale_ttl` it is still served immediately, but the first such request
+    starts a background refresh; older results are recomputed while the
+    caller waits. Board writes make the results for the category they touch
+    and for reports over all categories stale; other writes the cache is
+    registered for make everything stale. A refresh that a write overtook
+    still stores its result, and starts another refresh if the report was
+    requested meanwhile.
+    """
+
+    def __init__(self):
+        # key -> (task, category_id, version, compute, started_at)
+        self.in_flight = {}
+        # key -> (started_at, value, category_id, version)
+        self.results = {}
+        self.requested_at = {}
+        # Bumped by writes that affect every report
+        self.generation = 0
+        # Bumped by board writes: in total (for reports over all categories) and per category
+        self.board_writes = 0
+        self.category_generations = defaultdict(int)
+        self.stats = defaultdict(lambda: {"calls": 0, "computed": 0, "coalesced": 0, "cached": 0, "stale": 0})
+
+    async def run(self, key: tuple, compute, fresh_ttl: float = 0, stale_ttl: float = 0,
+                  category_id: Optional[str] = None):
+        stats = self.stats[key[0]]
+        stats["calls"] += 1
+        now = self.requested_at[key] = time.monotonic()
+        version = self._version(category_id)
+        cached = self.results.get(key)
+        if cached:
+            started_at, value, _, cached_version = cached
+            age = now - started_at
+            if age < fresh_ttl and cached_version == version:
+                stats["cached"] += 1
+                return value
+            if age < stale_ttl:
+                stats["stale"] += 1
+                if key not in self.in_flight:
+                    stats["computed"] += 1
+                    self._start(key, compute, category_id)
+                return value
+        running = self.in_flight.get(key)
+        # A computation started before the latest write may not reflect it
+        if running is None or running[2] != version:
+            stats["computed"] += 1
+            task = self._start(key, compute, category_id)
+        else:
+            task = running[0]
+            stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _version(self, category_id: Optional[str]) -> tuple:
+        """Write counters a result for `category_id` (None: all categories) depends on"""
+        board_writes = self.board_writes if category_id is None else self.category_generations[category_id]
+        return self.generation, board_writes
+
+    def _start(self, key: tuple, compute, category_id: Optional[str]) -> asyncio.Task:
+        task = asyncio.ensure_future(compute())
+        version = self._version(category_id)
+        self.in_flight[key] = (task, category_id, version, compute, time.monotonic())
+        task.add_done_callback(functools.partial(self._finished, key))
+        return task
+
+    def _finished(self, key: tuple, task: asyncio.Task):
+        running = self.in_flight.get(key)
+        if running is None or running[0] is not task:
+            # Replaced by a computation started after a write; that one stores the result
+            return
+        del self.in_flight[key]
+        _, category_id, version, compute, started_at = running
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            # Callers awaiting the task see the exception; background refreshes only log it
+            logging.getLogger(__name__).warning(f"Report {key[0]} failed: {task.exception()}")
+            return
+        self.results[key] = (started_at, task.result(), category_id, version)
+        # A write during the computation may not be reflected in its result: refresh
+        # again, but only for a report that is still being asked for
+        if version != self._version(category_id) and self.requested_at.get(key, 0) >= started_at:
+            self._start(key, compute, category_id)
+
+    def invalidate(self, collection: Optional[str] = None, key: Optional[str] = None):
+        """Make the results a write may affect stale; they are still served until refreshed"""
+        if collection == "boards" and key:
+            self.board_writes += 1
+            self.category_generations[key] += 1
+        else:
+            self.generation += 1
+
+report_cache = ReportCache()
+invalidation_bus.register(
+    "report_cache", ["boards", "categories", "issue_requests", "bulk_issue_requests"], report_cache.invalidate
+)
+
+def cached_report(name: str, permission: str, fresh_ttl: float = REPORT_RESULT_TTL_SECONDS,
+                  stale_ttl: float = REPORT_STALE_TTL_SECONDS):
+    """Route decorator (below @api_router.get) serving a handler through report_cache.
+
+    Requests share results when their query/path parameters match and the
+    users agree on `permission`, the only thing the handler's result may
+    depend on besides the parameters. A category_id parameter limits which
+    board writes invalidate the result.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(**kwargs):
+            current_user = kwargs["current_user"]
+            params = tuple(sorted(
+                (key, value.isoformat() if isinstance(value, datetime) else value)
+                for key, value in kwargs.items() if key != "current_user"
+            ))
+            key = (name, params, check_permission(current_user, permission))
+            return await report_cache.run(
+                key, lambda: handler(**kwargs), fresh_ttl, stale_ttl, kwargs.get("category_id")
+            )
+        return wrapper
+    return decorator
+
+@api_router.get("/admin/report-cache")
+async def get_report_cache_stats(current_user: User = Depends(get_current_user)):
+    """Per-report counts of calls, computations run, and computations saved by coalescing or caching"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view report statistics")
+    
+    return {
+        "fresh_ttl_seconds": REPORT_RESULT_TTL_SECONDS,
+        "stale_ttl_seconds": REPORT_STALE_TTL_SECONDS,
+        "cached_results": len(report_cache.results),
+        "in_flight": len(report_cache.in_flight),
+        "reports": {
+            name: {**stats, "saved": stats["coalesced"] + stats["cached"] + stats["stale"]}
+            for name, stats in sorted(report_cache.stats.items())
+        }
+    }
+
 # Reports endpoints
+@api_router.get("/reports/stock")
+@cached_report("stock", "view_reports")
+async def get_stock_report(
+    as_of: Optional[datetime] = Query(None, description="Report stock as it was at this point in time"),
+    current_user: User = Depends(get_current_user)
+):
+    """Get available stock for every category, now or as of a past date"""
+    if not check_permission(current_user, "view_reports"):
+        raise HTTPException(status_code=403, detail="Permission denied: view_reports required")
+    
+    categories = await category_catalog.as_of(as_of)
+    stock_levels = await get_stock_levels(as_of)
+    
+    return [
+        {
+            "category_id": category["id"],
+            "category_name": category["name"],
+            "manufacturer": category["manufacturer"],
+            "version": category["version"],
+            "current_stock": stock_levels.get(category["id"], 0),
+            "minimum_stock_quantity": category.get("minimum_stock_quantity", 0)
+        }
+        for category in categories
+    ]
+
+@api_router.get("/reports/stock-trend")
+@cached_report("stock-trend", "view_reports")
+async def get_stock_trend(
+    start: datetime,
+    end: datetime,
+    category_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Get daily per-category stock rollups for a date range (inclusive)"""
+    if not check_permission(current_user, "view_reports"):
+        raise HTTPException(status_code=403, detail="Permission denied: view_reports required")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    
+    rollup_filter = {"day": {"$gte": start.strftime("%Y-%m-%d"), "$lte": end.strftime("%Y-%m-%d")}}
+    if category_id:
+        rollup_filter["category_id"] = category_id
+    
+    rollups = await db.category_daily_rollups.find(
+        rollup_filter, {"_id": 0, "computed_at": 0}
+    ).sort([("day", 1), ("category_id", 1)]).to_list(None)
+    return rollups
+
+# Consumption rates are only recomputed when new board events arrive (or the day rolls over)
+_consumption_cache = {"key": None, "category_ids": [], "rates": None, "stock": {}}
+
+async def get_consumption_rates(window_days: int):
+    """Average daily issuances per category over the last `window_days` days.
+
+    Issuances are the "issued" board events (boards.issued_date_time only
+    holds a board's latest issue and is also stamped by moves to Repairing).
+    They are bucketed per (category, day) in one aggregation and the rates for
+    all categories are computed together on a NumPy matrix.
+    """
+    counter = await db.counters.find_one({"_id": "board_events"})
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    cache_key = (counter["seq"] if counter else 0, today, window_days)
+    if _consumption_cache["key"] == cache_key:
+        return _consumption_cache
+
+    window_start = today - timedelta(days=window_days - 1)
+    daily_issues = await db.board_events.aggregate([
+        {"$match": {"event_type": "issued", "occurred_at": {"$gte": window_start}}},
+        {"$group": {
+            "_id": {
+                "category_id": "$category_id",
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$occurred_at"}}
+            },
+            "count": {"$sum": 1}
+        }}
+    ]).to_list(None)
+
+    category_ids = sorted({row["_id"]["category_id"] for row in daily_issues})
+    category_index = {category_id: i for i, category_id in enumerate(category_ids)}
+    day_index = {
+        (window_start + timedelta(days=i)).strftime("%Y-%m-%d"): i for i in range(window_days)
+    }
+    issue_counts = np.zeros((len(category_ids), window_days))
+    for row in daily_issues:
+        day = day_index.get(row["_id"]["day"])
+        if day is not None:
+            issue_counts[category_index[row["_id"]["category_id"]], day] = row["count"]
+
+    _consumption_cache.update({
+        "key": cache_key,
+        "category_ids": category_ids,
+        "rates": issue_counts.mean(axis=1) if category_ids else np.zeros(0),
+        "stock": await get_stock_levels()
+    })
+    return _consumption_cache
+
+@api_router.get("/reports/stock-forecast")
+@cached_report("stock-forecast", "view_reports")
+async def get_stock_forecast(
+    window_days: int = Query(FORECAST_WINDOW_DAYS, ge=7, le=365),
+    current_user: User = Depends(get_current_user)
+):
+    """Project days until stock-out and flag categories that will be below minimum within their lead time"""
+    if not check_permission(current_user, "view_reports"):
+        raise HTTPException(status_code=403, detail="Permission denied: view_reports required")
+    
+    categories = await category_catalog.all()
+    if not categories:
+        return []
+    consumption = await get_consumption_rates(window_days)
+    rate_by_category = dict(zip(consumption["category_ids"], consumption["rates"]))
+    
+    rates = np.array([rate_by_category.get(cat["id"], 0.0) for cat in categories])
+    stock = np.array([consumption["stock"].get(cat["id"], 0) for cat in categories], dtype=float)
+    lead_times = np.array([cat.get("lead_time_days", 0) for cat in categories], dtype=float)
+    minimums = np.array([cat.get("minimum_stock_quantity", 0) for cat in categories], dtype=float)
+    
+    with np.errstate(divide="ignore"):
+        days_until_stockout = np.where(rates > 0, stock / rates, np.inf)
+    projected_at_lead_time = stock - rates * lead_times
+    reorder_points = np.ceil(rates * lead_times + minimums)
+    needs_reorder = projected_at_lead_time < minimums
+    
+    forecast = []
+    for i, category in enumerate(categories):
+        forecast.append({
+            "category_id": category["id"],
+            "category_name": category["name"],
+            "manufacturer": category["manufacturer"],
+            "version": category["version"],
+            "current_stock": int(stock[i]),
+            "minimum_stock_quantity": int(minimums[i]),
+            "lead_time_days": int(lead_times[i]),
+            "daily_consumption_rate": round(float(rates[i]), 3),
+            "days_until_stockout": round(float(days_until_stockout[i]), 1) if np.isfinite(days_until_stockout[i]) else None,
+            "projected_stock_at_lead_time": round(float(projected_at_lead_time[i]), 1),
+            "reorder_point": int(reorder_points[i]),
+            "needs_reorder": bool(needs_reorder[i])
+        })
+    
+    forecast.sort(key=lambda row: (not row["needs_reorder"], row["days_until_stockout"] is None, row["days_until_stockout"] or 0))
+    return forecast
+
 @api_router.get("/reports/low-stock")
-async def get_low_stock_report(current_user: User = Depends(get_current_user)):
+@cached_report("low-stock", "view_reports")
+async def get_low_stock_report(
+    as_of: Optional[datetime] = Query(None, description="Report stock as it was at this point in time"),
+    current_user: User = Depends(get_current_user)
+):
     """Get categories with stock below minimum threshold"""
     if not check_permission(current_user, "view_reports"):
         raise HTTPException(status_code=403, detail="Permission denied: view_reports required")
     
-    categories = await db.categories.find().to_list(1000)
+    categories = await category_catalog.as_of(as_of)
+    # Current stock (In stock + Repairing with condition Repaired) per category
+    stock_levels = await get_stock_levels(as_of)
     low_stock_report = []
     
     for category in categories:
-        # Count current stock (In stock + Repairing with condition Repaired)
-        current_stock = await db.boards.count_documents({
-            "category_id": category["id"],
-            "$or": [
-                {"location": "In stock", "condition": {"$in": ["New", "Repaired"]}},
-                {"location": "Repairing", "condition": "Repaired"}
-            ]
-        })
+        current_stock = stock_levels.get(category["id"], 0)
         
         min_stock = category.get("minimum_stock_quantity", 0)
         if current_stock < min_stock:
@@ -1120,6 +2949,7 @@ async def get_low_stock_report(current_user: User = Depends(get_current_user)):
     return low_stock_report
 
 @api_router.get("/reports/under-repair")
+@cached_report("under-repair", "view_reports")
 async def get_under_repair_report(current_user: User = Depends(get_current_user)):
     """Get all boards that are currently under repair"""
     if not check_permission(current_user, "view_reports"):
@@ -1131,11 +2961,10 @@ async def get_under_repair_report(current_user: User = Depends(get_current_user)
             {"condition": "Under repair"},
             {"location": "Repairing", "condition": {"$ne": "Repaired"}}
         ]
-    }).to_list(1000)
+    }, REPAIR_REPORT_PROJECTION).to_list(1000)
     
     # Get category information for each board
-    categories = await db.categories.find().to_list(1000)
-    category_map = {cat["id"]: cat for cat in categories}
+    category_map = await category_catalog.by_id()
     
     repair_report = []
     for board in under_repair_boards:
@@ -1153,6 +2982,149 @@ async def get_under_repair_report(current_user: User = Depends(get_current_user)
     
     return repair_report
 
+async def get_project_consumption_rows(project_number: str) -> List[dict]:
+    """Per-category consumption for a project, read straight from the rollup collection"""
+    rows = await db.project_consumption.find(
+        {"project_number": project_number}, {"_id": 0}
+    ).to_list(None)
+    category_map = await category_catalog.by_id()
+    
+    for row in rows:
+        category = category_map.get(row["category_id"], {})
+        row["category_name"] = category.get("name", "Unknown")
+        row["manufacturer"] = category.get("manufacturer", "Unknown")
+        row["version"] = category.get("version", "Unknown")
+    rows.sort(key=lambda row: row["category_name"])
+    return rows
+
+@api_router.get("/reports/project-consumption/{project_number}")
+@cached_report("project-consumption", "view_reports")
+async def get_project_consumption_report(project_number: str, current_user: User = Depends(get_current_user)):
+    """Get how many boards of each category a project has consumed"""
+    if not check_permission(current_user, "view_reports"):
+        raise HTTPException(status_code=403, detail="Permission denied: view_reports required")
+    
+    rows = await get_project_consumption_rows(project_number)
+    if not rows:
+        raise HTTPException(status_code=404, detail="No consumption recorded for this project")
+    
+    return {
+        "project_number": project_number,
+        "categories": rows,
+        "total_issued": sum(row["issued_count"] for row in rows),
+        "total_returned": sum(row["returned_count"] for row in rows),
+        "total_consumed": sum(row["net_consumed"] for row in rows)
+    }
+
+AGING_BUCKET_DAYS = [0, 7, 30, 90, 180, 365]
+AGING_REPORT_FIELDS = {
+    # kind: (collection, filter, timestamp the age is measured from)
+    "in_stock": ("boards", {"location": "In stock"}, "inward_date_time"),
+    "issued": ("boards", {"location": {"$nin": list(NON_ISSUED_LOCATIONS)}}, "issued_date_time"),
+    # Open repair stints, dated from when the board entered Repairing
+    "repairing": ("repair_stints", {"ended_at": None}, "started_at")
+}
+
+@api_router.get("/reports/aging")
+@cached_report("aging", "view_reports")
+async def get_aging_report(
+    kind: str = Query("in_stock", pattern="^(in_stock|issued|repairing)$"),
+    category_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Bucket boards by how long they have been in stock, issued, or under repair"""
+    if not check_permission(current_user, "view_reports"):
+        raise HTTPException(status_code=403, detail="Permission denied: view_reports required")
+    
+    collection, kind_filter, date_field = AGING_REPORT_FIELDS[kind]
+    match = {**kind_filter, date_field: {"$type": "date"}}
+    if category_id:
+        match["category_id"] = category_id
+    
+    # $bucket boundaries must ascend, so the oldest cut-off comes first. They are
+    # naive UTC like the dates MongoDB hands back as bucket ids.
+    now = datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+    boundaries = [datetime(1970, 1, 1)] + \
+        [now - timedelta(days=days) for days in reversed(AGING_BUCKET_DAYS[1:])] + [now + timedelta(days=1)]
+    labels = [f"over_{AGING_BUCKET_DAYS[-1]}_days"] + [
+        f"{low}_{high}_days" for low, high in reversed(list(zip(AGING_BUCKET_DAYS, AGING_BUCKET_DAYS[1:])))
+    ]
+    
+    buckets = await db[collection].aggregate([
+        {"$match": match},
+        {"$bucket": {
+            "groupBy": f"${date_field}",
+            "boundaries": boundaries,
+            "default": "unknown",
+            "output": {"count": {"$sum": 1}, "oldest": {"$min": f"${date_field}"}}
+        }}
+    ]).to_list(None)
+    bucket_by_start = {bucket["_id"]: bucket for bucket in buckets}
+    
+    report = []
+    for boundary, label in zip(boundaries, labels):
+        bucket = bucket_by_start.get(boundary)
+        report.append({
+            "bucket": label,
+            "count": bucket["count"] if bucket else 0,
+            "oldest": bucket["oldest"] if bucket else None
+        })
+    
+    return {"kind": kind, "measured_from": date_field, "buckets": report}
+
+@api_router.get("/reports/repair-turnaround")
+@cached_report("repair-turnaround", "view_reports")
+async def get_repair_turnaround_report(
+    since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Repair turnaround percentiles per category, computed from completed repair stints"""
+    if not check_permission(current_user, "view_reports"):
+        raise HTTPException(status_code=403, detail="Permission denied: view_reports required")
+    
+    match = {"ended_at": {"$ne": None}}
+    if since:
+        match["ended_at"] = {"$gte": since}
+    
+    def percentile(p):
+        index = {"$toInt": {"$floor": {"$multiply": [{"$subtract": ["$completed", 1]}, p]}}}
+        return {"$round": [{"$arrayElemAt": ["$durations", index]}, 1]}
+    
+    turnaround = await db.repair_stints.aggregate([
+        {"$match": match},
+        {"$sort": {"category_id": 1, "duration_hours": 1}},
+        {"$group": {
+            "_id": "$category_id",
+            "durations": {"$push": "$duration_hours"},
+            "completed": {"$sum": 1},
+            "average_hours": {"$avg": "$duration_hours"}
+        }},
+        {"$project": {
+            "_id": 0,
+            "category_id": "$_id",
+            "completed_repairs": "$completed",
+            "average_hours": {"$round": ["$average_hours", 1]},
+            "p50_hours": percentile(0.5),
+            "p90_hours": percentile(0.9),
+            "p95_hours": percentile(0.95),
+            "max_hours": {"$round": [{"$arrayElemAt": ["$durations", -1]}, 1]}
+        }}
+    ], allowDiskUse=True).to_list(None)
+    
+    open_repairs = await db.repair_stints.aggregate([
+        {"$match": {"ended_at": None}},
+        {"$group": {"_id": "$category_id", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    open_by_category = {row["_id"]: row["count"] for row in open_repairs}
+    
+    category_map = await category_catalog.by_id()
+    for row in turnaround:
+        row["category_name"] = category_map.get(row["category_id"], {}).get("name", "Unknown")
+        row["open_repairs"] = open_by_category.get(row["category_id"], 0)
+    turnaround.sort(key=lambda row: row["category_name"])
+    
+    return turnaround
+
 @api_router.get("/reports/serial-history/{serial_number}")
 async def get_serial_history(serial_number: str, current_user: User = Depends(get_current_user)):
     """Get complete history of a specific serial number"""
@@ -1165,7 +3137,7 @@ async def get_serial_history(serial_number: str, current_user: User = Depends(ge
         raise HTTPException(status_code=404, detail="Serial number not found")
     
     # Get category info
-    category = await db.categories.find_one({"id": board["category_id"]})
+    category = await category_catalog.get(board["category_id"])
     
     # Get issue requests for this board
     issue_requests = await db.issue_requests.find({
@@ -1180,35 +3152,9 @@ async def get_serial_history(serial_number: str, current_user: User = Depends(ge
         "boards.serial_number": serial_number
     }).to_list(100)
     
-    # Convert MongoDB documents to proper format
-    issue_history = []
-    for req in issue_requests:
-        # Remove MongoDB ObjectId fields and convert to proper format
-        clean_req = {k: v for k, v in req.items() if k != '_id'}
-        # Convert datetime objects to strings
-        if 'request_date_time' in clean_req and clean_req['request_date_time']:
-            clean_req['request_date_time'] = clean_req['request_date_time'].isoformat() if hasattr(clean_req['request_date_time'], 'isoformat') else str(clean_req['request_date_time'])
-        if 'approved_date_time' in clean_req and clean_req['approved_date_time']:
-            clean_req['approved_date_time'] = clean_req['approved_date_time'].isoformat() if hasattr(clean_req['approved_date_time'], 'isoformat') else str(clean_req['approved_date_time'])
-        if 'created_at' in clean_req and clean_req['created_at']:
-            clean_req['created_at'] = clean_req['created_at'].isoformat() if hasattr(clean_req['created_at'], 'isoformat') else str(clean_req['created_at'])
-        issue_history.append(clean_req)
-    
-    bulk_history = []
-    for req in bulk_requests:
-        # Remove MongoDB ObjectId fields and convert to proper format
-        clean_req = {k: v for k, v in req.items() if k != '_id'}
-        bulk_history.append(clean_req)
-    
-    # Clean board details
-    clean_board = {k: v for k, v in board.items() if k != '_id'}
-    # Convert datetime objects to strings
-    if 'inward_date_time' in clean_board and clean_board['inward_date_time']:
-        clean_board['inward_date_time'] = clean_board['inward_date_time'].isoformat() if hasattr(clean_board['inward_date_time'], 'isoformat') else str(clean_board['inward_date_time'])
-    if 'issued_date_time' in clean_board and clean_board['issued_date_time']:
-        clean_board['issued_date_time'] = clean_board['issued_date_time'].isoformat() if hasattr(clean_board['issued_date_time'], 'isoformat') else str(clean_board['issued_date_time'])
-    if 'created_at' in clean_board and clean_board['created_at']:
-        clean_board['created_at'] = clean_board['created_at'].isoformat() if hasattr(clean_board['created_at'], 'isoformat') else str(clean_board['created_at'])
+    issue_history = [clean_document(req) for req in issue_requests]
+    bulk_history = [clean_document(req) for req in bulk_requests]
+    clean_board = clean_document(board)
 
     history = {
         "serial_number": serial_number,
@@ -1230,7 +3176,7 @@ async def get_serial_history(serial_number: str, current_user: User = Depends(ge
         "board_details": clean_board
     }
     
-    return history
+    return ORJSONResponse(history)
 
 @api_router.get("/reports/serial-numbers/{category_id}")
 async def get_serial_numbers_by_category(category_id: str, current_user: User = Depends(get_current_user)):
@@ -1239,12 +3185,14 @@ async def get_serial_numbers_by_category(category_id: str, current_user: User =
         raise HTTPException(status_code=403, detail="Permission denied: view_reports required")
     
     # Verify category exists
-    category = await db.categories.find_one({"id": category_id})
+    category = await category_catalog.get(category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     # Get all boards for this category
-    boards = await db.boards.find({"category_id": category_id}).to_list(1000)
+    boards = await db.boards.find(
+        {"category_id": category_id}, {"_id": 0, "serial_number": 1, "condition": 1, "location": 1}
+    ).to_list(1000)
     
     serial_numbers = []
     for board in boards:
@@ -1271,63 +3219,28 @@ async def get_category_export_data(category_id: str, current_user: User = Depend
         raise HTTPException(status_code=403, detail="Permission denied: view_reports required")
     
     # Get category info
-    category = await db.categories.find_one({"id": category_id})
+    category = await category_catalog.get(category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
-    # Get all boards for this category
-    boards = await db.boards.find({"category_id": category_id}).to_list(1000)
+    # Get all boards for this category (an export is complete, however large the category)
+    boards = await db.boards.find({"category_id": category_id}).to_list(None)
     
     # Get all issue requests for this category
-    issue_requests = await db.issue_requests.find({"category_id": category_id}).to_list(1000)
+    issue_requests = await db.issue_requests.find({"category_id": category_id}).to_list(None)
     
     # Get bulk issue requests that include boards from this category
     bulk_requests = await db.bulk_issue_requests.find({
         "boards.category_id": category_id
-    }).to_list(1000)
-    
-    # Clean category data
-    clean_category = {k: v for k, v in category.items() if k != '_id'}
-    if 'created_at' in clean_category and clean_category['created_at']:
-        clean_category['created_at'] = clean_category['created_at'].isoformat() if hasattr(clean_category['created_at'], 'isoformat') else str(clean_category['created_at'])
+    }).to_list(None)
     
-    # Clean boards data
-    clean_boards = []
-    for board in boards:
-        clean_board = {k: v for k, v in board.items() if k != '_id'}
-        # Convert datetime objects to strings
-        if 'inward_date_time' in clean_board and clean_board['inward_date_time']:
-            clean_board['inward_date_time'] = clean_board['inward_date_time'].isoformat() if hasattr(clean_board['inward_date_time'], 'isoformat') else str(clean_board['inward_date_time'])
-        if 'issued_date_time' in clean_board and clean_board['issued_date_time']:
-            clean_board['issued_date_time'] = clean_board['issued_date_time'].isoformat() if hasattr(clean_board['issued_date_time'], 'isoformat') else str(clean_board['issued_date_time'])
-        if 'created_at' in clean_board and clean_board['created_at']:
-            clean_board['created_at'] = clean_board['created_at'].isoformat() if hasattr(clean_board['created_at'], 'isoformat') else str(clean_board['created_at'])
-        clean_boards.append(clean_board)
-    
-    # Clean issue requests data
-    clean_issue_requests = []
-    for req in issue_requests:
-        clean_req = {k: v for k, v in req.items() if k != '_id'}
-        # Convert datetime objects to strings
-        if 'request_date_time' in clean_req and clean_req['request_date_time']:
-            clean_req['request_date_time'] = clean_req['request_date_time'].isoformat() if hasattr(clean_req['request_date_time'], 'isoformat') else str(clean_req['request_date_time'])
-        if 'approved_date_time' in clean_req and clean_req['approved_date_time']:
-            clean_req['approved_date_time'] = clean_req['approved_date_time'].isoformat() if hasattr(clean_req['approved_date_time'], 'isoformat') else str(clean_req['approved_date_time'])
-        if 'created_at' in clean_req and clean_req['created_at']:
-            clean_req['created_at'] = clean_req['created_at'].isoformat() if hasattr(clean_req['created_at'], 'isoformat') else str(clean_req['created_at'])
-        clean_issue_requests.append(clean_req)
-    
-    # Clean bulk requests data
-    clean_bulk_requests = []
-    for req in bulk_requests:
-        clean_req = {k: v for k, v in req.items() if k != '_id'}
-        clean_bulk_requests.append(clean_req)
+    clean_boards = [clean_document(board) for board in boards]
 
     export_data = {
-        "category": clean_category,
+        "category": clean_document(category),
         "boards": clean_boards,
-        "issue_requests": clean_issue_requests,
-        "bulk_issue_requests": clean_bulk_requests,
+        "issue_requests": [clean_document(req) for req in issue_requests],
+        "bulk_issue_requests": [clean_document(req) for req in bulk_requests],
         "statistics": {
             "total_boards": len(boards),
             "in_stock": len([b for b in boards if b["location"] == "In stock"]),
@@ -1338,27 +3251,25 @@ async def get_category_export_data(category_id: str, current_user: User = Depend
         }
     }
     
-    return export_data
+    return ORJSONResponse(export_data)
 
 # Excel Export endpoints
 @api_router.get("/reports/export/low-stock")
-async def export_low_stock_excel(current_user: User = Depends(get_current_user_flexible)):
+async def export_low_stock_excel(
+    as_of: Optional[datetime] = Query(None, description="Report stock as it was at this point in time"),
+    current_user: User = Depends(get_current_user_flexible)
+):
     """Export low stock report as Excel file"""
     if not check_permission(current_user, "export_reports"):
         raise HTTPException(status_code=403, detail="Permission denied: export_reports required")
     
     # Get low stock data
-    categories = await db.categories.find().to_list(1000)
+    categories = await category_catalog.as_of(as_of)
+    stock_levels = await get_stock_levels(as_of)
     low_stock_data = []
     
     for category in categories:
-        current_stock = await db.boards.count_documents({
-            "category_id": category["id"],
-            "$or": [
-                {"location": "In stock", "condition": {"$in": ["New", "Repaired"]}},
-                {"location": "Repairing", "condition": "Repaired"}
-            ]
-        })
+        current_stock = stock_levels.get(category["id"], 0)
         
         min_stock = category.get("minimum_stock_quantity", 0)
         if current_stock < min_stock:
@@ -1439,10 +3350,9 @@ async def export_under_repair_excel(current_user: User = Depends(get_current_use
             {"condition": "Under repair"},
             {"location": "Repairing", "condition": {"$ne": "Repaired"}}
         ]
-    }).to_list(1000)
+    }, REPAIR_REPORT_PROJECTION).to_list(1000)
     
-    categories = await db.categories.find().to_list(1000)
-    category_map = {cat["id"]: cat for cat in categories}
+    category_map = await category_catalog.by_id()
     
     repair_data = []
     for board in under_repair_boards:
@@ -1523,7 +3433,7 @@ async def export_serial_history_excel(serial_number: str, current_user: User = D
     if not board:
         raise HTTPException(status_code=404, detail="Serial number not found")
     
-    category = await db.categories.find_one({"id": board["category_id"]})
+    category = await category_catalog.get(board["category_id"])
     
     # Create Excel file with multiple sheets
     wb = openpyxl.Workbook()
@@ -1618,23 +3528,8 @@ async def export_serial_history_excel(serial_number: str, current_user: User = D
         headers=headers
     )
 
-@api_router.get("/reports/export/category/{category_id}")
-async def export_category_excel(category_id: str, current_user: User = Depends(get_current_user_flexible)):
-    """Export complete category data as Excel file"""
-    if not check_permission(current_user, "export_reports"):
-        raise HTTPException(status_code=403, detail="Permission denied: export_reports required")
-    
-    # Get category data
-    category = await db.categories.find_one({"id": category_id})
-    if not category:
-        raise HTTPException(status_code=404, detail="Category not found")
-    
-    boards = await db.boards.find({"category_id": category_id}).to_list(1000)
-    issue_requests = await db.issue_requests.find({"category_id": category_id}).to_list(1000)
-    bulk_requests = await db.bulk_issue_requests.find({
-        "boards.category_id": category_id
-    }).to_list(1000)
-    
+def build_category_workbook(category: dict, boards: List[dict], issue_requests: List[dict]) -> io.BytesIO:
+    """Category info, board and issue request sheets of the category export, saved as xlsx"""
     # Create Excel file with multiple sheets
     wb = openpyxl.Workbook()
     
@@ -1718,6 +3613,28 @@ async def export_category_excel(category_id: str, current_user: User = Depends(g
     excel_buffer = io.BytesIO()
     wb.save(excel_buffer)
     excel_buffer.seek(0)
+    return excel_buffer
+
+@api_router.get("/reports/export/category/{category_id}")
+async def export_category_excel(category_id: str, current_user: User = Depends(get_current_user_flexible)):
+    """Export complete category data as Excel file"""
+    if not check_permission(current_user, "export_reports"):
+        raise HTTPException(status_code=403, detail="Permission denied: export_reports required")
+    
+    # Get category data
+    category = await category_catalog.get(category_id)
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    
+    # Every board and request of the category, however large it is
+    boards = await db.boards.find({"category_id": category_id}).to_list(None)
+    issue_requests = await db.issue_requests.find({"category_id": category_id}).to_list(None)
+    bulk_requests = await db.bulk_issue_requests.find({
+        "boards.category_id": category_id
+    }).to_list(None)
+    
+    # Seconds of CPU for a large category, so it runs off the event loop
+    excel_buffer = await asyncio.to_thread(build_category_workbook, category, boards, issue_requests)
     
     filename = f"category_{category['name']}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.xlsx"
     
@@ -1738,6 +3655,308 @@ async def export_category_excel(category_id: str, current_user: User = Depends(g
         headers=headers
     )
 
+@api_router.get("/reports/export/project-consumption/{project_number}")
+async def export_project_consumption_excel(project_number: str, current_user: User = Depends(get_current_user_flexible)):
+    """Export project consumption report as Excel file"""
+    if not check_permission(current_user, "export_reports"):
+        raise HTTPException(status_code=403, detail="Permission denied: export_reports required")
+    
+    rows = await get_project_consumption_rows(project_number)
+    if not rows:
+        raise HTTPException(status_code=404, detail="No consumption recorded for this project")
+    
+    consumption_data = [
+        {
+            "Category": row["category_name"],
+            "Manufacturer": row["manufacturer"],
+            "Version": row["version"],
+            "Issued": row["issued_count"],
+            "Returned": row["returned_count"],
+            "Net Consumed": row["net_consumed"],
+            "Last Issued": str(row.get("last_issued_at", "") or "")
+        }
+        for row in rows
+    ]
+    
+    # Create Excel file
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Project Consumption"
+    
+    # Add headers
+    headers = list(consumption_data[0].keys())
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col, value=header)
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+    
+    # Add data
+    for row, data in enumerate(consumption_data, 2):
+        for col, value in enumerate(data.values(), 1):
+            ws.cell(row=row, column=col, value=value)
+    
+    # Auto-adjust column width
+    for column in ws.columns:
+        max_length = 0
+        column_letter = column[0].column_letter
+        for cell in column:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+            except:
+                pass
+        adjusted_width = min(max_length + 2, 50)
+        ws.column_dimensions[column_letter].width = adjusted_width
+    
+    # Save to bytes
+    excel_buffer = io.BytesIO()
+    wb.save(excel_buffer)
+    excel_buffer.seek(0)
+    
+    filename = f"project_consumption_{project_number}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.xlsx"
+    
+    headers = {
+        "Content-Disposition": f"attachment; filename=\"{filename}\"",
+        "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "Content-Description": "File Transfer",
+        "Content-Transfer-Encoding": "binary",
+        "Cache-Control": "must-revalidate, post-check=0, pre-check=0",
+        "Pragma": "public",
+        "Expires": "0",
+        "Access-Control-Expose-Headers": "Content-Disposition, Content-Type"
+    }
+    
+    return StreamingResponse(
+        io.BytesIO(excel_buffer.read()),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers=headers
+    )
+
+# Live updates
+@api_router.get("/events/stream")
+async def stream_events(request: Request, current_user: User = Depends(get_current_user_flexible)):
+    """Server-Sent Events stream of board and issue request changes visible to the user.
+
+    Events only say what changed; clients refetch (or use the delta sync
+    endpoints). A client that falls too far behind receives a single
+    "resync" event instead of the events it missed. The stream ends after
+    SSE_STREAM_MAX_SECONDS: the user and permissions it filters for are
+    loaded when it connects, so the reconnect picks up permission changes
+    and rejects an expired token.
+    """
+    subscriber = event_bus.subscribe(current_user)
+    deadline = time.monotonic() + SSE_STREAM_MAX_SECONDS
+    
+    async def event_source():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), min(SSE_KEEPALIVE_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {orjson.dumps(event).decode()}\n\n"
+        finally:
+            event_bus.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/admin/cache-invalidation")
+async def get_cache_invalidation_status(current_user: User = Depends(get_current_user)):
+    """This worker's invalidation bus: mode, registered caches and propagation latency of remote writes"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view cache status")
+    
+    bus = invalidation_bus
+    return {
+        "worker_id": WORKER_ID,
+        "mode": bus.mode,
+        "caches": sorted(bus.caches),
+        "collections": bus.collections,
+        "received": bus.received,
+        "mean_latency_ms": round(bus.total_latency_ms / bus.timed, 2) if bus.timed else None,
+        "max_latency_ms": round(bus.max_latency_ms, 2) if bus.timed else None,
+        "last_latency_ms": round(bus.last_latency_ms, 2) if bus.timed else None
+    }
+
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(100, ge=1, le=1000),
+    collscan_only: bool = Query(False, description="Only commands whose sampled plan was a collection scan"),
+    current_user: User = Depends(get_current_user)
+):
+    """Most recent slow MongoDB commands, newest first"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view slow queries")
+    
+    query = {"plan.collscan": True} if collscan_only else {}
+    records = await db.slow_queries.find(query, {"_id": 0}).sort("$natural", -1).limit(limit).to_list(None)
+    return records
+
+def fold_stack(frame) -> str:
+    """A frame's call stack in collapsed-stack form, outermost first: module:function;..."""
+    names = []
+    while frame is not None:
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+# The profiler recording the current request, inherited by tasks the request starts
+profiled_request = contextvars.ContextVar("profiled_request", default=None)
+
+class SamplingProfiler:
+    """Samples the event loop thread's stack from a background thread.
+
+    Without a task every sample counts (a window profile). With one, only
+    samples taken while that task, or a task it started, is running are
+    attributed to their stack; the others are counted as "[awaiting]" (I/O
+    or other requests), so the profile still adds up to the request's wall
+    time. Tasks the request starts are found through a task factory that
+    is only installed while the profile is recording.
+    """
+
+    def __init__(self, interval: float, task: Optional[asyncio.Task] = None):
+        self.loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()
+        self.interval = interval
+        self.task = task
+        self.tasks = set()
+        self.samples = defaultdict(int)
+        self.started_at = None
+        self._started = 0.0
+        self._previous_task_factory = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        if self.task is not None:
+            self.tasks.add(self.task)
+            self._previous_task_factory = self.loop.get_task_factory()
+            self.loop.set_task_factory(self._task_factory)
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def _task_factory(self, loop, coro, **kwargs):
+        previous = self._previous_task_factory
+        task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+        if profiled_request.get() is self:
+            self.tasks.add(task)
+        return task
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            if self.task is not None and asyncio.current_task(self.loop) not in self.tasks:
+                self.samples["[awaiting]"] += 1
+                continue
+            self.samples[fold_stack(frame)] += 1
+
+    def stop(self) -> dict:
+        self._stopped.set()
+        self._thread.join()
+        if self.task is not None:
+            self.loop.set_task_factory(self._previous_task_factory)
+        ranked = sorted(self.samples.items(), key=lambda item: -item[1])
+        return {
+            "started_at": self.started_at,
+            "duration_ms": round((time.perf_counter() - self._started) * 1000, 1),
+            "sample_interval_ms": self.interval * 1000,
+            "samples": sum(self.samples.values()),
+            "folded": "\n".join(f"{stack} {count}" for stack, count in ranked) + "\n"
+        }
+
+
+class Profiling:
+    """The one profile this worker records at a time; finished ones go to db.profiles"""
+
+    def __init__(self):
+        self.active = None
+        self.window_task = None
+
+    def begin(self, task: Optional[asyncio.Task] = None) -> Optional[SamplingProfiler]:
+        """Start sampling, or None if a profile is already being recorded"""
+        if self.active is not None:
+            return None
+        self.active = SamplingProfiler(PROFILE_SAMPLE_INTERVAL_MS / 1000, task)
+        self.active.start()
+        return self.active
+
+    async def finish(self, profiler: SamplingProfiler, profile_id: str, **details):
+        profile = profiler.stop()
+        self.active = None
+        try:
+            await db.profiles.insert_one({"id": profile_id, "worker_id": WORKER_ID, **details, **profile})
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Storing profile {profile_id} failed: {e}")
+
+profiling = Profiling()
+
+class ProfilingWindow(BaseModel):
+    seconds: float = Field(gt=0, le=PROFILE_MAX_WINDOW_SECONDS)
+
+@api_router.post("/admin/profiling")
+async def start_profiling_window(window: ProfilingWindow, current_user: User = Depends(get_current_user)):
+    """Profile the worker handling this request for the given number of seconds"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can profile the server")
+    
+    profiler = profiling.begin()
+    if profiler is None:
+        raise HTTPException(status_code=409, detail="This worker is already recording a profile")
+    profile_id = str(uuid.uuid4())
+    
+    async def record_window():
+        try:
+            await asyncio.sleep(window.seconds)
+        finally:
+            await profiling.finish(profiler, profile_id, kind="window", requested_by=current_user.email)
+    
+    profiling.window_task = asyncio.create_task(record_window())
+    return {
+        "profile_id": profile_id,
+        "worker_id": WORKER_ID,
+        "ends_at": datetime.now(timezone.utc) + timedelta(seconds=window.seconds)
+    }
+
+@api_router.get("/admin/profiles")
+async def get_profiles(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user)
+):
+    """Recorded profiles without their stacks, newest first"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view profiles")
+    
+    return await db.profiles.find({}, {"_id": 0, "folded": 0}).sort("$natural", -1).limit(limit).to_list(None)
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, current_user: User = Depends(get_current_user_flexible)):
+    """A profile as collapsed stacks, for flamegraph.pl, speedscope or inferno"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view profiles")
+    
+    profile = await db.profiles.find_one({"id": profile_id}, {"_id": 0, "folded": 1})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found (or still recording)")
+    return Response(
+        profile["folded"],
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
+
 # Admin setup route (temporary - for initial admin creation)
 @api_router.post("/setup-admin")
 async def setup_admin(email: str):
@@ -1759,11 +3978,13 @@ async def setup_admin(email: str):
 
 # Dashboard stats
 @api_router.get("/dashboard/stats")
+@cached_report("dashboard", "view_dashboard")
 async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
     if not check_permission(current_user, "view_dashboard"):
         raise HTTPException(status_code=403, detail="Permission denied: view_dashboard required")
-    total_categories = await db.categories.count_documents({})
-    total_boards = await db.boards.count_documents({})
+    total_categories = len(await category_catalog.by_id())
+    # Collection metadata: counting every board would scan the collection
+    total_boards = await db.boards.estimated_document_count()
     in_stock = await db.boards.count_documents({
         "location": "In stock", 
         "condition": {"$in": ["New", "Repaired"]}
@@ -1783,9 +4004,547 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
         "pending_requests": pending_requests
     }
 
+# Prometheus scrape endpoint; each worker process exports its own series
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Include router
 app.include_router(api_router)
 
+# Response compression
+def _zstd_encoder():
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return compressor.compress, compressor.flush
+
+def _brotli_encoder():
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    return compressor.process, compressor.finish
+
+def _gzip_encoder():
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+# In order of preference; each factory returns (compress(chunk), finish())
+COMPRESSION_ENCODERS = {
+    name: factory for name, factory, available in [
+        ("zstd", _zstd_encoder, zstandard is not None),
+        ("br", _brotli_encoder, brotli is not None),
+        ("gzip", _gzip_encoder, True)
+    ] if available
+}
+# Already compressed downloads, and event streams that must not be buffered
+COMPRESSION_EXCLUDED_TYPES = (
+    "application/vnd.openxmlformats",
+    "application/zip",
+    "application/gzip",
+    "application/x-parquet",
+    "application/vnd.apache.parquet",
+    "image/",
+    "text/event-stream"
+)
+# Bodies at least this large are compressed in a worker thread instead of on the event loop
+COMPRESSION_THREAD_MIN_SIZE = 1024 * 1024
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Our most preferred encoding that the Accept-Encoding header allows, if any"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in COMPRESSION_ENCODERS:
+        if accepted.get(encoding, 0) > 0:
+            return encoding
+    return None
+
+class CompressionMiddleware:
+    """Compresses response bodies with zstd, brotli or gzip as negotiated with the client.
+
+    A single-message body is compressed whole (and skipped below
+    `minimum_size`); streamed bodies are compressed chunk by chunk.
+    Responses that already have a Content-Encoding or whose type is in
+    COMPRESSION_EXCLUDED_TYPES are passed through.
+
+    Every other response varies on Accept-Encoding, compressed or not, and
+    when the client accepts an encoding its ETag is made weak: compressed and
+    identity bodies carry the same tag from the handler, and If-None-Match
+    compares weakly, so revalidation keeps working for both.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or content_type.startswith(COMPRESSION_EXCLUDED_TYPES):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if encoding is not None and etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                if encoding is None or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                encoder = COMPRESSION_ENCODERS[encoding]()
+                headers["Content-Encoding"] = encoding
+                if not more_body:
+                    compressed = await self._compress_whole(encoder, body)
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                del headers["Content-Length"]
+                await send(start_message)
+
+            compress, finish = encoder
+            compressed = compress(body)
+            if not more_body:
+                compressed += finish()
+            if compressed or not more_body:
+                await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    async def _compress_whole(encoder, body: bytes) -> bytes:
+        compress, finish = encoder
+        if len(body) < COMPRESSION_THREAD_MIN_SIZE:
+            return compress(body) + finish()
+        return await asyncio.to_thread(lambda: compress(body) + finish())
+
+app.add_middleware(CompressionMiddleware)
+
+class EventLoopMonitor:
+    """Measures event loop lag and catches the code that blocks the loop.
+
+    A task sleeps for `interval` and records how much later than that it
+    woke up, then touches a heartbeat. A watchdog thread checks the
+    heartbeat; once the loop is more than `threshold_ms` overdue, it takes
+    the stack of the loop's thread from sys._current_frames() while the
+    blocking call is still running and logs it with the route of the
+    request that was running. Each stall is reported once.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL_SECONDS, threshold_ms: float = LOOP_LAG_THRESHOLD_MS):
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        # Request task -> ASGI scope, maintained by MetricsMiddleware
+        self.requests = {}
+        self.loop = None
+        self.loop_thread_id = None
+        self.heartbeat = 0.0
+        self.stalls = 0
+        self._stopped = threading.Event()
+
+    def start(self) -> asyncio.Task:
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._stopped.clear()
+        threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True).start()
+        return asyncio.create_task(self._measure())
+
+    async def _measure(self):
+        try:
+            while True:
+                started = time.monotonic()
+                await asyncio.sleep(self.interval)
+                self.heartbeat = time.monotonic()
+                event_loop_lag_seconds.observe((), max(0.0, self.heartbeat - started - self.interval))
+        finally:
+            self._stopped.set()
+
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(min(self.interval, self.threshold) / 2):
+            heartbeat = self.heartbeat
+            overdue = time.monotonic() - heartbeat - self.interval
+            if overdue <= self.threshold or heartbeat == reported:
+                continue
+            reported = heartbeat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "(no frame)"
+            route = self.active_route()
+            self.stalls += 1
+            event_loop_blocked_total.inc((route,))
+            logging.getLogger(__name__).warning(
+                f"Event loop blocked for over {overdue * 1000:.0f} ms while running {route}:\n{stack}"
+            )
+
+    def active_route(self) -> str:
+        """The request (or else the task) the loop is running; read from the watchdog thread"""
+        task = asyncio.current_task(self.loop)
+        if task is None:
+            return "(no task)"
+        scope = self.requests.get(task)
+        if scope is None:
+            return f"(task {task.get_name()})"
+        route = scope.get("route")
+        return f"{scope['method']} {route.path if route is not None else scope['path']}"
+
+event_loop_monitor = EventLoopMonitor()
+
+class MetricsMiddleware:
+    """Records per-route request counts, latency, in-flight requests and response sizes.
+
+    Routes are labelled by their path template (e.g. /api/boards/{board_id})
+    so label cardinality stays bounded; unmatched paths share one label.
+    Added after CompressionMiddleware so that it wraps it and sizes are wire bytes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status_code = 500
+        size = 0
+
+        async def send_measured(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        http_requests_in_flight.inc((method,))
+        task = asyncio.current_task()
+        event_loop_monitor.requests[task] = scope
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_measured)
+        finally:
+            elapsed = time.perf_counter() - start
+            event_loop_monitor.requests.pop(task, None)
+            http_requests_in_flight.dec((method,))
+            route = scope.get("route")
+            route_label = route.path if route is not None else "unmatched"
+            http_requests_total.inc((method, route_label, str(status_code)))
+            http_request_duration_seconds.observe((method, route_label), elapsed)
+            http_response_size_bytes.observe((method, route_label), size)
+
+app.add_middleware(MetricsMiddleware)
+
+class DbAccountingMiddleware:
+    """Counts each request's MongoDB round trips and time spent in them.
+
+    Both are reported in a Server-Timing header (as of when the response
+    headers are sent) and in the http_request_db_commands histogram. Requests
+    over DB_ROUNDTRIP_BUDGET commands, or repeating a query shape
+    N_PLUS_ONE_THRESHOLD times, are logged with their most repeated shapes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestDbStats(scope)
+        token = request_db_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", (
+                    f'db;dur={stats.seconds * 1000:.1f};desc="{stats.commands} commands", '
+                    f"app;dur={(time.perf_counter() - start) * 1000:.1f}"
+                ))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_db_stats.reset(token)
+            self._report(scope, stats)
+
+    @staticmethod
+    def _report(scope, stats: RequestDbStats):
+        method = scope["method"]
+        route = scope.get("route")
+        route_label = route.path if route is not None else "unmatched"
+        http_request_db_commands.observe((method, route_label), stats.commands)
+        repeated = stats.repeated_shapes(N_PLUS_ONE_THRESHOLD)
+        if repeated:
+            suspected_n_plus_one_total.inc((method, route_label))
+        if repeated or stats.commands > DB_ROUNDTRIP_BUDGET:
+            top = "; ".join(f"{count}x {shape}" for shape, count in repeated[:3])
+            logging.getLogger(__name__).warning(
+                f"{method} {route_label}: {stats.commands} MongoDB commands in {stats.seconds * 1000:.1f} ms"
+                + (f" (budget {DB_ROUNDTRIP_BUDGET})" if stats.commands > DB_ROUNDTRIP_BUDGET else "")
+                + (f"; suspected N+1: {top}" if top else "")
+            )
+
+app.add_middleware(DbAccountingMiddleware)
+
+TRACE_REDACTED_FIELDS = {"password", "new_password", "access_token", "token"}
+TRACE_EXCLUDED_PATHS = {"/api/events/stream"}
+# Body fields whose strings are kept in a body shape: references and vocabulary
+# that pick the code path a request takes, none of which identifies a person
+TRACE_SHAPE_KEPT_FIELDS = {
+    "board_id", "category_id", "request_id", "user_id", "serial_number", "serial_numbers", "project_number",
+    "status", "location", "condition", "role", "permissions",
+}
+
+# Query parameters holding free text, recorded as "<str:N>" like body strings
+TRACE_FREE_TEXT_PARAMS = {"query"}
+TRACE_EMAIL = re.compile(r"[^\s/?&=<>@]+@[^\s/?&=<>@]+")
+
+def trace_pseudonym(email: str) -> str:
+    """A stable pseudonym for an email, keyed with SECRET_KEY so it cannot be reversed without it"""
+    return hashlib.blake2b(email.encode(), key=SECRET_KEY.encode()[:64], digest_size=6).hexdigest()
+
+def pseudonymize_emails(text: str) -> str:
+    """Text with every email in it replaced by "<email:PSEUDONYM>" """
+    return TRACE_EMAIL.sub(lambda match: f"<email:{trace_pseudonym(match.group())}>", text)
+
+def trace_query_value(key: str, value: str) -> str:
+    """A query parameter value as recorded: credentials redacted, free text shaped, emails pseudonymized"""
+    if key in TRACE_REDACTED_FIELDS:
+        return "<redacted>"
+    if key in TRACE_FREE_TEXT_PARAMS and not TRAFFIC_CAPTURE_FULL_BODIES:
+        return f"<str:{len(value)}>"
+    return pseudonymize_emails(value)
+
+def sanitize_trace_value(value):
+    """A JSON body with credentials replaced by "<redacted>" """
+    if isinstance(value, dict):
+        return {
+            key: "<redacted>" if key in TRACE_REDACTED_FIELDS else sanitize_trace_value(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [sanitize_trace_value(item) for item in value]
+    return value
+
+def trace_body_shape(value, kept: bool = False):
+    """A JSON body with its strings replaced by their kind and length.
+
+    Emails become "<email>" and other strings "<str:N>", except under
+    TRACE_SHAPE_KEPT_FIELDS; numbers, booleans and nulls are kept, and
+    credentials are "<redacted>" as in sanitize_trace_value.
+    """
+    if isinstance(value, dict):
+        return {
+            key: "<redacted>" if key in TRACE_REDACTED_FIELDS
+            else trace_body_shape(item, key in TRACE_SHAPE_KEPT_FIELDS)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [trace_body_shape(item, kept) for item in value]
+    if isinstance(value, str) and not kept:
+        return "<email>" if "@" in value else f"<str:{len(value)}>"
+    return value
+
+class TrafficCaptureMiddleware:
+    """Appends a sanitized trace of every API request to a rotating JSON-lines file.
+
+    Each line has the start time, method, path and route template, query
+    parameters, the JSON body's shape (trace_body_shape: names, emails and
+    free text reduced to their kind and length), status, duration and response
+    size, and the caller's role with a pseudonym. Emails in the path and
+    query are replaced by the same pseudonym ("<email:PSEUDONYM>"), search
+    text by its length, and tokens are redacted; the rest of the path and
+    query is kept so the trace can be replayed. With
+    TRAFFIC_CAPTURE_FULL_BODIES=1 the body and search text are recorded
+    instead, with only passwords and tokens redacted. Lines are written by a
+    QueueListener thread so the event loop never waits on the file.
+    """
+
+    def __init__(self, app, path: str):
+        self.app = app
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=TRAFFIC_CAPTURE_MAX_BYTES, backupCount=TRAFFIC_CAPTURE_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        records = queue.SimpleQueue()
+        self.logger = logging.getLogger("traffic_capture")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(logging.handlers.QueueHandler(records))
+        listener = logging.handlers.QueueListener(records, handler)
+        listener.start()
+        atexit.register(listener.stop)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/") or scope["path"] in TRACE_EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        trace = {"ts": time.time(), "method": scope["method"], "path": pseudonymize_emails(scope["path"])}
+        body = bytearray()
+        body_bytes = 0
+        status_code = 500
+        response_bytes = 0
+
+        async def receive_recorded():
+            nonlocal body_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                body_bytes += len(chunk)
+                if len(body) + len(chunk) <= TRAFFIC_CAPTURE_MAX_BODY_BYTES:
+                    body.extend(chunk)
+            return message
+
+        async def send_recorded(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_recorded, send_recorded)
+        finally:
+            trace["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            user = scope.get("state", {}).get("user")
+            if user is not None:
+                # A stable pseudonym, never the email
+                trace["role"] = user.role
+                trace["user"] = trace_pseudonym(user.email)
+            route = scope.get("route")
+            trace["route"] = route.path if route is not None else None
+            trace["query"] = [
+                [key, trace_query_value(key, value)]
+                for key, value in parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+            ]
+            trace["body_bytes"] = body_bytes
+            if body and body_bytes == len(body):
+                try:
+                    parsed = orjson.loads(bytes(body))
+                except orjson.JSONDecodeError:
+                    pass
+                else:
+                    if TRAFFIC_CAPTURE_FULL_BODIES:
+                        trace["body"] = sanitize_trace_value(parsed)
+                    else:
+                        trace["body_shape"] = trace_body_shape(parsed)
+            trace["status"] = status_code
+            trace["response_bytes"] = response_bytes
+            self.logger.info(orjson.dumps(trace).decode())
+
+if TRAFFIC_CAPTURE_PATH:
+    app.add_middleware(TrafficCaptureMiddleware, path=TRAFFIC_CAPTURE_PATH)
+
+class ProfilingMiddleware:
+    """Profiles a request sent with an "X-Profile: 1" header by an admin.
+
+    The caller's bearer token (header or ?token=) is checked before sampling
+    starts, so nobody else can make the worker sample; their header is
+    ignored. An admin's response carries an X-Profile-Id header, and the
+    profile is stored once the response is done. If this worker is already
+    recording a profile the request runs unprofiled with "X-Profile-Status:
+    busy". Requests without the header only pay for the header lookup.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    async def _admin_email(scope) -> Optional[str]:
+        """Email of the admin the request's token belongs to, or None"""
+        token = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, credentials = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer":
+                    token = credentials
+        if not token:
+            token = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"))).get("token")
+        if not token:
+            return None
+        try:
+            email = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        except jwt.PyJWTError:
+            return None
+        if email is None:
+            return None
+        user = await db.users.find_one({"email": email}, {"_id": 0, "role": 1})
+        return email if user is not None and user.get("role") == "admin" else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(
+            name == b"x-profile" and value not in (b"", b"0") for name, value in scope["headers"]
+        ):
+            await self.app(scope, receive, send)
+            return
+        email = await self._admin_email(scope)
+        if email is None:
+            await self.app(scope, receive, send)
+            return
+        profiler = profiling.begin(asyncio.current_task())
+        if profiler is None:
+            async def send_busy(message):
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append("X-Profile-Status", "busy")
+                await send(message)
+
+            await self.app(scope, receive, send_busy)
+            return
+        profile_id = str(uuid.uuid4())
+
+        async def send_profiled(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        token = profiled_request.set(profiler)
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            profiled_request.reset(token)
+            route = scope.get("route")
+            await profiling.finish(
+                profiler, profile_id, kind="request", method=scope["method"], path=scope["path"],
+                route=route.path if route is not None else None, requested_by=email
+            )
+
+app.add_middleware(ProfilingMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -1802,6 +4561,63 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_background_jobs():
+    await db.board_events.create_index("seq", unique=True)
+    await db.board_events.create_index("occurred_at")
+    await db.board_events.create_index([("event_type", 1), ("occurred_at", 1)])
+    await db.inventory_checkpoints.create_index("taken_at")
+    await db.inventory_checkpoints.create_index("seq")
+    await db.category_daily_rollups.create_index([("day", 1), ("category_id", 1)], unique=True)
+    await db.boards.create_index("issued_date_time")
+    await db.boards.create_index([("location", 1), ("inward_date_time", 1)])
+    await db.boards.create_index([("location", 1), ("issued_date_time", 1)])
+    await db.repair_stints.create_index([("board_id", 1), ("ended_at", 1)])
+    await db.repair_stints.create_index([("ended_at", 1), ("category_id", 1), ("duration_hours", 1)])
+    await db.project_consumption.create_index([("project_number", 1), ("category_id", 1)], unique=True)
+    # Lookup indexes for the filters the routes issue; tests/test_query_plans.py
+    # explains every captured query against these
+    await db.users.create_index("email")
+    await db.users.create_index("id")
+    await db.boards.create_index("id")
+    await db.boards.create_index("serial_number")
+    await db.boards.create_index("condition")
+    await db.boards.create_index([("category_id", 1), ("location", 1), ("condition", 1)])
+    await db.boards.create_index([("category_id", 1), ("serial_number", 1)])
+    await db.issue_requests.create_index("id")
+    await db.issue_requests.create_index("requested_by")
+    await db.issue_requests.create_index("status")
+    await db.issue_requests.create_index("serial_number")
+    await db.issue_requests.create_index([("category_id", 1), ("serial_number", 1)])
+    await db.bulk_issue_requests.create_index("id")
+    await db.bulk_issue_requests.create_index("boards.serial_number")
+    await db.bulk_issue_requests.create_index("boards.category_id")
+    # Every worker runs these; the lock lets one do the work while the others wait and skip it
+    async with exclusive("startup_backfills"):
+        if await db.project_consumption.count_documents({}, limit=1) == 0:
+            await rebuild_project_consumption()
+        await backfill_repair_stints()
+        for collection in ("boards", "issue_requests", "bulk_issue_requests"):
+            await db[collection].create_index("updated_seq")
+            await backfill_sync_seq(collection)
+    await db.issue_requests.create_index([("requested_by", 1), ("updated_seq", 1)])
+    await db.tombstones.create_index([("collection", 1), ("updated_seq", 1)])
+    for name, size in (("slow_queries", SLOW_QUERY_LOG_BYTES), ("profiles", PROFILE_LOG_BYTES)):
+        try:
+            await db.create_collection(name, capped=True, size=size)
+        except CollectionInvalid:
+            pass
+    app.state.background_tasks = [
+        asyncio.create_task(sequence_watermarks.run()),
+        asyncio.create_task(run_inventory_checkpoints()),
+        asyncio.create_task(run_daily_rollups()),
+        await invalidation_bus.start(),
+        slow_command_log.start(),
+        event_loop_monitor.start()
+    ]
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in getattr(app.state, "background_tasks", []):
+        task.cancel()
     client.close()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark: category export of a 10k-board category.
+
+Compares the old path of get_category_export_data (per-field isoformat()
+conversion, _id stripping by dict comprehension, then FastAPI's
+jsonable_encoder + json.dumps) against clean_document + ORJSONResponse on
+boards built in memory, which runs without MongoDB.
+
+With --mongo-url the category is also seeded into a throwaway database and
+both export routes (GET /api/reports/category-export/{id} and the xlsx
+/api/reports/export/category/{id}) are timed through the app, from the
+queries to the response body, and checked to return every board.
+
+    python benchmarks/category_export_bench.py [--boards 10000] [--repeat 5]
+        [--mongo-url mongodb://localhost:27017]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from bson import ObjectId
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import ORJSONResponse  # noqa: E402
+import server  # noqa: E402
+from server import Category, User, clean_document, get_password_hash  # noqa: E402
+
+ADMIN_EMAIL = "admin@example.com"
+ADMIN_PASSWORD = "admin-secret"
+
+
+def make_boards(count, category_id=None):
+    """Board documents shaped like what Motor returns (naive UTC datetimes, ObjectId _id)"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    category_id = category_id or str(uuid.uuid4())
+    boards = []
+    for i in range(count):
+        issued = i % 3 == 0
+        boards.append({
+            "_id": ObjectId(),
+            "id": str(uuid.uuid4()),
+            "category_id": category_id,
+            "serial_number": f"SN-{i:07d}",
+            "location": "Issued for machine" if issued else "In stock",
+            "condition": "New",
+            "issued_by": "admin@example.com" if issued else None,
+            "issued_to": "operator@example.com" if issued else None,
+            "qc_by": "qc@example.com",
+            "inward_date_time": now - timedelta(days=i % 400, minutes=i),
+            "issued_date_time": now - timedelta(days=i % 30) if issued else None,
+            "project_number": f"PRJ-{i % 50:03d}" if issued else None,
+            "comments": "Benchmark board",
+            "created_at": now - timedelta(days=i % 400),
+            "created_by": "admin@example.com",
+        })
+    return boards
+
+
+def legacy_path(boards):
+    """The per-document conversion previously inlined in get_category_export_data"""
+    clean_boards = []
+    for board in boards:
+        clean_board = {k: v for k, v in board.items() if k != '_id'}
+        if 'inward_date_time' in clean_board and clean_board['inward_date_time']:
+            clean_board['inward_date_time'] = clean_board['inward_date_time'].isoformat() if hasattr(clean_board['inward_date_time'], 'isoformat') else str(clean_board['inward_date_time'])
+        if 'issued_date_time' in clean_board and clean_board['issued_date_time']:
+            clean_board['issued_date_time'] = clean_board['issued_date_time'].isoformat() if hasattr(clean_board['issued_date_time'], 'isoformat') else str(clean_board['issued_date_time'])
+        if 'created_at' in clean_board and clean_board['created_at']:
+            clean_board['created_at'] = clean_board['created_at'].isoformat() if hasattr(clean_board['created_at'], 'isoformat') else str(clean_board['created_at'])
+        clean_boards.append(clean_board)
+    content = jsonable_encoder({"boards": clean_boards})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def orjson_path(boards):
+    return ORJSONResponse({"boards": [clean_document(board) for board in boards]}).body
+
+
+def time_path(name, func, make_input, repeat):
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        data = make_input()
+        start = time.perf_counter()
+        body = func(data)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{name:<10} best {best * 1000:8.1f} ms   median {sorted(timings)[len(timings) // 2] * 1000:8.1f} ms   {len(body) / 1024:8.0f} KiB")
+    return best, body
+
+
+def seed_category(database, boards):
+    """A category with `boards` boards, a request for every tenth one and an admin; returns its id"""
+    category = Category(name="Export benchmark", description="Controller board", manufacturer="Acme",
+                        version="1.0", lead_time_days=14, minimum_stock_quantity=20, created_by=ADMIN_EMAIL).dict()
+    database.categories.insert_one(category)
+    docs = make_boards(boards, category["id"])
+    database.boards.insert_many(docs)
+    database.issue_requests.insert_many([
+        {"id": str(uuid.uuid4()), "category_id": category["id"], "serial_number": board["serial_number"],
+         "requested_by": "operator@example.com", "issued_to": "operator@example.com",
+         "project_number": "PRJ-001", "comments": None, "status": "issued",
+         "request_date_time": board["created_at"], "created_at": board["created_at"]}
+        for board in docs[::10]
+    ])
+    admin = User(email=ADMIN_EMAIL, first_name="Admin", last_name="User", role="admin").dict()
+    database.users.insert_one({**admin, "password": get_password_hash(ADMIN_PASSWORD)})
+    return category["id"]
+
+
+def time_handlers(mongo_url, boards, repeat):
+    """Time both export routes against a seeded throwaway database; False if one is incomplete"""
+    from fastapi.testclient import TestClient
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo import MongoClient
+
+    db_name = f"category_export_bench_{uuid.uuid4().hex[:8]}"
+    sync_client = MongoClient(mongo_url)
+    original_client, original_db = server.client, server.db
+    server.client = AsyncIOMotorClient(mongo_url)
+    server.db = server.client[db_name]
+    try:
+        category_id = seed_category(sync_client[db_name], boards)
+        with TestClient(server.app) as client:
+            token = client.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+            client.headers["Authorization"] = f"Bearer {token.json()['access_token']}"
+            complete = True
+            for name, path in (("json", f"/api/reports/category-export/{category_id}"),
+                               ("xlsx", f"/api/reports/export/category/{category_id}")):
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    response = client.get(path)
+                    timings.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                print(f"{name + ' route':<10} best {min(timings) * 1000:8.1f} ms   "
+                      f"median {sorted(timings)[len(timings) // 2] * 1000:8.1f} ms   {len(response.content) / 1024:8.0f} KiB")
+                if name == "json":
+                    exported = len(response.json()["boards"])
+                    complete = exported == boards
+                    print(f"{'':<10} {exported} of {boards} boards exported")
+        return complete
+    finally:
+        server.client, server.db = original_client, original_db
+        sync_client.drop_database(db_name)
+        sync_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--boards", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mongo-url", help="Also time the export routes against this MongoDB")
+    args = parser.parse_args()
+
+    template = make_boards(args.boards)
+    make_input = lambda: [dict(board) for board in template]
+
+    print(f"Category export encoding, {args.boards} boards, best of {args.repeat}")
+    legacy_time, legacy_body = time_path("legacy", legacy_path, make_input, args.repeat)
+    orjson_time, orjson_body = time_path("orjson", orjson_path, make_input, args.repeat)
+
+    identical = json.loads(legacy_body) == json.loads(orjson_body)
+    print(f"speedup {legacy_time / orjson_time:.1f}x, decoded payloads identical: {identical}")
+    complete = True
+    if args.mongo_url:
+        print(f"Export routes, {args.boards} boards in MongoDB, best of {args.repeat}")
+        complete = time_handlers(args.mongo_url, args.boards, args.repeat)
+    return 0 if identical and complete else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
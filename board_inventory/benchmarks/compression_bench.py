@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes on the wire and server CPU for a compressed /api/boards body.
+
+Renders the board list body the way get_boards does: trusted_json_response
+over at most BOARD_LIST_LIMIT boards, which is all the endpoint returns.
+Compresses it with each available codec over a range of levels, reporting
+compressed size, ratio and CPU time. The levels configured in
+server.py are marked. Brotli and zstd rows appear only when those packages
+are installed. Runs without MongoDB.
+
+    python benchmarks/compression_bench.py [--boards 1000] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+import zlib
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import server  # noqa: E402
+from category_export_bench import make_boards  # noqa: E402
+from server import Board, trusted_json_response  # noqa: E402
+
+
+def gzip_compress(level):
+    def compress(body):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(body) + compressor.flush()
+    return compress
+
+
+def codecs():
+    rows = [("gzip", level, gzip_compress(level), level == server.GZIP_LEVEL) for level in (1, 3, 6, 9)]
+    if server.brotli is not None:
+        rows += [
+            ("br", quality, lambda body, quality=quality: server.brotli.compress(body, quality=quality),
+             quality == server.BROTLI_QUALITY)
+            for quality in (1, 3, 5, 7)
+        ]
+    if server.zstandard is not None:
+        rows += [
+            ("zstd", level, lambda body, level=level: server.zstandard.ZstdCompressor(level=level).compress(body),
+             level == server.ZSTD_LEVEL)
+            for level in (1, 3, 6, 9)
+        ]
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--boards", type=int, default=server.BOARD_LIST_LIMIT,
+                        help=f"boards in the collection; the body holds at most {server.BOARD_LIST_LIMIT}")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    docs = make_boards(min(args.boards, server.BOARD_LIST_LIMIT))
+    for doc in docs:
+        del doc["_id"]
+    body = trusted_json_response(Board, docs).body
+
+    print(f"/api/boards body for {len(docs)} boards: {len(body) / 1e6:.2f} MB uncompressed, best of {args.repeat}")
+    print(f"{'codec':<6} {'level':>5} {'bytes':>12} {'ratio':>7} {'cpu ms':>9}")
+    for name, level, compress, configured in codecs():
+        cpu_times = []
+        for _ in range(args.repeat):
+            start = time.process_time()
+            compressed = compress(body)
+            cpu_times.append(time.process_time() - start)
+        marker = "  <- configured" if configured else ""
+        print(f"{name:<6} {level:>5} {len(compressed):>12,} {len(body) / len(compressed):>6.1f}x "
+              f"{min(cpu_times) * 1000:>9.1f}{marker}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
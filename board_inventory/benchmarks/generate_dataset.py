@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Populate a MongoDB database with a synthetic inventory for scale testing.
+
+Generates categories, boards, users, issue requests and bulk requests shaped
+like the documents the API writes. Boards follow realistic location/condition
+mixes, per-manufacturer serial patterns and inward/issue timestamps spread
+over --days before --as-of. Every document is derived from (--seed, its index)
+alone, so a given set of options always produces the same dataset whatever
+--processes and --batch-size are. Boards and requests are inserted by a pool
+of worker processes with unordered bulk inserts.
+
+Each board also gets the history the API would have recorded for it: its
+board_events (created, then issued or moved through Repairing), a repair
+stint for every visit to Repairing, and one inventory checkpoint per day of
+--days, so consumption rates, aging, repair turnaround and historical stock
+have data to work on. Generated events take their seqs from the board's index,
+not from time, so each checkpoint holds the full stock of its day and no
+events are replayed between them; only events written after the load are
+rolled forward. Daily category rollups (the stock trend chart) are not
+generated: they start with the app's first rollup run.
+
+    python benchmarks/generate_dataset.py --db-name inventory_scale [--boards 1000000]
+        [--categories 200] [--users 500] [--issue-requests 100000] [--bulk-requests 10000]
+        [--processes <cpu count>] [--batch-size 10000] [--seed 47] [--as-of 2026-01-01] [--drop]
+
+Load into an empty database and start the app afterwards: its startup builds
+the indexes (faster after a bulk load than during it) and rebuilds the derived
+project consumption totals. All users share --password; admin@example.com is
+an admin.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+import uuid
+from bisect import bisect
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from pymongo import MongoClient  # noqa: E402
+
+from server import (  # noqa: E402
+    AVAILABLE_PERMISSIONS, NON_ISSUED_LOCATIONS, SYNC_SEQUENCE, get_password_hash, is_stock_board
+)
+
+# (location, condition) and its share of boards
+BOARD_STATES = [
+    (("In stock", "New"), 40),
+    (("In stock", "Repaired"), 8),
+    (("In stock", "OK"), 4),
+    (("In stock", "Scrap"), 3),
+    (("Issued for machine", "OK"), 28),
+    (("Issued for spares", "OK"), 5),
+    (("At customer site", "OK"), 6),
+    (("Repairing", "Under repair"), 4),
+    (("Repairing", "Repaired"), 2),
+]
+STATES = [state for state, _ in BOARD_STATES]
+STATE_CUM_WEIGHTS = list(accumulate(weight for _, weight in BOARD_STATES))
+
+REQUEST_STATUSES = [("pending", 15), ("approved", 10), ("issued", 65), ("rejected", 10)]
+
+MANUFACTURERS = ["Acme Controls", "Borealis", "Cortex Systems", "Deltron", "Helix Embedded", "Nordic Motion"]
+# Serial pattern per manufacturer, filled with the inward year and the board's index
+SERIAL_PATTERNS = ["AC{year}-{number:07d}", "BX{number:08d}", "CS-{year}-{number:06d}-A",
+                   "DT{yy:02d}{number:07d}", "HX-{number:09d}", "NM{year}{number:07d}"]
+BOARD_FAMILIES = ["Motor controller", "Power supply", "CPU module", "IO expander", "Sensor interface",
+                  "Drive amplifier", "Safety relay", "Fieldbus gateway", "Display driver", "Encoder card"]
+DESIGNATIONS = ["Technician", "Engineer", "Store keeper", "Service engineer", "Production lead"]
+
+MASK64 = (1 << 64) - 1
+CHUNK_KINDS = {"boards": 1, "issue_requests": 2, "bulk_issue_requests": 3, "board_history": 4,
+               "inventory_checkpoints": 5}
+# board_events seqs reserved per board: created, into Repairing, back to stock
+EVENTS_PER_BOARD = 3
+DAY = timedelta(days=1)
+
+
+def item_seed(seed, kind, index):
+    """A well-mixed 64-bit seed for item `index` of a collection (splitmix64)"""
+    z = (seed * 0x9E3779B97F4A7C15 + kind * 0xD1B54A32D192ED03 + index) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+def item_uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+class Dataset:
+    """Pure functions from (options, index) to documents, shared by every worker"""
+
+    def __init__(self, options):
+        self.seed = options.seed
+        self.as_of = options.as_of
+        self.days = options.days
+        self.projects = options.projects
+        self.users = [f"user{number}@example.com" for number in range(options.users)]
+        self.categories = self.make_categories(options.categories)
+        # A few categories carry most of the stock, as in a real store
+        self.category_cum_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(options.categories)))
+        self.board_count = options.boards
+        self.issue_request_count = options.issue_requests
+
+    def make_categories(self, count):
+        rng = random.Random(self.seed)
+        categories = []
+        for number in range(count):
+            manufacturer = number % len(MANUFACTURERS)
+            categories.append({
+                "id": item_uuid(rng),
+                "name": f"{BOARD_FAMILIES[number % len(BOARD_FAMILIES)]} {chr(65 + number % 26)}{number // 26 + 1}",
+                "description": f"{BOARD_FAMILIES[number % len(BOARD_FAMILIES)]} board",
+                "manufacturer": MANUFACTURERS[manufacturer],
+                "version": f"{rng.randint(1, 4)}.{rng.randint(0, 9)}",
+                "lead_time_days": rng.choice([7, 14, 21, 30, 45, 60, 90]),
+                "minimum_stock_quantity": rng.choice([5, 10, 20, 50, 100]),
+                "picture_url": None,
+                "created_at": self.as_of - timedelta(days=self.days + rng.randint(0, 365)),
+                "created_by": "admin@example.com",
+                "_pattern": SERIAL_PATTERNS[manufacturer],
+            })
+        return categories
+
+    def category_documents(self):
+        return [{key: value for key, value in category.items() if key != "_pattern"} for category in self.categories]
+
+    def board(self, index):
+        rng = random.Random(item_seed(self.seed, CHUNK_KINDS["boards"], index))
+        category = self.categories[bisect(self.category_cum_weights, rng.random() * self.category_cum_weights[-1])]
+        location, condition = STATES[bisect(STATE_CUM_WEIGHTS, rng.random() * STATE_CUM_WEIGHTS[-1])]
+        # Inward dates lean towards the recent past
+        inward = self.as_of - timedelta(minutes=int(self.days * 1440 * rng.random() ** 1.5))
+        issued = location != "In stock"
+        issued_at = inward + timedelta(hours=rng.expovariate(1 / 240)) if issued else None
+        if issued_at and issued_at > self.as_of:
+            issued_at = self.as_of
+        away = location not in NON_ISSUED_LOCATIONS
+        return {
+            "id": item_uuid(rng),
+            "category_id": category["id"],
+            "serial_number": category["_pattern"].format(year=inward.year, yy=inward.year % 100, number=index),
+            "location": location,
+            "condition": condition,
+            "issued_by": "admin@example.com" if issued else None,
+            "issued_to": rng.choice(self.users) if issued else None,
+            "qc_by": rng.choice(self.users) if rng.random() < 0.3 else None,
+            "inward_date_time": inward,
+            "issued_date_time": issued_at,
+            "project_number": self.project(rng) if away else None,
+            "comments": "Returned from field" if condition == "Repaired" else None,
+            "created_at": inward,
+            "created_by": "admin@example.com",
+            "updated_seq": index + 1,
+        }
+
+    def board_history(self, index):
+        """A board with the events and repair stints that led to its current state.
+
+        Every board is inwarded; issued boards come in as New stock and are
+        issued at issued_date_time, Repairing ones are moved there at
+        issued_date_time (as update_board stamps it), and In stock Repaired
+        ones went through one repair that has ended.
+        """
+        board = self.board(index)
+        rng = random.Random(item_seed(self.seed, CHUNK_KINDS["board_history"], index))
+        location, condition = board["location"], board["condition"]
+        inwarded = {**board, "location": "In stock", "condition": "New"}
+        stints = []
+        if location == "In stock" and condition == "Repaired":
+            started = min(board["inward_date_time"] + timedelta(hours=rng.expovariate(1 / 240)), self.as_of)
+            ended = min(started + timedelta(hours=rng.expovariate(1 / 120)), self.as_of)
+            steps = [("created", board["inward_date_time"], inwarded),
+                     ("updated", started, {**board, "condition": "Under repair", "location": "Repairing"}),
+                     ("updated", ended, board)]
+            stints.append({"board_id": board["id"], "category_id": board["category_id"], "started_at": started,
+                           "ended_at": ended, "duration_hours": (ended - started).total_seconds() / 3600})
+        elif location == "Repairing":
+            steps = [("created", board["inward_date_time"], inwarded),
+                     ("updated", board["issued_date_time"], board)]
+            stints.append({"board_id": board["id"], "category_id": board["category_id"],
+                           "started_at": board["issued_date_time"], "ended_at": None, "duration_hours": None})
+        elif location != "In stock":
+            steps = [("created", board["inward_date_time"], inwarded),
+                     ("issued", board["issued_date_time"], board)]
+        else:
+            steps = [("created", board["inward_date_time"], board)]
+
+        events = []
+        before = None
+        for offset, (event_type, occurred_at, after) in enumerate(steps):
+            events.append({
+                "seq": index * EVENTS_PER_BOARD + offset + 1,
+                "board_id": board["id"],
+                "category_id": board["category_id"],
+                "serial_number": board["serial_number"],
+                "event_type": event_type,
+                "location": after["location"],
+                "condition": after["condition"],
+                "stock_delta": int(is_stock_board(after)) - int(is_stock_board(before)),
+                "occurred_at": occurred_at,
+                "user": "admin@example.com",
+            })
+            before = after
+        return board, events, stints
+
+    def history_day(self, occurred_at):
+        """Index of the first daily checkpoint that includes something that happened at occurred_at"""
+        return -(-(occurred_at - (self.as_of - self.days * DAY)) // DAY)
+
+    def project(self, rng):
+        return f"PRJ-{int(self.projects * rng.random() ** 2):04d}"
+
+    def issued_board(self, rng):
+        """A board that is out on a project, to be the fulfilment of an issued request"""
+        for _ in range(50):
+            board = self.board(rng.randrange(self.board_count))
+            if board["project_number"]:
+                return board
+        return None
+
+    def issue_request(self, index):
+        rng = random.Random(item_seed(self.seed, CHUNK_KINDS["issue_requests"], index))
+        status = rng.choices([status for status, _ in REQUEST_STATUSES], [w for _, w in REQUEST_STATUSES])[0]
+        board = self.issued_board(rng) if status == "issued" and self.board_count else None
+        requested_at = board["issued_date_time"] - timedelta(hours=rng.uniform(1, 72)) if board else \
+            self.as_of - timedelta(minutes=int(self.days * 1440 * rng.random() ** 2))
+        approved = status in ("approved", "issued")
+        return {
+            "id": item_uuid(rng),
+            "category_id": board["category_id"] if board else rng.choice(self.categories)["id"],
+            "serial_number": board["serial_number"] if board else None,
+            "requested_by": rng.choice(self.users),
+            "issued_to": board["issued_to"] if board else rng.choice(self.users),
+            "project_number": board["project_number"] if board else self.project(rng),
+            "comments": None,
+            "status": status,
+            "request_date_time": requested_at,
+            "approved_by": "admin@example.com" if approved else None,
+            "approved_date_time": requested_at + timedelta(minutes=rng.randint(5, 600)) if approved else None,
+            "created_at": requested_at,
+            "requested_by_name": None,
+            "issued_to_name": None,
+            "updated_seq": self.board_count + index + 1,
+        }
+
+    def bulk_request(self, index):
+        rng = random.Random(item_seed(self.seed, CHUNK_KINDS["bulk_issue_requests"], index))
+        status = rng.choices(["pending", "approved", "issued"], [20, 15, 65])[0]
+        boards = []
+        for _ in range(rng.randint(2, 10)):
+            board = self.issued_board(rng) if status == "issued" and self.board_count else None
+            if board:
+                boards.append({"category_id": board["category_id"], "serial_number": board["serial_number"],
+                               "condition": board["condition"], "quantity": None})
+            else:
+                boards.append({"category_id": rng.choice(self.categories)["id"], "serial_number": None,
+                               "condition": None, "quantity": rng.randint(1, 5)})
+        created = self.as_of - timedelta(minutes=int(self.days * 1440 * rng.random() ** 2))
+        return {
+            "id": item_uuid(rng),
+            "boards": boards,
+            "requested_by": rng.choice(self.users),
+            "issued_to": rng.choice(self.users),
+            "project_number": self.project(rng),
+            "comments": None,
+            "status": status,
+            "approved_by": "admin@example.com" if status != "pending" else None,
+            "created_date": created.isoformat(),
+            "approved_date": (created + timedelta(hours=rng.uniform(1, 48))).isoformat() if status != "pending" else None,
+            "requested_by_name": None,
+            "issued_to_name": None,
+            "updated_seq": self.board_count + self.issue_request_count + index + 1,
+        }
+
+
+_worker = {}
+
+
+def start_worker(options):
+    _worker["dataset"] = Dataset(options)
+    _worker["db"] = MongoClient(options.mongo_url)[options.db_name]
+
+
+def insert_boards(start, stop):
+    """Insert boards [start, stop) with their history; returns stock deltas by (checkpoint day, category)"""
+    dataset = _worker["dataset"]
+    db = _worker["db"]
+    boards, events, stints = [], [], []
+    for index in range(start, stop):
+        board, board_events, board_stints = dataset.board_history(index)
+        boards.append(board)
+        events.extend(board_events)
+        stints.extend(board_stints)
+    db.boards.insert_many(boards, ordered=False)
+    db.board_events.insert_many(events, ordered=False)
+    if stints:
+        db.repair_stints.insert_many(stints, ordered=False)
+    deltas = Counter()
+    for event in events:
+        if event["stock_delta"]:
+            deltas[dataset.history_day(event["occurred_at"]), event["category_id"]] += event["stock_delta"]
+    return deltas
+
+
+def insert_chunk(task):
+    """Generate and insert documents [start, stop) of one collection; returns the count and any stock deltas"""
+    collection, start, stop = task
+    dataset = _worker["dataset"]
+    if collection == "boards":
+        return collection, stop - start, insert_boards(start, stop)
+    make = {"issue_requests": dataset.issue_request, "bulk_issue_requests": dataset.bulk_request}[collection]
+    _worker["db"][collection].insert_many([make(index) for index in range(start, stop)], ordered=False)
+    return collection, stop - start, Counter()
+
+
+def user_documents(options, dataset):
+    password = get_password_hash(options.password)
+    rng = random.Random(options.seed)
+    users = [{
+        "id": item_uuid(rng),
+        "email": "admin@example.com",
+        "first_name": "Admin",
+        "last_name": "User",
+        "designation": "Administrator",
+        "role": "admin",
+        "permissions": list(AVAILABLE_PERMISSIONS),
+        "created_at": options.as_of - timedelta(days=options.days),
+        "is_active": True,
+        "password": password,
+    }]
+    for number, email in enumerate(dataset.users):
+        users.append({
+            "id": item_uuid(rng),
+            "email": email,
+            "first_name": "User",
+            "last_name": str(number),
+            "designation": rng.choice(DESIGNATIONS),
+            "role": "user",
+            "permissions": rng.sample(AVAILABLE_PERMISSIONS, rng.randint(2, 6)),
+            "created_at": options.as_of - timedelta(days=rng.randint(0, options.days)),
+            "is_active": rng.random() > 0.05,
+            "password": password,
+        })
+    return users
+
+
+def checkpoint_documents(options, deltas):
+    """One checkpoint per day of history from the generated stock deltas.
+
+    The historical checkpoints share the last generated event seq, so a stock
+    query between two of them replays nothing and answers with the earlier
+    day's stock. The one at --as-of takes the seq after it, so that it alone
+    is the latest checkpoint the app rolls forward from.
+    """
+    last_event_seq = options.boards * EVENTS_PER_BOARD
+    start = options.as_of - options.days * DAY
+    rng = random.Random(item_seed(options.seed, CHUNK_KINDS["inventory_checkpoints"], 0))
+    stock = Counter()
+    checkpoints = []
+    for day in range(options.days + 1):
+        for category_id, delta in deltas.get(day, {}).items():
+            stock[category_id] += delta
+        checkpoints.append({
+            "id": item_uuid(rng),
+            "seq": last_event_seq + 1 if day == options.days else last_event_seq,
+            "taken_at": start + day * DAY,
+            "stock": {category_id: count for category_id, count in stock.items() if count},
+        })
+    return checkpoints
+
+
+def parse_as_of(text):
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mongo-url", default=os.environ["MONGO_URL"])
+    parser.add_argument("--db-name", required=True)
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--boards", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--issue-requests", type=int, default=100000)
+    parser.add_argument("--bulk-requests", type=int, default=10000)
+    parser.add_argument("--projects", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=3 * 365, help="History covered by inward dates")
+    parser.add_argument("--as-of", type=parse_as_of,
+                        default=datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0),
+                        help="Date the history ends at (default today); fix it for byte-identical reruns")
+    parser.add_argument("--seed", type=int, default=47)
+    parser.add_argument("--password", default="password", help="Password of every generated user")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--drop", action="store_true", help="Drop the database first")
+    options = parser.parse_args()
+
+    db = MongoClient(options.mongo_url)[options.db_name]
+    if options.drop:
+        db.client.drop_database(options.db_name)
+    elif db.boards.estimated_document_count():
+        raise SystemExit(f"{options.db_name} already has boards; pass --drop to replace them")
+
+    started = time.perf_counter()
+    dataset = Dataset(options)
+    db.categories.insert_many(dataset.category_documents())
+    db.users.insert_many(user_documents(options, dataset))
+
+    tasks = [
+        (collection, start, min(start + options.batch_size, total))
+        for collection, total in (("boards", options.boards), ("issue_requests", options.issue_requests),
+                                  ("bulk_issue_requests", options.bulk_requests))
+        for start in range(0, total, options.batch_size)
+    ]
+    inserted = {"boards": 0, "issue_requests": 0, "bulk_issue_requests": 0}
+    deltas = {}
+    with multiprocessing.Pool(options.processes, initializer=start_worker, initargs=(options,)) as pool:
+        for collection, count, chunk_deltas in pool.imap_unordered(insert_chunk, tasks):
+            inserted[collection] += count
+            for (day, category_id), delta in chunk_deltas.items():
+                deltas.setdefault(day, Counter())[category_id] += delta
+            elapsed = time.perf_counter() - started
+            print(f"\r{elapsed:7.1f}s  " + "  ".join(f"{name} {done:,}" for name, done in inserted.items()),
+                  end="", flush=True)
+    print()
+
+    # Later writes through the API continue the delta sync sequence after the generated documents
+    last_seq = options.boards + options.issue_requests + options.bulk_requests
+    db.counters.update_one({"_id": SYNC_SEQUENCE}, {"$max": {"seq": last_seq}}, upsert=True)
+    # and board events continue after the seq of the latest checkpoint
+    checkpoints = checkpoint_documents(options, deltas)
+    db.inventory_checkpoints.insert_many(checkpoints)
+    db.counters.update_one({"_id": "board_events"}, {"$max": {"seq": checkpoints[-1]["seq"]}}, upsert=True)
+
+    elapsed = time.perf_counter() - started
+    total = sum(inserted.values()) + len(dataset.categories) + options.users + 1 + len(checkpoints)
+    print(f"{total:,} documents in {elapsed:.1f}s ({total / elapsed:,.0f}/s) into {options.db_name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
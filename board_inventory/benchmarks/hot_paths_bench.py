@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for hot paths in server.py, checked against a stored baseline.
+
+Covers JWT encode (create_access_token) and the decode + User(**doc) work of
+get_current_user, check_permission, Board(**doc) over 1k/10k documents,
+the category export's serialization (clean_document and ORJSONResponse over
+documents as Motor returns them, with _id and naive datetimes), and
+build_category_workbook at 1k/10k/100k rows. Each case reports the best
+per-call time. A case slower than its baseline by more than --threshold is a
+regression, and the script exits 1. Runs without MongoDB.
+
+    python benchmarks/hot_paths_bench.py [--filter workbook] [--quick]
+        [--threshold 0.25] [--baseline benchmarks/baselines/hot_paths.json]
+        [--save-baseline]
+
+Baselines are machine specific: save one on the machine you compare on.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import jwt  # noqa: E402
+from fastapi.responses import ORJSONResponse  # noqa: E402
+
+from category_export_bench import make_boards  # noqa: E402
+from server import (  # noqa: E402
+    ALGORITHM, SECRET_KEY, Board, User, build_category_workbook, check_permission, clean_document,
+    create_access_token
+)
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "hot_paths.json"
+# Each case is timed for at least this long per round
+MIN_ROUND_SECONDS = 0.2
+ROUNDS = 5
+
+
+def jwt_cases():
+    token = create_access_token({"sub": "operator@example.com"}, expires_delta=timedelta(minutes=30))
+    user_doc = User(email="operator@example.com", first_name="Op", last_name="Erator",
+                    permissions=["view_boards", "view_reports", "export_reports"]).dict()
+
+    def current_user():
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        assert payload["sub"] == user_doc["email"]
+        return User(**user_doc)
+
+    return {
+        "create_access_token": lambda: create_access_token(
+            {"sub": "operator@example.com"}, expires_delta=timedelta(minutes=30)),
+        "get_current_user (decode + User)": current_user,
+    }
+
+
+def permission_cases():
+    admin = User(email="admin@example.com", role="admin")
+    user = User(email="user@example.com", permissions=["view_boards", "view_issue_requests", "view_reports"])
+    return {
+        "check_permission admin": lambda: check_permission(admin, "export_reports"),
+        "check_permission user (denied)": lambda: check_permission(user, "export_reports"),
+    }
+
+
+def board_docs(count):
+    docs = make_boards(count)
+    for doc in docs:
+        del doc["_id"]
+    return docs
+
+
+def export_response(stored):
+    """What get_category_export_data does with the boards it reads.
+
+    clean_document pops _id in place, so each call works on fresh copies, as
+    it would on the documents Motor decodes for every request.
+    """
+    boards = [clean_document(dict(doc)) for doc in stored]
+    return ORJSONResponse({"boards": boards})
+
+
+def model_cases(sizes):
+    cases = {}
+    for size in sizes:
+        docs = board_docs(size)
+        cases[f"Board(**doc) x{size}"] = lambda docs=docs: [Board(**doc) for doc in docs]
+        stored = make_boards(size)
+        cases[f"export serialization x{size}"] = lambda stored=stored: export_response(stored)
+    return cases
+
+
+def workbook_cases(sizes):
+    category = {
+        "id": "cat-1", "name": "Controller", "description": "Controller board", "manufacturer": "Acme",
+        "version": "1.0", "lead_time_days": 14, "minimum_stock_quantity": 20, "created_by": "admin@example.com",
+    }
+    cases = {}
+    for size in sizes:
+        boards = board_docs(size)
+        requests = [
+            {"id": f"req-{i}", "serial_number": board["serial_number"], "status": "issued",
+             "requested_by": "operator@example.com", "issued_to": board["issued_to"],
+             "project_number": board["project_number"], "comments": ""}
+            for i, board in enumerate(boards[:size // 10])
+        ]
+        cases[f"build_category_workbook {size} rows"] = \
+            lambda boards=boards, requests=requests: build_category_workbook(category, boards, requests)
+    return cases
+
+
+def all_cases(quick):
+    cases = {}
+    cases.update(jwt_cases())
+    cases.update(permission_cases())
+    cases.update(model_cases((1000,) if quick else (1000, 10000)))
+    cases.update(workbook_cases((1000,) if quick else (1000, 10000, 100000)))
+    return cases
+
+
+def measure(func):
+    """Best per-call seconds over ROUNDS rounds of enough calls to fill MIN_ROUND_SECONDS"""
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_ROUND_SECONDS:
+            break
+        calls = max(calls * 2, int(calls * MIN_ROUND_SECONDS / max(elapsed, 1e-9)))
+    best = elapsed / calls
+    for _ in range(ROUNDS - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.3f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filter", help="Only run cases whose name contains this text")
+    parser.add_argument("--quick", action="store_true", help="Skip the 10k and 100k sizes")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline, as a fraction")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Record these timings as the new baseline")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"cases": {}}
+    if baseline.get("platform") and baseline["platform"] != platform.platform():
+        print(f"Note: baseline was recorded on {baseline['platform']}, timings may not be comparable")
+
+    results = {}
+    regressions = []
+    print(f"{'case':<42} {'best':>12} {'baseline':>12} {'change':>8}")
+    for name, func in all_cases(args.quick).items():
+        if args.filter and args.filter not in name:
+            continue
+        seconds = measure(func)
+        results[name] = seconds
+        before = baseline["cases"].get(name)
+        change = ""
+        if before:
+            ratio = seconds / before - 1
+            change = f"{ratio * 100:+.1f}%"
+            if ratio > args.threshold:
+                regressions.append(name)
+                change += "  REGRESSION"
+        print(f"{name:<42} {format_seconds(seconds):>12} {format_seconds(before) if before else '-':>12} {change:>8}")
+
+    if args.save_baseline:
+        baseline["cases"].update(results)
+        baseline.update({"platform": platform.platform(), "python": platform.python_version()})
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
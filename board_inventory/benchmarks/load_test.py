@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent virtual users running operator workflows.
+
+Each virtual user logs in and then repeatedly picks a workflow from the mix:
+searching, inwarding a range of serial numbers, raising, approving and
+outwarding an issue request, direct outward, exports, and the dashboard.
+Reports throughput and p50/p95/p99 latency per endpoint, and saves the
+results as JSON so runs on different commits can be compared.
+
+Without --base-url the script starts the app with uvicorn against a local
+MongoDB, using a scratch database that is dropped afterwards. It then sets
+up categories and starting stock through the API.
+
+    python benchmarks/load_test.py [--users 20] [--duration 60] [--rate 0]
+        [--mix search=40,dashboard=15,inward=10,issue=15,outward=10,export=5,login=5]
+        [--base-url http://localhost:8001] [--mongo-url mongodb://localhost:27017]
+        [--output results.json] [--compare previous.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+from pymongo import MongoClient
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+WORKFLOWS = ("search", "dashboard", "inward", "issue", "outward", "export", "login")
+DEFAULT_MIX = "search=40,dashboard=15,inward=10,issue=15,outward=10,export=5,login=5"
+PASSWORD = "loadtest-secret"
+
+
+class Stats:
+    """Latencies and outcomes per endpoint, shared by all virtual users.
+
+    4xx answers (say, outward once a category runs out of stock) are part of
+    the workflows and only show up in the status counts; errors are 5xx
+    answers and failed connections.
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+            if status == "error" or status >= 500:
+                self.errors[endpoint] += 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": self.errors[endpoint],
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "max_ms": round(latencies[-1] * 1000, 2),
+                "statuses": {str(status): count for status, count in self.statuses[endpoint].items()},
+            }
+        total = sum(endpoint["requests"] for endpoint in endpoints.values())
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "requests": total,
+            "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+            "throughput_rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Pacer:
+    """Hands out workflow start times so all users together start `rate` workflows per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            start = max(self.next_start, time.perf_counter())
+            self.next_start = start + self.interval
+        delay = start - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class VirtualUser:
+    def __init__(self, number, base_url, stats, fixtures, seed):
+        self.number = number
+        self.api = f"{base_url}/api"
+        self.stats = stats
+        self.fixtures = fixtures
+        self.rng = random.Random(seed)
+        self.session = requests.Session()
+        self.email = fixtures["users"][number]
+        self.serial_counter = 0
+
+    def request(self, endpoint, method, path, **kwargs):
+        """Issue one request, recorded under the route template `endpoint`"""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.api}{path}", timeout=120, **kwargs)
+        except requests.RequestException:
+            self.stats.record(endpoint, time.perf_counter() - start, "error")
+            return None
+        self.stats.record(endpoint, time.perf_counter() - start, response.status_code)
+        return response if response.ok else None
+
+    def login(self):
+        response = self.request("POST /api/auth/login", "POST", "/auth/login",
+                                json={"email": self.email, "password": PASSWORD})
+        if response is not None:
+            self.session.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    def search(self):
+        category_id = self.rng.choice(self.fixtures["categories"])
+        if self.rng.random() < 0.5:
+            response = self.request("GET /api/search", "GET", "/search",
+                                    params={"category_id": category_id, "location": "In stock"})
+        else:
+            response = self.request("GET /api/search", "GET", "/search",
+                                    params={"query": f"LT-{self.rng.randrange(100):02d}"})
+        if response is not None and response.json():
+            board = self.rng.choice(response.json())
+            self.request("GET /api/boards/{board_id}", "GET", f"/boards/{board['id']}")
+
+    def dashboard(self):
+        self.request("GET /api/dashboard/stats", "GET", "/dashboard/stats")
+        self.request("GET /api/reports/stock", "GET", "/reports/stock")
+        self.request("GET /api/reports/low-stock", "GET", "/reports/low-stock")
+
+    def inward(self):
+        """Inward a consecutive range of serial numbers, as an operator unpacking a delivery does"""
+        category_id = self.rng.choice(self.fixtures["categories"])
+        for _ in range(self.rng.randint(5, 20)):
+            self.serial_counter += 1
+            self.request("POST /api/boards", "POST", "/boards", json={
+                "category_id": category_id,
+                "serial_number": f"LT-{self.fixtures['run_id']}-{self.number:03d}-{self.serial_counter:06d}",
+                "condition": "New",
+            })
+
+    def issue(self):
+        category_id = self.rng.choice(self.fixtures["categories"])
+        response = self.request("POST /api/issue-requests", "POST", "/issue-requests", json={
+            "category_id": category_id, "issued_to": self.email, "project_number": self.project_number()})
+        if response is None:
+            return
+        request_id = response.json()["id"]
+        self.request("GET /api/issue-requests", "GET", "/issue-requests")
+        if self.request("PUT /api/issue-requests/{request_id}", "PUT", f"/issue-requests/{request_id}",
+                        json={"status": "approved"}) is not None:
+            self.request("POST /api/outward", "POST", "/outward", json={"request_id": request_id})
+
+    def outward(self):
+        category_id = self.rng.choice(self.fixtures["categories"])
+        response = self.request("POST /api/boards/preview-auto-select", "POST", "/boards/preview-auto-select",
+                                json={"category_id": category_id, "quantity": 1})
+        if response is None:
+            return
+        board = response.json()["selected_boards"][0]
+        self.request("POST /api/outward", "POST", "/outward", json={
+            "board_id": board["id"], "issued_to": self.email, "project_number": self.project_number()})
+
+    def export(self):
+        if self.rng.random() < 0.5:
+            category_id = self.rng.choice(self.fixtures["categories"])
+            self.request("GET /api/reports/export/category/{category_id}", "GET",
+                         f"/reports/export/category/{category_id}")
+        else:
+            self.request("GET /api/reports/export/low-stock", "GET", "/reports/export/low-stock")
+
+    def project_number(self):
+        return f"PRJ-{self.rng.randrange(20):03d}"
+
+    def run(self, mix, deadline, pacer, think_time):
+        workflows, weights = zip(*mix.items())
+        self.login()
+        while time.perf_counter() < deadline:
+            if pacer:
+                pacer.wait()
+                if time.perf_counter() >= deadline:
+                    break
+            getattr(self, self.rng.choices(workflows, weights)[0])()
+            if think_time:
+                time.sleep(self.rng.uniform(0, 2 * think_time))
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in WORKFLOWS:
+            raise SystemExit(f"Unknown workflow in --mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_stack(args, db_name):
+    port = free_port()
+    env = {**os.environ, "MONGO_URL": args.mongo_url, "DB_NAME": db_name}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--workers", str(args.workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"uvicorn exited with code {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/api/health", timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise SystemExit("The app did not become healthy within 60 seconds")
+
+
+def set_up_fixtures(base_url, args, run_id):
+    """Register the virtual users (as admins, so every workflow is permitted), categories and starting stock"""
+    api = f"{base_url}/api"
+    users = [f"loadtest-{run_id}-{number}@example.com" for number in range(args.users)]
+    for email in users:
+        response = requests.post(f"{api}/auth/register", json={
+            "email": email, "first_name": "Load", "last_name": "Test", "designation": "Operator",
+            "password": PASSWORD})
+        response.raise_for_status()
+        requests.post(f"{api}/setup-admin", params={"email": email}).raise_for_status()
+
+    session = requests.Session()
+    token = requests.post(f"{api}/auth/login", json={"email": users[0], "password": PASSWORD}).json()["access_token"]
+    session.headers["Authorization"] = f"Bearer {token}"
+    categories = []
+    for number in range(args.categories):
+        response = session.post(f"{api}/categories", json={
+            "name": f"Load test board {run_id}-{number}", "description": "Load test", "manufacturer": "Acme",
+            "version": "1.0", "lead_time_days": 14, "minimum_stock_quantity": args.stock // 2})
+        response.raise_for_status()
+        category_id = response.json()["id"]
+        categories.append(category_id)
+        for serial in range(args.stock):
+            session.post(f"{api}/boards", json={
+                "category_id": category_id, "serial_number": f"LT-{number:02d}-{serial:06d}", "condition": "New",
+            }).raise_for_status()
+    return {"run_id": run_id, "users": users, "categories": categories}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(summary, previous=None):
+    print(f"{summary['requests']} requests in {summary['elapsed_seconds']} s, "
+          f"{summary['throughput_rps']} req/s, {summary['errors']} errors")
+    header = f"{'endpoint':<58} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    if previous:
+        header += f" {'p95 vs prev':>12}"
+    print(header)
+    for endpoint, row in summary["endpoints"].items():
+        line = (f"{endpoint:<58} {row['requests']:>7} {row['errors']:>5} {row['throughput_rps']:>8} "
+                f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+        before = previous["endpoints"].get(endpoint) if previous else None
+        if before and before["p95_ms"]:
+            line += f" {(row['p95_ms'] / before['p95_ms'] - 1) * 100:>+11.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run after set-up")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="Workflows started per second across all users; 0 runs each user flat out")
+    parser.add_argument("--think-time", type=float, default=0, help="Mean pause between a user's workflows")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Workflow weights, name=weight,...")
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--stock", type=int, default=100, help="Boards inwarded per category during set-up")
+    parser.add_argument("--base-url", help="Run against an already running app instead of starting one")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local stack")
+    parser.add_argument("--keep-db", action="store_true", help="Keep the scratch database of the local stack")
+    parser.add_argument("--seed", type=int, default=45)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Results JSON of an earlier run to compare p95 latencies with")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    run_id = uuid.uuid4().hex[:6]
+    db_name = f"loadtest_{run_id}"
+    process = None
+    base_url = args.base_url
+    if not base_url:
+        process, base_url = start_local_stack(args, db_name)
+    try:
+        print(f"Setting up {args.users} users, {args.categories} categories x {args.stock} boards on {base_url}")
+        fixtures = set_up_fixtures(base_url, args, run_id)
+
+        stats = Stats()
+        pacer = Pacer(args.rate) if args.rate else None
+        started = time.perf_counter()
+        deadline = started + args.duration
+        threads = [
+            threading.Thread(
+                target=VirtualUser(number, base_url, stats, fixtures, args.seed + number).run,
+                args=(mix, deadline, pacer, args.think_time),
+            )
+            for number in range(args.users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        summary = stats.summary(time.perf_counter() - started)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+            if not args.keep_db:
+                MongoClient(args.mongo_url).drop_database(db_name)
+
+    results = {
+        "commit": git_commit(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "mix": mix,
+        **summary,
+    }
+    previous = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_summary(results, previous)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Replay captured traffic against a local instance and compare latencies.
+
+Reads the JSON-lines traces written by the server's TrafficCaptureMiddleware
+(TRAFFIC_CAPTURE_PATH, including rotated .1, .2 ... files) and re-issues each
+request at its recorded offset, divided by --speed (0 sends as fast as
+--concurrency allows). Recorded credentials are substituted: each request is
+sent with a token for a local user of the recorded role (--login role=email:
+password, falling back to --email/--password), redacted ?token= parameters
+get the same token, and redacted passwords in bodies get the local user's.
+Bodies recorded as a shape (the server's default) are filled in: "<email>"
+with a fresh example.com address and "<str:N>" with N filler characters, as
+are "<str:N>" search parameters; full bodies (TRAFFIC_CAPTURE_FULL_BODIES=1)
+are sent as recorded. Emails in paths and query parameters are recorded as
+"<email:PSEUDONYM>"; given the recording server's --secret-key, each is
+replaced by the local user with that pseudonym, otherwise (or for unknown
+ones) by an example.com address that stays the same for the whole replay.
+Reports recorded versus replayed p50/p95 per route and status mismatches.
+
+    python benchmarks/replay_traffic.py traffic.jsonl [traffic.jsonl.1 ...]
+        --base-url http://localhost:8001 [--speed 1] [--concurrency 32]
+        [--email admin@example.com --password password] [--login user=user1@example.com:password]
+        [--secret-key KEY] [--limit 10000] [--output replay.json]
+
+The local database should hold the same documents as the recorded one (for
+instance a restored backup), or requests for recorded IDs will 404.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+REDACTED = "<redacted>"
+SHAPE_EMAIL = "<email>"
+SHAPE_STRING = re.compile(r"<str:(\d+)>")
+SHAPE_PSEUDONYM = re.compile(r"<email:([0-9a-f]+)>")
+LOGIN_ROUTES = {"/api/auth/login"}
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def load_traces(paths, limit):
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as trace_file:
+            records.extend(json.loads(line) for line in trace_file if line.strip())
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+
+class Credentials:
+    """Local users standing in for the recorded callers, by role"""
+
+    def __init__(self, base_url, default, by_role):
+        self.base_url = base_url
+        self.accounts = {"default": default, **by_role}
+        self.tokens = {}
+
+    def login(self):
+        for role, (email, password) in self.accounts.items():
+            response = requests.post(f"{self.base_url}/api/auth/login", json={"email": email, "password": password})
+            if not response.ok:
+                raise SystemExit(f"Login as {email} for role {role} failed: {response.status_code} {response.text}")
+            self.tokens[role] = response.json()["access_token"]
+
+    def account(self, role):
+        return self.accounts.get(role) or self.accounts["default"]
+
+    def token(self, role):
+        return self.tokens.get(role) or self.tokens["default"]
+
+
+def pseudonym(email, secret_key):
+    """The recording server's pseudonym for an email (trace_pseudonym in server.py)"""
+    return hashlib.blake2b(email.encode(), key=secret_key.encode()[:64], digest_size=6).hexdigest()
+
+
+class Pseudonyms:
+    """Local emails standing in for the pseudonymized ones in recorded paths and query parameters"""
+
+    def __init__(self, base_url, token, secret_key):
+        self.emails = {}
+        if secret_key:
+            response = requests.get(f"{base_url}/api/users", params={"fields": "email"},
+                                    headers={"Authorization": f"Bearer {token}"})
+            if not response.ok:
+                raise SystemExit(f"Listing local users failed: {response.status_code} {response.text}")
+            self.emails = {pseudonym(user["email"], secret_key): user["email"] for user in response.json()}
+
+    def email(self, recorded):
+        return self.emails.get(recorded) or f"replay-{recorded}@example.com"
+
+    def substitute(self, text):
+        """Recorded path or query text with local emails and filler for "<str:N>" search text"""
+        match = SHAPE_STRING.fullmatch(text)
+        if match:
+            return "x" * int(match.group(1))
+        return SHAPE_PSEUDONYM.sub(lambda match: self.email(match.group(1)), text)
+
+
+def substitute(value, password, shape=False):
+    """A recorded body with the local password, and with values made up for a body shape"""
+    if isinstance(value, dict):
+        return {key: substitute(item, password, shape) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, password, shape) for item in value]
+    if value == REDACTED:
+        return password
+    if shape and value == SHAPE_EMAIL:
+        return f"replay-{uuid.uuid4().hex[:12]}@example.com"
+    if shape and isinstance(value, str):
+        match = SHAPE_STRING.fullmatch(value)
+        if match:
+            return "x" * int(match.group(1))
+    return value
+
+
+def build_request(record, credentials, pseudonyms):
+    role = record.get("role")
+    email, password = credentials.account(role)
+    token = credentials.token(role)
+    params = [
+        (key, token if value == REDACTED else pseudonyms.substitute(value)) for key, value in record.get("query", [])
+    ]
+    body = record.get("body")
+    if body is not None:
+        body = substitute(body, password)
+    elif "body_shape" in record:
+        body = substitute(record["body_shape"], password, shape=True)
+    if body is not None and record.get("route") in LOGIN_ROUTES:
+        body = {**body, "email": email}
+    headers = {"Authorization": f"Bearer {token}"} if role else {}
+    return {
+        "method": record["method"], "url": pseudonyms.substitute(record["path"]), "params": params, "json": body,
+        "headers": headers,
+    }
+
+
+class Results:
+    def __init__(self):
+        self.rows = defaultdict(lambda: {"recorded": [], "replayed": [], "status_mismatches": 0, "errors": 0})
+        self._lock = threading.Lock()
+
+    def add(self, record, seconds, status):
+        label = f"{record['method']} {record.get('route') or record['path']}"
+        with self._lock:
+            row = self.rows[label]
+            row["recorded"].append(record["duration_ms"])
+            if status is None:
+                row["errors"] += 1
+                return
+            row["replayed"].append(seconds * 1000)
+            if status != record["status"]:
+                row["status_mismatches"] += 1
+
+    def summary(self):
+        summary = {}
+        for label, row in sorted(self.rows.items()):
+            recorded, replayed = sorted(row["recorded"]), sorted(row["replayed"])
+            entry = {
+                "requests": len(recorded),
+                "errors": row["errors"],
+                "status_mismatches": row["status_mismatches"],
+                "recorded_p50_ms": round(percentile(recorded, 50), 2),
+                "recorded_p95_ms": round(percentile(recorded, 95), 2),
+                "replayed_p50_ms": round(percentile(replayed, 50), 2),
+                "replayed_p95_ms": round(percentile(replayed, 95), 2),
+            }
+            if entry["recorded_p95_ms"] and replayed:
+                entry["p95_delta_pct"] = round((entry["replayed_p95_ms"] / entry["recorded_p95_ms"] - 1) * 100, 1)
+            summary[label] = entry
+        return summary
+
+
+def replay(records, base_url, credentials, pseudonyms, speed, concurrency):
+    session_local = threading.local()
+    results = Results()
+
+    def send(record):
+        session = getattr(session_local, "session", None)
+        if session is None:
+            session = session_local.session = requests.Session()
+        request = build_request(record, credentials, pseudonyms)
+        request["url"] = f"{base_url}{request['url']}"
+        start = time.perf_counter()
+        try:
+            response = session.request(timeout=300, **request)
+        except requests.RequestException:
+            results.add(record, time.perf_counter() - start, None)
+            return
+        results.add(record, time.perf_counter() - start, response.status_code)
+
+    first_ts = records[0]["ts"]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for record in records:
+            if speed:
+                delay = started + (record["ts"] - first_ts) / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, record)
+    return results, time.perf_counter() - started
+
+
+def parse_login(text):
+    role, _, account = text.partition("=")
+    email, _, password = account.partition(":")
+    if not (role and email and password):
+        raise argparse.ArgumentTypeError("expected role=email:password")
+    return role, (email, password)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("traces", nargs="+", type=Path)
+    parser.add_argument("--base-url", required=True)
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed factor; 0 ignores recorded timing")
+    parser.add_argument("--concurrency", type=int, default=32, help="Maximum requests in flight")
+    parser.add_argument("--email", default="admin@example.com", help="Local user for roles without --login")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--login", type=parse_login, action="append", default=[],
+                        help="Local user for a recorded role, role=email:password")
+    parser.add_argument("--secret-key", help="SECRET_KEY of the recording server, to map recorded emails to local users")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--output", help="Write the comparison as JSON to this file")
+    args = parser.parse_args()
+
+    records = load_traces(args.traces, args.limit)
+    if not records:
+        raise SystemExit("No requests in the traces")
+    base_url = args.base_url.rstrip("/")
+    credentials = Credentials(base_url, (args.email, args.password), dict(args.login))
+    credentials.login()
+    pseudonyms = Pseudonyms(base_url, credentials.token("default"), args.secret_key)
+
+    recorded_span = records[-1]["ts"] - records[0]["ts"]
+    print(f"Replaying {len(records)} requests recorded over {recorded_span:.1f}s "
+          f"at {args.speed or 'max'}x against {base_url}")
+    results, elapsed = replay(records, base_url, credentials, pseudonyms, args.speed, args.concurrency)
+    summary = results.summary()
+
+    print(f"Done in {elapsed:.1f}s")
+    print(f"{'route':<58} {'reqs':>6} {'rec p50':>9} {'rep p50':>9} {'rec p95':>9} {'rep p95':>9} "
+          f"{'p95 delta':>10} {'status!=':>8}")
+    for label, row in summary.items():
+        delta = f"{row['p95_delta_pct']:+.1f}%" if "p95_delta_pct" in row else "-"
+        print(f"{label:<58} {row['requests']:>6} {row['recorded_p50_ms']:>9} {row['replayed_p50_ms']:>9} "
+              f"{row['recorded_p95_ms']:>9} {row['replayed_p95_ms']:>9} {delta:>10} "
+              f"{row['status_mismatches'] + row['errors']:>8}")
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            "traces": [str(path) for path in args.traces], "speed": args.speed, "elapsed_seconds": round(elapsed, 2),
+            "routes": summary,
+        }, indent=2))
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-1000-board cost of the board list read path.
+
+Compares the validating path (Board(**doc) per document, then FastAPI's
+response_model validation/serialization and ORJSONResponse rendering)
+against trusted_json_response. Runs without MongoDB.
+
+    python benchmarks/trusted_read_bench.py [--boards 1000] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fastapi.responses import ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from category_export_bench import make_boards  # noqa: E402
+from server import Board, trusted_json_response  # noqa: E402
+
+BOARD_LIST_FIELD = create_response_field(name="Response_Get_Boards", type_=List[Board], mode="serialization")
+
+
+def validated_path(docs):
+    content = asyncio.run(serialize_response(
+        field=BOARD_LIST_FIELD,
+        response_content=[Board(**doc) for doc in docs],
+    ))
+    return ORJSONResponse(content).body
+
+
+def trusted_path(docs):
+    return trusted_json_response(Board, docs).body
+
+
+def time_path(name, func, docs, repeat):
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(docs)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    per_thousand = best * 1000 / len(docs) * 1000
+    print(f"{name:<10} best {best * 1000:8.2f} ms   {per_thousand:8.2f} ms per 1000 boards")
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--boards", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    docs = make_boards(args.boards)
+    for doc in docs:
+        del doc["_id"]
+
+    print(f"Board list read path, {args.boards} boards, best of {args.repeat}")
+    validated_time, validated_body = time_path("validated", validated_path, docs, args.repeat)
+    trusted_time, trusted_body = time_path("trusted", trusted_path, docs, args.repeat)
+
+    identical = validated_body == trusted_body
+    print(f"speedup {validated_time / trusted_time:.1f}x, byte-identical: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
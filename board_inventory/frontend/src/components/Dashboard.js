@@ -3,6 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { toast } from 'sonner';
 import Layout from './Layout';
+import { useLiveEvents } from '../hooks/use-live-events';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from './ui/card';
 import { Button } from './ui/button';
 import { Badge } from './ui/badge';
@@ -27,6 +28,8 @@ const Dashboard = ({ user, onLogout }) => {
     fetchDashboardStats();
   }, []);
 
+  useLiveEvents(['board', 'issue_request', 'bulk_issue_request'], () => fetchDashboardStats());
+
   const handlePendingRequestsClick = () => {
     navigate('/issue-requests');
   };
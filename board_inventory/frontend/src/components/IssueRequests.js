@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import { toast } from 'sonner';
 import Layout from './Layout';
+import { useLiveEvents } from '../hooks/use-live-events';
 import { Button } from './ui/button';
 import { Input } from './ui/input';
 import { Label } from './ui/label';
@@ -72,6 +73,8 @@ const IssueRequests = ({ user, onLogout }) => {
     fetchUsers();
   }, []);
 
+  useLiveEvents(['issue_request', 'bulk_issue_request'], () => fetchRequests());
+
   const fetchRequests = async () => {
     try {
       const [requestsRes, bulkRequestsRes] = await Promise.all([
@@ -98,7 +101,7 @@ const IssueRequests = ({ user, onLogout }) => {
 
   const fetchBoards = async () => {
     try {
-      const response = await axios.get(`${API}/boards`);
+      const response = await axios.get(`${API}/boards?fields=serial_number,category_id,condition,location,issued_to`);
       setBoards(response.data); // Get all boards to calculate availability
     } catch (error) {
       toast.error('Failed to fetch boards');
@@ -51,7 +51,7 @@ const Outward = ({ user, onLogout }) => {
       const [requestsRes, bulkRequestsRes, boardsRes, categoriesRes, usersRes] = await Promise.all([
         axios.get(`${API}/issue-requests`),
         axios.get(`${API}/bulk-issue-requests`).catch(() => ({ data: [] })), // Fallback if permission denied
-        axios.get(`${API}/boards`),
+        axios.get(`${API}/boards?fields=serial_number,category_id,condition,issued_to`),
         axios.get(`${API}/categories`),
         axios.get(`${API}/users`).catch(() => ({ data: [] })) // Fallback if not admin
       ]);
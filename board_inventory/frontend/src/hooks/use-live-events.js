@@ -0,0 +1,106 @@
+import { useEffect, useRef } from 'react';
+import axios from 'axios';
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+const RECONNECT_MIN_MS = 1000;
+const RECONNECT_MAX_MS = 30000;
+
+// Subscribe to the server's live event stream and call onChange when an event of
+// one of the given types (or a "resync") arrives. Bursts are coalesced into a
+// single call so a bulk outward does not trigger one refetch per board.
+//
+// The server ends each stream after a few minutes, and EventSource would retry
+// with the same URL (and the same, possibly expired, token) forever. So on any
+// error the stream is closed and reopened with the current token once the
+// session checks out; an expired session ends up on the login page through the
+// axios 401 handler instead of silently losing live updates.
+export function useLiveEvents(types, onChange, delay = 500) {
+  const onChangeRef = useRef(onChange);
+  onChangeRef.current = onChange;
+  const typesKey = types.join(',');
+
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') {
+      return undefined;
+    }
+
+    let source = null;
+    let timer = null;
+    let reconnectTimer = null;
+    let reconnectDelay = RECONNECT_MIN_MS;
+    let stopped = false;
+
+    const schedule = () => {
+      if (timer) {
+        return;
+      }
+      timer = setTimeout(() => {
+        timer = null;
+        onChangeRef.current();
+      }, delay);
+    };
+
+    const eventTypes = [...typesKey.split(','), 'resync'];
+
+    const closeSource = () => {
+      if (source) {
+        eventTypes.forEach((type) => source.removeEventListener(type, schedule));
+        source.close();
+        source = null;
+      }
+    };
+
+    const retryLater = () => {
+      reconnectTimer = setTimeout(reconnect, reconnectDelay);
+      reconnectDelay = Math.min(reconnectDelay * 2, RECONNECT_MAX_MS);
+    };
+
+    const connect = () => {
+      const token = localStorage.getItem('token');
+      if (!token) {
+        return;
+      }
+      source = new EventSource(`${API}/events/stream?token=${encodeURIComponent(token)}`);
+      eventTypes.forEach((type) => source.addEventListener(type, schedule));
+      source.onopen = () => {
+        reconnectDelay = RECONNECT_MIN_MS;
+      };
+      source.onerror = () => {
+        closeSource();
+        retryLater();
+      };
+    };
+
+    const reconnect = () => {
+      reconnectTimer = null;
+      axios.get(`${API}/auth/me`)
+        .then(() => {
+          if (stopped) {
+            return;
+          }
+          connect();
+          // Events sent while disconnected were missed
+          schedule();
+        })
+        .catch((error) => {
+          if (!stopped && error.response?.status !== 401) {
+            retryLater();
+          }
+        });
+    };
+
+    connect();
+
+    return () => {
+      stopped = true;
+      closeSource();
+      if (timer) {
+        clearTimeout(timer);
+      }
+      if (reconnectTimer) {
+        clearTimeout(reconnectTimer);
+      }
+    };
+  }, [typesKey, delay]);
+}
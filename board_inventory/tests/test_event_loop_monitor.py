@@ -0,0 +1,50 @@
+"""
+The event loop monitor must catch a call that blocks the loop while it is
+still blocking: the logged stack points at the blocking function and names
+the request that was running.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_event_loop_monitor")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import EventLoopMonitor  # noqa: E402
+
+
+def export_workbook_synchronously():
+    time.sleep(0.4)
+
+
+class FakeRoute:
+    path = "/api/reports/export/category/{category_id}"
+
+
+def test_blocking_call_is_logged_with_stack_and_route(caplog):
+    monitor = EventLoopMonitor(interval=0.02, threshold_ms=100)
+
+    async def request_handler():
+        monitor.requests[asyncio.current_task()] = {"method": "GET", "path": "/api/x", "route": FakeRoute()}
+        await asyncio.sleep(0.1)
+        export_workbook_synchronously()
+        await asyncio.sleep(0.1)
+
+    async def main():
+        measuring = monitor.start()
+        await asyncio.create_task(request_handler())
+        measuring.cancel()
+
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(main())
+
+    assert monitor.stalls == 1
+    [record] = [record for record in caplog.records if "Event loop blocked" in record.getMessage()]
+    message = record.getMessage()
+    assert "GET /api/reports/export/category/{category_id}" in message
+    assert "export_workbook_synchronously" in message
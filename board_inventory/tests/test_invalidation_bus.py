@@ -0,0 +1,71 @@
+"""
+A boards change from the change stream invalidates cached reports by
+category, like the writing worker's own notify(), and the worker's own
+writes coming back on the stream are not applied a second time.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_invalidation_bus")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from bson import Timestamp  # noqa: E402
+
+from server import InvalidationBus, ReportCache  # noqa: E402
+
+
+def board_change(category_id, updated_seq):
+    return {
+        "ns": {"db": "inventory", "coll": "boards"},
+        "clusterTime": Timestamp(1_700_000_000, 1),
+        "fullDocument": {"category_id": category_id, "updated_seq": updated_seq},
+        "updateDescription": {"updatedFields": {"updated_seq": updated_seq}},
+    }
+
+
+def cached_reports(cache):
+    """Run one report per category and one over all categories, so each has a cached result"""
+    async def report():
+        return "result"
+
+    async def main():
+        for key, category_id in ((("aging", "cat-a"), "cat-a"), (("aging", "cat-b"), "cat-b"), (("stock",), None)):
+            await cache.run(key, report, 60, 600, category_id)
+
+    asyncio.run(main())
+
+
+def current(cache, key, category_id=None):
+    return cache.results[key][3] == cache._version(category_id)
+
+
+def test_board_change_invalidates_only_its_category():
+    bus = InvalidationBus()
+    cache = ReportCache()
+    bus.register("report_cache", ["boards", "categories"], cache.invalidate)
+    cached_reports(cache)
+
+    bus._apply_change(board_change("cat-a", 42))
+
+    assert bus.received == 1
+    assert current(cache, ("aging", "cat-b"), "cat-b")
+    assert not current(cache, ("aging", "cat-a"), "cat-a")
+    assert not current(cache, ("stock",))
+
+
+def test_own_writes_are_skipped():
+    bus = InvalidationBus()
+    cache = ReportCache()
+    bus.register("report_cache", ["boards", "categories"], cache.invalidate)
+    cached_reports(cache)
+    bus.written_here(40, 44)
+
+    bus._apply_change(board_change("cat-a", 42))
+
+    assert bus.received == 0
+    assert current(cache, ("aging", "cat-a"), "cat-a")
+    assert current(cache, ("stock",))
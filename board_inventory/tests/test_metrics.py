@@ -0,0 +1,55 @@
+"""
+The /metrics exposition: Prometheus text format, and per-thread shards that
+add up to the same totals a single locked counter would.
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_metrics")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import Counter, Histogram  # noqa: E402
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_latency_seconds", "Test latency", ("route",), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(("/api/boards",), value)
+
+    assert histogram.render() == [
+        "# HELP test_latency_seconds Test latency",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{route="/api/boards",le="0.1"} 2',
+        'test_latency_seconds_bucket{route="/api/boards",le="1.0"} 3',
+        'test_latency_seconds_bucket{route="/api/boards",le="+Inf"} 4',
+        'test_latency_seconds_sum{route="/api/boards"} 3.65',
+        'test_latency_seconds_count{route="/api/boards"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("test_escaped_total", "Escaping", ("value",))
+    counter.inc(('say "hi"\\\n',))
+
+    assert counter.render()[-1] == 'test_escaped_total{value="say \\"hi\\"\\\\\\n"} 1'
+
+
+def test_counter_shards_sum_across_threads():
+    counter = Counter("test_threads_total", "Threads", ("command",))
+
+    def record():
+        for _ in range(10000):
+            counter.inc(("find",))
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc(("find",))
+
+    assert counter.render()[-1] == 'test_threads_total{command="find"} 80001'
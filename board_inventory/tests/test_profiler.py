@@ -0,0 +1,74 @@
+"""
+A request profile attributes samples to the request's own task and the
+tasks it starts, and counts the time other tasks hold the loop as
+"[awaiting]".
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_profiler")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import SamplingProfiler, profiled_request  # noqa: E402
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def build_report():
+    spin(0.15)
+
+
+def other_request_work():
+    spin(0.15)
+
+
+def folded_counts(folded):
+    counts = {}
+    for line in folded.splitlines():
+        stack, _, count = line.rpartition(" ")
+        counts[stack] = int(count)
+    return counts
+
+
+def test_request_profile_follows_its_tasks():
+    async def other_request(go):
+        await go.wait()
+        other_request_work()
+
+    async def child():
+        build_report()
+
+    async def request(go):
+        profiler = SamplingProfiler(0.002, asyncio.current_task())
+        profiler.start()
+        profiled_request.set(profiler)
+        go.set()
+        # The other request holds the loop now, then the child task runs
+        await asyncio.sleep(0)
+        await asyncio.create_task(child())
+        return profiler.stop()
+
+    async def main():
+        go = asyncio.Event()
+        # Started before the profiled request, so it is not one of its tasks
+        other = asyncio.create_task(other_request(go))
+        profile = await asyncio.create_task(request(go))
+        await other
+        return profile
+
+    profile = asyncio.run(main())
+    counts = folded_counts(profile["folded"])
+
+    assert sum(count for stack, count in counts.items() if stack.endswith(":build_report;" + __name__ + ":spin")) > 10
+    assert not any("other_request_work" in stack for stack in counts)
+    assert counts["[awaiting]"] > 10
+    assert profile["samples"] == sum(counts.values())
@@ -0,0 +1,454 @@
+"""
+Every query the server sends for boards, users and issue requests must be
+answered from an index.
+
+A realistic dataset is seeded into a throwaway database. Every API route is
+then driven through the app while a command listener records what the server
+sends, and each recorded query is explained with executionStats. The suite
+fails on any collection scan not listed in INTENTIONAL_SCANS by route and
+command shape, or on an index that examines far more documents than the
+query returns. It needs a running mongod
+(QUERY_PLAN_MONGO_URL, default mongodb://localhost:27017) and is skipped
+without one.
+"""
+
+import copy
+import os
+import random
+import sys
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+MONGO_URL = os.environ.get("QUERY_PLAN_MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = f"test_query_plans_{uuid.uuid4().hex[:8]}"
+
+os.environ.setdefault("MONGO_URL", MONGO_URL)
+os.environ.setdefault("DB_NAME", DB_NAME)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import pytest  # noqa: E402
+from fastapi.routing import APIRoute  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from pymongo import MongoClient, monitoring  # noqa: E402
+from pymongo.errors import PyMongoError  # noqa: E402
+
+import server  # noqa: E402
+from server import (  # noqa: E402
+    EXPLAINABLE_COMMANDS, SESSION_FIELDS, Board, BoardRequest, BulkIssueRequest, Category, IssueRequest, User,
+    command_shape, get_password_hash, summarize_plan
+)
+
+CHECKED_COLLECTIONS = {"boards", "users", "issue_requests", "bulk_issue_requests"}
+WRITE_COMMANDS = {"update", "delete", "findAndModify"}
+
+# An index may examine this many documents per document returned, plus a
+# fixed allowance for small results
+MAX_EXAMINED_PER_RETURNED = 10
+EXAMINED_SLACK = 50
+
+# What CommandCapture records as the route of commands sent outside a request
+BACKGROUND_JOBS = "(startup and background jobs)"
+SEARCH_FIELDS = ("serial_number", "issued_to", "project_number", "comments")
+
+
+def shape(command_name, collection, query):
+    """command_shape() of a command as pymongo sends it"""
+    field = {"find": "filter", "aggregate": "pipeline"}[command_name]
+    return command_shape(command_name, {command_name: collection, field: query})
+
+
+# Collection scans that are intentional, by (route, command shape), with the reason
+INTENTIONAL_SCANS = {
+    ("/api/boards", shape("find", "boards", {})): "lists every board",
+    ("/api/issue-requests", shape("find", "issue_requests", {})): "an admin lists every issue request",
+    ("/api/bulk-issue-requests", shape("find", "bulk_issue_requests", {})): "lists every bulk request",
+    ("/api/users", shape("find", "users", {})): "an admin lists every user",
+    ("/api/search", shape("find", "boards", {
+        "$or": [{field: {"$regex": "", "$options": "i"}} for field in SEARCH_FIELDS]
+    })): "free-text search is an unanchored case-insensitive $regex over four fields",
+    (BACKGROUND_JOBS, shape("aggregate", "boards", [{"$group": {
+        "_id": {"category_id": "$category_id", "location": "$location", "condition": "$condition"},
+        "count": {"$sum": 1}
+    }}])): "the daily rollup counts the state of every board",
+}
+
+# Routes the suite does not drive
+SKIPPED_ROUTES = {
+    ("GET", "/api/events/stream"): "long-lived SSE stream that only reads the in-process event bus",
+}
+
+CATEGORY_COUNT = 30
+BOARD_COUNT = 8000
+USER_COUNT = 30
+ISSUE_REQUEST_COUNT = 400
+BULK_REQUEST_COUNT = 40
+
+ADMIN_EMAIL = "admin@example.com"
+ADMIN_PASSWORD = "admin-secret"
+
+# (location, condition) and how often it occurs
+BOARD_STATES = [
+    (("In stock", "New"), 45),
+    (("In stock", "Repaired"), 10),
+    (("In stock", "Scrap"), 3),
+    (("Issued for machine", "OK"), 25),
+    (("Issued for spares", "OK"), 5),
+    (("At customer site", "OK"), 5),
+    (("Repairing", "Under repair"), 5),
+    (("Repairing", "Repaired"), 2),
+]
+
+
+def mongod_available():
+    try:
+        MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not mongod_available(), reason=f"no mongod at {MONGO_URL}")
+
+
+def stored(doc):
+    """A model dump as the API writes it; updated_seq is stamped by the startup backfill"""
+    doc.pop("updated_seq", None)
+    return doc
+
+
+def seed_dataset(database):
+    rng = random.Random(44)
+    now = datetime.now(timezone.utc)
+    ids = {}
+
+    categories = [
+        stored(Category(name=f"Board type {i}", description="Controller board", manufacturer=f"Vendor {i % 4}",
+                        version=f"{1 + i % 3}.0", lead_time_days=7 + i % 21, minimum_stock_quantity=20 + i % 60,
+                        created_by=ADMIN_EMAIL).dict())
+        for i in range(CATEGORY_COUNT)
+    ]
+    database.categories.insert_many(categories)
+    ids["category_id"] = categories[0]["id"]
+
+    user_emails = [f"user{i}@example.com" for i in range(USER_COUNT)]
+    users = [
+        stored(User(email=email, first_name="User", last_name=str(i), designation="Engineer",
+                    permissions=["view_boards", "view_issue_requests"]).dict())
+        for i, email in enumerate(user_emails)
+    ]
+    admin = User(email=ADMIN_EMAIL, first_name="Admin", last_name="User", designation="Admin", role="admin").dict()
+    admin["password"] = get_password_hash(ADMIN_PASSWORD)
+    database.users.insert_many(users + [admin])
+    ids["user_email"] = user_emails[0]
+
+    states, weights = zip(*BOARD_STATES)
+    boards = []
+    for index in range(BOARD_COUNT):
+        location, condition = rng.choices(states, weights)[0]
+        away = location != "In stock"
+        inward = now - timedelta(days=rng.randrange(720), minutes=rng.randrange(1440))
+        boards.append(stored(Board(
+            category_id=categories[index % CATEGORY_COUNT]["id"],
+            serial_number=f"SN-{index:06d}",
+            location=location,
+            condition=condition,
+            issued_by=ADMIN_EMAIL if away else None,
+            issued_to=rng.choice(user_emails) if away else None,
+            inward_date_time=inward,
+            issued_date_time=inward + timedelta(days=rng.randrange(1, 60)) if away else None,
+            project_number=f"PRJ-{rng.randrange(40):03d}" if away else None,
+            created_by=ADMIN_EMAIL,
+        ).dict()))
+    database.boards.insert_many(boards)
+    issued = [board for board in boards if board["project_number"]]
+    ids["serial_number"] = issued[0]["serial_number"]
+    ids["project_number"] = issued[0]["project_number"]
+    ids["in_stock_board_id"] = next(
+        board["id"] for board in boards
+        if board["category_id"] != ids["category_id"] and (board["location"], board["condition"]) == ("In stock", "New")
+    )
+
+    issue_requests = []
+    for index in range(ISSUE_REQUEST_COUNT):
+        status = rng.choice(["pending", "approved", "issued", "rejected"])
+        board = rng.choice(issued) if status == "issued" else None
+        issue_requests.append(stored(IssueRequest(
+            category_id=board["category_id"] if board else rng.choice(categories)["id"],
+            serial_number=board["serial_number"] if board else None,
+            requested_by=rng.choice(user_emails),
+            issued_to=rng.choice(user_emails),
+            project_number=board["project_number"] if board else f"PRJ-{rng.randrange(40):03d}",
+            status=status,
+        ).dict()))
+    database.issue_requests.insert_many(issue_requests)
+    ids["pending_request_id"] = next(req["id"] for req in issue_requests if req["status"] == "pending")
+
+    bulk_requests = []
+    for index in range(BULK_REQUEST_COUNT):
+        status = rng.choice(["pending", "approved", "issued"])
+        if status == "issued":
+            picked = rng.sample(issued, 3)
+            board_requests = [
+                BoardRequest(category_id=board["category_id"], serial_number=board["serial_number"],
+                             condition=board["condition"])
+                for board in picked
+            ]
+        else:
+            board_requests = [BoardRequest(category_id=rng.choice(categories)["id"], quantity=rng.randrange(1, 5))]
+        bulk_requests.append(stored(BulkIssueRequest(
+            boards=board_requests, requested_by=rng.choice(user_emails), issued_to=rng.choice(user_emails),
+            project_number=f"PRJ-{rng.randrange(40):03d}", status=status,
+        ).dict()))
+    database.bulk_issue_requests.insert_many(bulk_requests)
+    ids["pending_bulk_request_id"] = next(req["id"] for req in bulk_requests if req["status"] == "pending")
+    return ids
+
+
+class CommandCapture(monitoring.CommandListener):
+    """Keeps a copy of every explainable command on the checked collections, with the route that sent it"""
+
+    def __init__(self):
+        self.commands = []
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.database_name != DB_NAME or event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        if event.command.get(event.command_name) not in CHECKED_COLLECTIONS:
+            return
+        stats = server.request_db_stats.get()
+        route = (stats.route if stats else None) or BACKGROUND_JOBS
+        with self._lock:
+            self.commands.append((route, event.command_name, copy.deepcopy(dict(event.command))))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def drive_routes(client, ids):
+    """Call every route once, in an order that leaves each mutation something to act on.
+
+    Yields (method, route path, response) so callers can check coverage.
+    """
+    category_id = ids["category_id"]
+    serial_number = ids["serial_number"]
+    project_number = ids["project_number"]
+    year_ago = (datetime.now(timezone.utc) - timedelta(days=365)).isoformat()
+    now = datetime.now(timezone.utc).isoformat()
+
+    def call(method, route_path, path=None, **kwargs):
+        response = client.request(method, path or route_path, **kwargs)
+        return method, route_path, response
+
+    # Reads
+    yield call("GET", "/metrics")
+    yield call("GET", "/api/")
+    yield call("GET", "/api/health")
+    yield call("GET", "/api/auth/me")
+    yield call("GET", "/api/categories")
+    yield call("GET", "/api/categories/{category_id}", f"/api/categories/{category_id}")
+    yield call("GET", "/api/boards")
+    yield call("GET", "/api/boards/changes", params={"since": 0})
+    yield call("GET", "/api/boards/{board_id}", f"/api/boards/{ids['in_stock_board_id']}")
+    yield call("GET", "/api/search", params={"category_id": category_id, "location": "In stock"})
+    yield call("GET", "/api/search", params={"query": "SN-0001"})
+    yield call("GET", "/api/issue-requests")
+    yield call("GET", "/api/issue-requests/changes", params={"since": 0})
+    yield call("GET", "/api/bulk-issue-requests")
+    yield call("GET", "/api/bulk-issue-requests/changes", params={"since": 0})
+    yield call("GET", "/api/users")
+    yield call("GET", "/api/permissions/available")
+    yield call("GET", "/api/users/me/permissions")
+    yield call("GET", "/api/dashboard/stats")
+    yield call("GET", "/api/reports/stock")
+    yield call("GET", "/api/reports/stock-trend", params={"start": year_ago, "end": now})
+    yield call("GET", "/api/reports/stock-forecast")
+    yield call("GET", "/api/reports/low-stock")
+    yield call("GET", "/api/reports/under-repair")
+    yield call("GET", "/api/reports/project-consumption/{project_number}",
+               f"/api/reports/project-consumption/{project_number}")
+    for kind in ("in_stock", "issued", "repairing"):
+        yield call("GET", "/api/reports/aging", params={"kind": kind})
+    yield call("GET", "/api/reports/aging", params={"kind": "in_stock", "category_id": category_id})
+    yield call("GET", "/api/reports/repair-turnaround", params={"since": year_ago})
+    yield call("GET", "/api/reports/serial-history/{serial_number}", f"/api/reports/serial-history/{serial_number}")
+    yield call("GET", "/api/reports/serial-numbers/{category_id}", f"/api/reports/serial-numbers/{category_id}")
+    yield call("GET", "/api/reports/category-export/{category_id}", f"/api/reports/category-export/{category_id}")
+    yield call("GET", "/api/reports/export/low-stock")
+    yield call("GET", "/api/reports/export/under-repair")
+    yield call("GET", "/api/reports/export/serial-history/{serial_number}",
+               f"/api/reports/export/serial-history/{serial_number}")
+    yield call("GET", "/api/reports/export/category/{category_id}", f"/api/reports/export/category/{category_id}")
+    yield call("GET", "/api/reports/export/project-consumption/{project_number}",
+               f"/api/reports/export/project-consumption/{project_number}")
+    yield call("GET", "/api/admin/report-cache")
+    yield call("GET", "/api/admin/cache-invalidation")
+    yield call("GET", "/api/admin/slow-queries")
+    method, route_path, response = call("GET", "/api/categories", headers={"X-Profile": "1"})
+    profile_id = response.headers["X-Profile-Id"]
+    yield method, route_path, response
+    yield call("GET", "/api/admin/profiles")
+    yield call("GET", "/api/admin/profiles/{profile_id}", f"/api/admin/profiles/{profile_id}")
+    yield call("POST", "/api/admin/profiling", json={"seconds": 0.1})
+
+    # Accounts
+    new_user = {"email": "new.user@example.com", "first_name": "New", "last_name": "User",
+                "designation": "Technician", "password": "secret1"}
+    method, route_path, response = call("POST", "/api/auth/register", json=new_user)
+    new_user_id = response.json()["user"]["id"]
+    yield method, route_path, response
+    yield call("POST", "/api/auth/login", json={"email": new_user["email"], "password": new_user["password"]})
+    yield call("POST", "/api/setup-admin", params={"email": new_user["email"]})
+    yield call("PUT", "/api/users/{user_email}", f"/api/users/{ids['user_email']}", json={"designation": "Lead"})
+    yield call("POST", "/api/users/reset-password", json={"user_id": new_user_id, "new_password": "secret2"})
+    yield call("PUT", "/api/users/{user_id}/permissions", f"/api/users/{new_user_id}/permissions",
+               json={"user_id": new_user_id, "permissions": ["view_boards"]})
+
+    # Categories and boards
+    method, route_path, response = call("POST", "/api/categories", json={
+        "name": "Plan check board", "description": "d", "manufacturer": "m", "version": "1.0",
+        "lead_time_days": 10, "minimum_stock_quantity": 2})
+    new_category_id = response.json()["id"]
+    yield method, route_path, response
+    yield call("PUT", "/api/categories/{category_id}", f"/api/categories/{new_category_id}", json={
+        "name": "Plan check board", "description": "updated", "manufacturer": "m", "version": "1.1",
+        "lead_time_days": 10, "minimum_stock_quantity": 2})
+    method, route_path, response = call("POST", "/api/boards", json={
+        "category_id": new_category_id, "serial_number": "PLAN-0001", "condition": "New"})
+    new_board_id = response.json()["id"]
+    yield method, route_path, response
+    yield call("PUT", "/api/boards/{board_id}", f"/api/boards/{new_board_id}", json={"comments": "checked"})
+    yield call("POST", "/api/boards/preview-auto-select", json={"category_id": category_id, "quantity": 3})
+
+    # Issue requests through outward
+    method, route_path, response = call("POST", "/api/issue-requests", json={
+        "category_id": category_id, "issued_to": ids["user_email"], "project_number": "PRJ-PLAN"})
+    request_id = response.json()["id"]
+    yield method, route_path, response
+    yield call("PUT", "/api/issue-requests/{request_id}", f"/api/issue-requests/{request_id}",
+               json={"status": "approved"})
+    yield call("POST", "/api/outward", json={"request_id": request_id})
+
+    method, route_path, response = call("POST", "/api/issue-requests/bulk", json={
+        "categories": [{"category_id": category_id, "quantity": 2}],
+        "issued_to": ids["user_email"], "project_number": "PRJ-PLAN"})
+    bulk_request_id = response.json()["request_id"]
+    yield method, route_path, response
+    yield call("PUT", "/api/bulk-issue-requests/{request_id}", f"/api/bulk-issue-requests/{bulk_request_id}",
+               json={"status": "approved"})
+    yield call("POST", "/api/outward", json={"request_id": bulk_request_id})
+    yield call("POST", "/api/outward", json={
+        "board_id": ids["in_stock_board_id"], "issued_to": ids["user_email"], "project_number": "PRJ-PLAN"})
+
+    # Deletes
+    yield call("DELETE", "/api/issue-requests/{request_id}", f"/api/issue-requests/{ids['pending_request_id']}")
+    yield call("DELETE", "/api/bulk-issue-requests/{request_id}",
+               f"/api/bulk-issue-requests/{ids['pending_bulk_request_id']}")
+    yield call("DELETE", "/api/boards/{board_id}", f"/api/boards/{new_board_id}")
+    yield call("DELETE", "/api/categories/{category_id}", f"/api/categories/{new_category_id}")
+    yield call("DELETE", "/api/users/{user_id}", f"/api/users/{new_user_id}")
+
+
+def explain_target(command_name, command):
+    target = {key: value for key, value in command.items() if not key.startswith("$") and key not in SESSION_FIELDS}
+    # explain takes a single write statement; a bulk write repeats one shape
+    for field in ("updates", "deletes"):
+        if field in target:
+            target[field] = target[field][:1]
+    return target
+
+
+def execution_totals(explain_output):
+    """Documents examined and returned by the query layer, summed over shards"""
+    examined = returned = 0
+
+    def walk(node):
+        nonlocal examined, returned
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "executionStats" and isinstance(value, dict) and "totalDocsExamined" in value:
+                    examined += value["totalDocsExamined"]
+                    returned += value["nReturned"]
+                else:
+                    walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(explain_output)
+    return examined, returned
+
+
+@pytest.fixture(scope="module")
+def exercised():
+    sync_client = MongoClient(MONGO_URL)
+    database = sync_client[DB_NAME]
+    ids = seed_dataset(database)
+
+    capture = CommandCapture()
+    original_client, original_db = server.client, server.db
+    server.client = AsyncIOMotorClient(MONGO_URL, event_listeners=[capture])
+    server.db = server.client[DB_NAME]
+    try:
+        with TestClient(server.app) as client:
+            token = client.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+            client.headers["Authorization"] = f"Bearer {token.json()['access_token']}"
+            calls = list(drive_routes(client, ids))
+        yield calls, capture.commands, database
+    finally:
+        server.client, server.db = original_client, original_db
+        sync_client.drop_database(DB_NAME)
+        sync_client.close()
+
+
+def test_every_route_is_driven(exercised):
+    calls, _, _ = exercised
+    driven = {(method, route_path) for method, route_path, _ in calls}
+    routes = {
+        (method, route.path)
+        for route in server.app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+
+    assert sorted(routes - driven - set(SKIPPED_ROUTES)) == []
+    failures = [(method, response.url.path, response.status_code) for method, _, response in calls
+                if response.status_code >= 400]
+    assert failures == []
+
+
+def test_queries_use_indexes(exercised):
+    _, commands, database = exercised
+    problems = []
+    explained = set()
+    for route, command_name, command in commands:
+        key = (route, command_shape(command_name, command))
+        if key in explained:
+            continue
+        explained.add(key)
+        if key in INTENTIONAL_SCANS:
+            continue
+
+        explain_output = database.command({
+            "explain": explain_target(command_name, command), "verbosity": "executionStats"
+        })
+        plan = summarize_plan(explain_output)
+        where = f"{route}: {key[1]} -> {'/'.join(plan['stages'])}"
+        if plan["collscan"]:
+            problems.append(f"{where}: collection scan")
+        # Writes report no returned documents, so only their plan is checked
+        if command_name in WRITE_COMMANDS:
+            continue
+        examined, returned = execution_totals(explain_output)
+        if examined > MAX_EXAMINED_PER_RETURNED * returned + EXAMINED_SLACK:
+            problems.append(f"{where}: examined {examined} documents to return {returned}")
+
+    assert commands
+    assert problems == [], "\n".join(problems)
+    # An exemption whose query is no longer sent would hide the next scan under that name
+    assert sorted(set(INTENTIONAL_SCANS) - explained) == []
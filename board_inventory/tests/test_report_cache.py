@@ -0,0 +1,90 @@
+"""
+Writes never make a report caller wait for a recompute while a cached
+result exists: the results a write can affect (those for the written
+category and those over all categories) are served stale while one
+background refresh runs, and results for other categories stay fresh.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_report_cache")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import ReportCache  # noqa: E402
+
+
+class Report:
+    """A report computation that returns how many times it has run, gated by an event"""
+
+    def __init__(self):
+        self.runs = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self):
+        self.runs += 1
+        runs = self.runs
+        await self.release.wait()
+        return runs
+
+
+def test_board_write_only_stales_its_category():
+    cache = ReportCache()
+
+    async def main():
+        reports = {"cat-a": Report(), "cat-b": Report(), None: Report()}
+
+        def run(category_id):
+            key = ("stock", None) if category_id is None else ("aging", category_id)
+            return cache.run(key, reports[category_id], 60, 600, category_id)
+
+        for category_id in reports:
+            await run(category_id)
+        cache.invalidate("boards", "cat-a")
+
+        served = {category_id: await run(category_id) for category_id in reports}
+        await asyncio.sleep(0)
+        return served, {category_id: report.runs for category_id, report in reports.items()}
+
+    served, runs = asyncio.run(main())
+
+    # Every caller got the cached result at once; only the stale ones were refreshed
+    assert served == {"cat-a": 1, "cat-b": 1, None: 1}
+    assert runs == {"cat-a": 2, "cat-b": 1, None: 2}
+    assert cache.stats["aging"]["cached"] == 1
+    assert cache.stats["aging"]["stale"] == 1
+    assert cache.stats["stock"]["stale"] == 1
+
+
+def test_refresh_overtaken_by_a_write_is_stored_and_refreshed_again():
+    cache = ReportCache()
+    report = Report()
+
+    async def main():
+        await cache.run(("stock", None), report, 60, 600)
+        cache.invalidate("categories", "cat-a")
+        report.release.clear()
+
+        # Served stale while the refresh runs, even as more writes land
+        assert await cache.run(("stock", None), report, 60, 600) == 1
+        cache.invalidate("boards", "cat-b")
+        assert await cache.run(("stock", None), report, 60, 600) == 1
+        report.release.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+        # The overtaken refresh stored its result and a second refresh followed
+        first_refresh = cache.results[("stock", None)][1]
+        while cache.in_flight:
+            await asyncio.sleep(0)
+        return first_refresh, await cache.run(("stock", None), report, 60, 600)
+
+    first_refresh, latest = asyncio.run(main())
+
+    assert first_refresh == 2
+    assert latest == 3
+    assert report.runs == 3
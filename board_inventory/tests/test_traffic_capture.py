@@ -0,0 +1,76 @@
+"""
+A captured trace line holds no email: emails in the path and query are
+pseudonymized like the caller, search text is reduced to its length, and
+replay_traffic.py maps each pseudonym back to the local user given the
+recording server's key.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_traffic_capture")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import orjson  # noqa: E402
+
+from server import SECRET_KEY, TrafficCaptureMiddleware, trace_pseudonym  # noqa: E402
+from replay_traffic import Pseudonyms, pseudonym  # noqa: E402
+
+
+class Lines(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(record.getMessage())
+
+
+def capture(tmp_path, path, query_string):
+    async def app(scope, receive, send):
+        scope["state"]["user"] = SimpleNamespace(email="admin@example.com", role="admin")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    lines = Lines()
+    logger = logging.getLogger("traffic_capture")
+    middleware = TrafficCaptureMiddleware(app, str(tmp_path / "traffic.jsonl"))
+    logger.addHandler(lines)
+    try:
+        scope = {"type": "http", "method": "PUT", "path": path, "query_string": query_string, "state": {}}
+        asyncio.run(middleware(scope, receive, send))
+    finally:
+        logger.removeHandler(lines)
+    return lines.lines[0]
+
+
+def test_trace_line_holds_no_email(tmp_path):
+    line = capture(
+        tmp_path, "/api/users/jane.doe@example.com", b"email=jane.doe%40example.com&query=Jane+Doe&token=abc"
+    )
+    trace = orjson.loads(line)
+
+    assert "@" not in line
+    assert "Jane" not in line
+    jane = trace_pseudonym("jane.doe@example.com")
+    assert trace["path"] == f"/api/users/<email:{jane}>"
+    assert trace["query"] == [["email", f"<email:{jane}>"], ["query", "<str:8>"], ["token", "<redacted>"]]
+    assert trace["user"] == trace_pseudonym("admin@example.com")
+
+    # With the recording server's key the replay addresses the same user
+    pseudonyms = Pseudonyms("http://unused", None, None)
+    pseudonyms.emails = {pseudonym("jane.doe@example.com", SECRET_KEY): "jane.doe@example.com"}
+    assert pseudonyms.substitute(trace["path"]) == "/api/users/jane.doe@example.com"
+    assert pseudonyms.substitute(trace["query"][1][1]) == "x" * 8
@@ -0,0 +1,132 @@
+"""
+The trusted read path (trusted_json_response: trusted_rows() reshapes each
+document to the model's fields without validating it, then orjson encodes
+them) must produce exactly the bytes the validating path produced:
+Model(**doc) per document, then FastAPI's response_model validation and
+serialization.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_trusted_read_paths")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import pytest  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import ORJSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from server import Board, Category, IssueRequest, User, trusted_json_response  # noqa: E402
+
+NOW = datetime(2025, 3, 31, 23, 59, 58, 123000)
+
+
+def board_docs():
+    docs = []
+    for i in range(25):
+        doc = Board(
+            category_id="cat-1",
+            serial_number=f"SN-{i:04d}",
+            location="Issued for machine" if i % 2 else "In stock",
+            condition="New",
+            issued_to="operator@example.com" if i % 2 else None,
+            inward_date_time=NOW - timedelta(days=i),
+            issued_date_time=NOW if i % 2 else None,
+            project_number="PRJ-7" if i % 2 else None,
+            comments="Café rack ✓" if i == 3 else None,
+            created_by="admin@example.com",
+        ).dict()
+        # Documents read back from MongoDB have naive datetimes
+        for key in ("inward_date_time", "created_at"):
+            doc[key] = doc[key].replace(tzinfo=None)
+        docs.append(doc)
+    # Older documents may lack optional fields entirely
+    del docs[0]["qc_by"]
+    del docs[0]["project_number"]
+    return docs
+
+
+def category_docs():
+    return [
+        Category(name=f"Board {i}", description="d", manufacturer="m", version="1.0",
+                 lead_time_days=7, minimum_stock_quantity=3, created_by="admin@example.com").dict()
+        for i in range(5)
+    ]
+
+
+def user_docs():
+    return [
+        User(email=f"user{i}@example.com", first_name="U", last_name=str(i), permissions=["view_boards"]).dict()
+        for i in range(5)
+    ]
+
+
+def issue_request_docs():
+    docs = []
+    for i in range(5):
+        doc = IssueRequest(category_id="cat-1", requested_by="u@example.com", issued_to="v@example.com",
+                           project_number="PRJ-1").dict()
+        doc["requested_by_name"] = "U One"
+        docs.append(doc)
+    return docs
+
+
+CASES = {
+    "boards": (Board, board_docs),
+    "categories": (Category, category_docs),
+    "users": (User, user_docs),
+    "issue_requests": (IssueRequest, issue_request_docs),
+}
+
+
+def build_app(model, docs):
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    @app.get("/validated", response_model=List[model])
+    async def validated():
+        return [model(**dict(doc)) for doc in docs]
+
+    @app.get("/trusted", response_model=List[model])
+    async def trusted():
+        return trusted_json_response(model, [dict(doc) for doc in docs])
+
+    return app
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_trusted_response_matches_validated_response(name):
+    model, make_docs = CASES[name]
+    client = TestClient(build_app(model, make_docs()))
+
+    validated = client.get("/validated")
+    trusted = client.get("/trusted")
+
+    assert validated.status_code == trusted.status_code == 200
+    assert trusted.headers["content-type"] == "application/json"
+    assert trusted.content == validated.content
+
+
+def test_trusted_response_drops_mongo_id_and_password():
+    doc = user_docs()[0]
+    doc["_id"] = object()
+    doc["password"] = "$2b$12$hash"
+
+    body = trusted_json_response(User, [doc]).body
+
+    assert b"_id" not in body
+    assert b"password" not in body
+
+
+def test_document_missing_defaulted_field_goes_through_model():
+    doc = board_docs()[1]
+    del doc["created_at"]
+
+    body = trusted_json_response(Board, [doc]).body
+
+    assert b'"created_at":"' in body
+    assert b'"serial_number":"SN-0001"' in body